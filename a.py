@@ -1,469 +1,936 @@
 # bot_move_service.py
 # Service chuyên xử lý tính toán nước đi cho bot (phiên bản cải thiện v6)
 # Dịch từ JavaScript sang Python
-# Giả sử checkWinner được import từ utils/check_winner
+# Bàn cờ List[List[str]] được chuyển một lần sang Position (bitboard, xem position.py);
+# kiểm tra thắng dùng dịch bit trên Position nên không cần utils/check_winner nữa.
 
-from typing import List, Dict, Tuple, Optional, Any
+from typing import List, Dict, Tuple, Optional, Any, Union
+import os
 import random
 import copy
+import logging
 import math
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+from budget import GOVERNOR, TIERS, Tier, get_tier
+from instrument import MoveStats, branching_factor, timed
+from opening_book import get_book
+from patterns import LINE_VALUE, PRIORITY, TRIT, TRIT2, pattern_priority
+from position import CENTER_BIT, DIRECTIONS, SYMMETRY_INVERSE, WINDOW_MASK, Position, color_of
+from session import GameSession
+from sparse import SparseBoard
+from threats import ThreatSearch, winning_cells
+from transposition import EXACT, LOWER, UPPER, EvalCache, TranspositionTable
+from vectorized import HAVE_NUMPY, VECTORIZE_MIN_STONES, evaluate_position_a, score_positions_a
+
+WIN_SCORE = 100000
+# Điểm đánh giá là bội của 1/4 (tổng evaluate_line / 4) nên cửa sổ rỗng rộng 0.25
+EVAL_GRAIN = 0.25
+
+# Cấp khó là các Tier trong budget.py (ngân sách, độ sâu, tỉ lệ đi sai), chia theo tải qua GOVERNOR
+HARD_DEPTH = TIERS["hard"].depth
+HARD_TIME_LIMIT = TIERS["hard"].time_limit
+# Khóa TT / cache điểm lá chung cho 8 thế đối xứng (Position.canonical)
+CANONICAL_TT = os.environ.get("BOT_CANONICAL_TT", "0") == "1"
+
+BoardLike = Union[List[List[str]], Position]
+
+logger = logging.getLogger(__name__)
+
+
+def _as_position(board: BoardLike, to_move: str = "X") -> Position:
+    if isinstance(board, Position):
+        return board
+    return Position.from_board(board, to_move)
+
+
+def _candidate_moves(pos: Position) -> List[int]:
+    moves = pos.border_cells()
+    if not moves:
+        center = pos.size // 2
+        moves.append(pos.index(center, center))
+    return moves
+
+
+def get_border_moves(board: BoardLike) -> List[Dict[str, int]]:
+    pos = _as_position(board)
+    return [pos.move_dict(idx) for idx in _candidate_moves(pos)]
 
-# Zobrist hashing (tương đương Map trong JS)
-ZOBRIST_TABLE = {}
-def init_zobrist(board_size: int):
-    global ZOBRIST_TABLE
-    if ZOBRIST_TABLE:
-        return
-    for x in range(board_size):
-        for y in range(board_size):
-            ZOBRIST_TABLE[f"{x},{y}_X"] = random.randint(0, 0xFFFFFFFF)
-            ZOBRIST_TABLE[f"{x},{y}_O"] = random.randint(0, 0xFFFFFFFF)
-
-def board_hash(board: List[List[str]]) -> int:
-    h = 0
-    for x in range(len(board)):
-        for y in range(len(board[x])):
-            key = f"{x},{y}_{board[x][y] or 'null'}"
-            h ^= ZOBRIST_TABLE.get(key, 0)
-    return h
-
-def get_border_moves(board: List[List[str]]) -> List[Dict[str, int]]:
-    board_size = len(board)
-    candidates = set()
-    for x in range(board_size):
-        for y in range(board_size):
-            if board[x][y] is not None:
-                for dx in range(-1, 2):
-                    for dy in range(-1, 2):
-                        if dx == 0 and dy == 0:
-                            continue
-                        nx = x + dx
-                        ny = y + dy
-                        if 0 <= nx < board_size and 0 <= ny < board_size and board[nx][ny] is None:
-                            candidates.add(f"{nx},{ny}")
-    if not candidates:
-        center = board_size // 2
-        candidates.add(f"{center},{center}")
-    return [{"x": int(pos.split(",")[0]), "y": int(pos.split(",")[1])} for pos in candidates]
 
 def check_patterns_in_line(line: List[Any], mark: str) -> int:
     pattern = "".join("X" if c == mark else "_" if c is None else "O" for c in line)
-    prio = 0
-    if "XXXX" in pattern:
-        prio += 10000
-    if "_XXX_" in pattern:
-        prio += 5000
-    if "XX_X" in pattern:
-        prio += 3000
-    if "XXX_X" in pattern:
-        prio += 8000
-    if "_XXXX" in pattern:
-        prio += 10000
-    if "XXXX_" in pattern:
-        prio += 10000
-    return prio
-
-def calculate_attack_score(board: List[List[str]], move: Dict[str, int], bot_mark: str) -> int:
-    x, y = move["x"], move["y"]
-    opponent_mark = "O" if bot_mark == "X" else "X"
+    return pattern_priority(pattern)
+
+
+def _direction_scores(pos: Position, idx: int, color: int) -> List[Tuple[int, int]]:
+    """Điểm mẫu theo 4 hướng khi đặt quân tại idx: (cho color, cho đối phương)"""
+    mine = pos.lines[color]
+    theirs = pos.lines[color ^ 1]
+    valid = pos.geo.valid
+    cl = pos.geo.cell_lines[idx]
+    out = []
+    for k in (0, 2, 4, 6):
+        line_id = cl[k]
+        shift = cl[k + 1]
+        on_board = (valid[line_id] >> shift) & WINDOW_MASK
+        # Đường cũ được cắt từ offset -5; ô đó nằm ngoài bàn thì đường rỗng
+        if not on_board & 1:
+            out.append((0, 0))
+            continue
+        own = (mine[line_id] >> shift) & WINDOW_MASK
+        opp = (theirs[line_id] >> shift) & WINDOW_MASK
+        empty = TRIT2[on_board & ~(own | opp | CENTER_BIT)]
+        out.append((PRIORITY[TRIT[own | CENTER_BIT] + empty], PRIORITY[TRIT[opp | CENTER_BIT] + empty]))
+    return out
+
+
+def _attack_score(pos: Position, idx: int, color: int) -> int:
     attack_score = 0
-    dirs = [(1, 0), (0, 1), (1, 1), (1, -1)]
+    threat_dirs = 0
+    for prio, _ in _direction_scores(pos, idx, color):
+        attack_score += prio
+        if prio > 1000:
+            threat_dirs += 1
+    if threat_dirs >= 2:
+        attack_score += 2000
+    if threat_dirs >= 3:
+        attack_score += 5000
+    return attack_score
 
-    board[x][y] = bot_mark
 
-    for dx, dy in dirs:
-        line = []
-        pos = -5
-        while pos <= 5:
-            nx = x + dx * pos
-            ny = y + dy * pos
-            if not (0 <= nx < len(board) and 0 <= ny < len(board[0])):
-                break
-            line.append(board[nx][ny])
-            pos += 1
-        attack_score += check_patterns_in_line(line, bot_mark)
+def _defense_score(pos: Position, idx: int, color: int) -> int:
+    return sum(prio for prio, _ in _direction_scores(pos, idx, color))
+
 
+def _score_cell(pos: Position, idx: int, color: int) -> float:
+    attack_score = 0
+    defense_score = 0
     threat_dirs = 0
-    for dx, dy in dirs:
-        line = []
-        pos = -5
-        while pos <= 5:
-            nx = x + dx * pos
-            ny = y + dy * pos
-            if not (0 <= nx < len(board) and 0 <= ny < len(board[0])):
-                break
-            line.append(board[nx][ny])
-            pos += 1
-        if check_patterns_in_line(line, bot_mark) > 1000:
+    for prio, opp_prio in _direction_scores(pos, idx, color):
+        attack_score += prio
+        defense_score += opp_prio
+        if prio > 1000:
             threat_dirs += 1
     if threat_dirs >= 2:
         attack_score += 2000
     if threat_dirs >= 3:
         attack_score += 5000
+    return attack_score + defense_score * 1.5
 
-    board[x][y] = None
-    return attack_score
 
-def calculate_defense_score(board: List[List[str]], move: Dict[str, int], opponent_mark: str) -> int:
-    x, y = move["x"], move["y"]
-    defense_score = 0
-    dirs = [(1, 0), (0, 1), (1, 1), (1, -1)]
+def calculate_attack_score(board: BoardLike, move: Dict[str, int], bot_mark: str) -> int:
+    pos = _as_position(board)
+    return _attack_score(pos, pos.index(move["x"], move["y"]), color_of(bot_mark))
 
-    board[x][y] = opponent_mark
 
-    for dx, dy in dirs:
-        line = []
-        pos = -5
-        while pos <= 5:
-            nx = x + dx * pos
-            ny = y + dy * pos
-            if not (0 <= nx < len(board) and 0 <= ny < len(board[0])):
-                break
-            line.append(board[nx][ny])
-            pos += 1
-        defense_score += check_patterns_in_line(line, opponent_mark)
+def calculate_defense_score(board: BoardLike, move: Dict[str, int], opponent_mark: str) -> int:
+    pos = _as_position(board)
+    return _defense_score(pos, pos.index(move["x"], move["y"]), color_of(opponent_mark))
 
-    board[x][y] = None
-    return defense_score
 
-def score_move(board: List[List[str]], move: Dict[str, int], bot_mark: str) -> int:
-    opponent_mark = "O" if bot_mark == "X" else "X"
-    attack = calculate_attack_score(board, move, bot_mark)
-    defense = calculate_defense_score(board, move, opponent_mark)
-    return attack + defense * 1.5
+def score_move(board: BoardLike, move: Dict[str, int], bot_mark: str) -> int:
+    pos = _as_position(board)
+    return _score_cell(pos, pos.index(move["x"], move["y"]), color_of(bot_mark))
 
-def get_best_heuristic_move(board: List[List[str]], bot_mark: str) -> Dict[str, int]:
-    moves = get_border_moves(board)
-    if not moves:
-        center = len(board) // 2
-        return {"x": center, "y": center}
 
-    scored_moves = [{"x": m["x"], "y": m["y"], "score": score_move(board, m, bot_mark)} for m in moves]
+def get_best_heuristic_move(board: BoardLike, bot_mark: str) -> Dict[str, int]:
+    pos = _as_position(board, bot_mark)
+    color = color_of(bot_mark)
+    scored_moves = [(idx, _score_cell(pos, idx, color)) for idx in _candidate_moves(pos)]
 
-    max_score = max(m["score"] for m in scored_moves)
-    top_moves = [m for m in scored_moves if m["score"] == max_score]
+    max_score = max(score for _, score in scored_moves)
+    top_moves = [idx for idx, score in scored_moves if score == max_score]
 
-    best_move = random.choice(top_moves)
-    return {"x": best_move["x"], "y": best_move["y"]}
+    return pos.move_dict(random.choice(top_moves))
 
-def calculate_move_priority(board: List[List[str]], x: int, y: int, bot_mark: str) -> int:
+
+def calculate_move_priority(board: BoardLike, x: int, y: int, bot_mark: str) -> int:
     return score_move(board, {"x": x, "y": y}, bot_mark)
 
-from utils.check_winner import check_winner  # Giả sử import
-
-def find_winning_move(board: List[List[str]], mark: str) -> Optional[Dict[str, int]]:
-    moves = get_border_moves(board)
-    for move in moves:
-        x, y = move["x"], move["y"]
-        if board[x][y] is None:
-            board[x][y] = mark
-            if check_winner(board, x, y):
-                board[x][y] = None
-                return {"x": x, "y": y}
-            board[x][y] = None
+
+def _find_winning_cell(pos: Position, color: int) -> Optional[int]:
+    cells = pos.cells
+    for idx in _candidate_moves(pos):
+        if not cells[idx] and pos.wins_if_played(idx, color):
+            return idx
     return None
 
-def find_blocking_move(board: List[List[str]], opponent_mark: str) -> Optional[Dict[str, int]]:
+
+def find_winning_move(board: BoardLike, mark: str) -> Optional[Dict[str, int]]:
+    pos = _as_position(board)
+    idx = _find_winning_cell(pos, color_of(mark))
+    return pos.move_dict(idx) if idx is not None else None
+
+
+def find_blocking_move(board: BoardLike, opponent_mark: str) -> Optional[Dict[str, int]]:
     return find_winning_move(board, opponent_mark)
 
-def find_dangerous_patterns(board: List[List[str]], opponent_mark: str) -> List[Dict[str, Any]]:
-    board_size = len(board)
-    dirs = [(1, 0), (0, 1), (1, 1), (1, -1)]
-    patterns = []
-
-    for x in range(board_size):
-        for y in range(board_size):
-            if board[x][y] != opponent_mark:
-                continue
-
-            for dx, dy in dirs:
-                line = []
-                positions = []
-                line.append(board[x][y])
-                positions.append((x, y))
-                pos = 1
-                while pos < 10:
-                    nx = x + dx * pos
-                    ny = y + dy * pos
-                    if not (0 <= nx < board_size and 0 <= ny < board_size):
-                        break
-                    line.append(board[nx][ny])
-                    positions.append((nx, ny))
-                    pos += 1
-                pos = 1
-                while pos < 10:
-                    nx = x - dx * pos
-                    ny = y - dy * pos
-                    if not (0 <= nx < board_size and 0 <= ny < board_size):
-                        break
-                    line.insert(0, board[nx][ny])
-                    positions.insert(0, (nx, ny))
-                    pos += 1
-
-                for i in range(len(line) - 3):
-                    seg_len = len(line) - i
-                    if seg_len >= 5:
-                        seg = line[i:i+5]
-                        pattern_str = "".join("X" if c == opponent_mark else "_" if c is None else "O" for c in seg)
-                        prio = 0
-                        block_pos = None
-                        if pattern_str == "_XXX_":
-                            prio = 800
-                            block_pos = [1, 4]
-                        elif pattern_str == "XX_X_":
-                            prio = 600
-                            block_pos = 2
-                        elif pattern_str == "_XXXX":
-                            prio = 1000
-                            block_pos = 0
-                        elif pattern_str == "XXXX_":
-                            prio = 1000
-                            block_pos = 4
-                        elif pattern_str == "XXX_X":
-                            prio = 900
-                            block_pos = 3
-                    elif seg_len >= 4:
-                        seg = line[i:i+4]
-                        pattern_str = "".join("X" if c == opponent_mark else "_" if c is None else "O" for c in seg)
-                        prio = 0
-                        block_pos = None
-                        if pattern_str == "_XXX":
-                            prio = 400
-                            block_pos = 0
-                        elif pattern_str == "XXX_":
-                            prio = 400
-                            block_pos = 3
-                        elif pattern_str == "XXXX":
-                            prio = 1200
-                            # Block ends if open, but handled elsewhere
-
-                    if prio > 0 and block_pos is not None:
-                        if isinstance(block_pos, list):
-                            for bp in block_pos:
-                                line_idx = i + bp
-                                if 0 <= line_idx < len(line) and line[line_idx] is None:
-                                    bx, by = positions[line_idx]
-                                    patterns.append({"move": {"x": bx, "y": by}, "priority": prio})
-                        else:
-                            line_idx = i + block_pos
-                            if 0 <= line_idx < len(line) and line[line_idx] is None:
-                                bx, by = positions[line_idx]
-                                patterns.append({"move": {"x": bx, "y": by}, "priority": prio})
-
-    patterns.sort(key=lambda p: p["priority"], reverse=True)
+
+# Mẫu 5 ô / 4 ô (cuối đường) -> (độ ưu tiên, vị trí cần chặn trong đoạn)
+_DANGER_5 = {
+    "_XXX_": (800, (1, 4)),
+    "XX_X_": (600, (2,)),
+    "_XXXX": (1000, (0,)),
+    "XXXX_": (1000, (4,)),
+    "XXX_X": (900, (3,)),
+}
+_DANGER_4 = {
+    "_XXX": (400, (0,)),
+    "XXX_": (400, (3,)),
+}
+_DANGER_CHARS = (b"_XO", b"_OX")
+
+
+def _dangerous_cells(pos: Position, color: int) -> List[Tuple[int, int]]:
+    n = pos.size
+    cells = pos.cells
+    table = bytes.maketrans(b"\x00\x01\x02", _DANGER_CHARS[color])
+    found = []
+
+    for idx in sorted(pos.stones[color]):
+        x, y = divmod(idx, n)
+        for dx, dy in DIRECTIONS:
+            # Đoạn liên tục trong bàn, tối đa 9 ô mỗi phía
+            lo = 0
+            while lo > -9 and 0 <= x + dx * (lo - 1) < n and 0 <= y + dy * (lo - 1) < n:
+                lo -= 1
+            hi = 0
+            while hi < 9 and 0 <= x + dx * (hi + 1) < n and 0 <= y + dy * (hi + 1) < n:
+                hi += 1
+            step = dx * n + dy
+            start = idx + lo * step
+            line = cells[start:idx + hi * step + 1:step].translate(table).decode()
+            length = len(line)
+
+            for i in range(length - 3):
+                if length - i >= 5:
+                    hit = _DANGER_5.get(line[i:i + 5])
+                else:
+                    hit = _DANGER_4.get(line[i:i + 4])
+                if hit is None:
+                    continue
+                prio, block = hit
+                for bp in block:
+                    if line[i + bp] == "_":
+                        found.append((prio, start + (i + bp) * step))
+
+    found.sort(key=lambda p: p[0], reverse=True)
     unique = []
     seen = set()
-    for p in patterns:
-        key = f"{p['move']['x']},{p['move']['y']}"
-        if key not in seen:
-            seen.add(key)
-            unique.append(p)
+    for prio, cell in found:
+        if cell not in seen:
+            seen.add(cell)
+            unique.append((cell, prio))
     return unique[:5]
 
-def evaluate_line(board: List[List[str]], x: int, y: int, dx: int, dy: int, mark: str, opponent_mark: str) -> int:
-    board_size = len(board)
-    max_consecutive = 0
-    open_ends = 0
-    consecutive = 0
-
-    # Forward
-    consecutive = 0
-    for i in range(6):
-        nx = x + dx * i
-        ny = y + dy * i
-        if not (0 <= nx < board_size and 0 <= ny < board_size):
-            break
-        if board[nx][ny] == mark:
-            consecutive += 1
-            max_consecutive = max(max_consecutive, consecutive)
-        elif board[nx][ny] == opponent_mark:
-            break
-        else:
-            consecutive = 0
-
-    # Backward
-    consecutive = 0
-    for i in range(1, 6):
-        nx = x - dx * i
-        ny = y - dy * i
-        if not (0 <= nx < board_size and 0 <= ny < board_size):
-            break
-        if board[nx][ny] == mark:
-            consecutive += 1
-            max_consecutive = max(max_consecutive, consecutive)
-        elif board[nx][ny] == opponent_mark:
+
+def find_dangerous_patterns(board: BoardLike, opponent_mark: str) -> List[Dict[str, Any]]:
+    pos = _as_position(board)
+    return [{"move": pos.move_dict(idx), "priority": prio} for idx, prio in _dangerous_cells(pos, color_of(opponent_mark))]
+
+
+def _tactical_cell(pos: Position, color: int, difficulty: str, session: Optional[GameSession] = None, cancel: Optional[threading.Event] = None,
+                   limits: Optional[Tuple[bool, int, float]] = None) -> Optional[int]:
+    """Nước theo chuỗi thắng ép của color, hoặc nước phá chuỗi thắng ép của đối phương
+
+    Thứ tự: VCF của mình, chặn VCF đối phương, rồi VCT tương tự. Không cứu
+    được thì chiếm ô đầu tiên của chuỗi đối phương. Kết quả được lưu trong
+    session nên thế đã dò (và các thế trên chuỗi thắng đã chứng minh) không
+    phải dò lại. limits (có dò VCT không, số node mỗi lần dò, tổng số giây)
+    mặc định theo Tier của difficulty.
+    """
+    vct, max_nodes, seconds = limits or get_tier(difficulty).threats
+    deadline = time.perf_counter() + seconds
+    proofs = session.threat_proofs if session else None
+    results = session.threat_results if session else {}
+    if proofs:
+        proved = proofs.get(pos.hash)
+        if proved is not None and not pos.cells[proved]:
+            return proved
+    key = (pos.hash, difficulty)
+    if key in results:
+        return results[key]
+
+    move = None
+    for use_vct in ((False, True) if vct else (False,)):
+        move = ThreatSearch(pos, max_nodes, deadline, proofs, cancel).find_win(color, use_vct)
+        if move is not None:
             break
-        else:
-            consecutive = 0
-
-    # Open ends
-    prev_x = x - dx
-    prev_y = y - dy
-    if 0 <= prev_x < board_size and 0 <= prev_y < board_size and board[prev_x][prev_y] is None:
-        open_ends += 1
-    next_x = x + dx
-    next_y = y + dy
-    if 0 <= next_x < board_size and 0 <= next_y < board_size and board[next_x][next_y] is None:
-        open_ends += 1
-
-    if max_consecutive >= 5:
-        return 1000000
-    if max_consecutive == 4 and open_ends >= 2:
-        return 50000
-    if max_consecutive == 4 and open_ends == 1:
-        return 10000
-    if max_consecutive == 4 and open_ends == 0:
-        return 1000
-    if max_consecutive == 3 and open_ends >= 2:
-        return 5000
-    if max_consecutive == 3 and open_ends == 1:
-        return 500
-    if max_consecutive == 3 and open_ends == 0:
-        return 50
-    if max_consecutive == 2 and open_ends >= 2:
-        return 100
-    if max_consecutive == 2 and open_ends == 1:
-        return 10
-    if max_consecutive == 2 and open_ends == 0:
-        return 2
-    if max_consecutive == 1 and open_ends >= 2:
-        return 5
-    return 1
-
-def evaluate_board(board: List[List[str]], mark: str) -> int:
-    opponent_mark = "O" if mark == "X" else "X"
-    score = 0
-    board_size = len(board)
-    dirs = [(1, 0), (0, 1), (1, 1), (1, -1)]
-    for x in range(board_size):
-        for y in range(board_size):
-            if board[x][y] == mark:
-                for dx, dy in dirs:
-                    score += evaluate_line(board, x, y, dx, dy, mark, opponent_mark) / 4
-    return score
-
-def negamax(board: List[List[str]], depth: int, alpha: int, beta: int, mark: str, color: int, transposition: Dict[int, Dict[str, Any]], last_move: Dict[str, int], bot_mark: str) -> int:
-    opponent_mark = "O" if mark == "X" else "X"
-
-    if last_move and check_winner(board, last_move["x"], last_move["y"]):
-        return color * -100000
-    is_full = all(all(cell is not None for cell in row) for row in board)
-    if is_full:
-        return 0
-    if depth == 0:
-        bot_score = evaluate_board(board, bot_mark)
-        opp_score = evaluate_board(board, opponent_mark)
-        return bot_score - opp_score
-
-    h = board_hash(board)
-    if h in transposition and transposition[h]["depth"] >= depth:
-        value = transposition[h]["value"]
-        if value <= alpha:
-            return alpha
-        if value >= beta:
-            return beta
-
-    moves = get_border_moves(board)
-    max_moves = 12 if depth > 3 else len(moves)
-    limited_moves = sorted(moves[:max_moves], key=lambda m: calculate_move_priority(board, m["x"], m["y"], mark), reverse=True)
-
-    max_eval = float("-inf")
-    for move in limited_moves:
-        x, y = move["x"], move["y"]
-        board[x][y] = mark
-        eval_val = -negamax(board, depth - 1, -beta, -alpha, opponent_mark, -color, transposition, move, bot_mark)
-        board[x][y] = None
-        max_eval = max(max_eval, eval_val)
-        alpha = max(alpha, eval_val)
-        if alpha >= beta:
+        search = ThreatSearch(pos, max_nodes, deadline, proofs, cancel)
+        safe = search.find_defenses(color, use_vct)
+        if safe is not None:
+            if safe:
+                move = max(safe, key=lambda m: _score_cell(pos, m, color))
+            elif search.line:
+                move = search.line[0]
             break
 
-    transposition[h] = {"value": max_eval, "depth": depth}
-    return max_eval
+    if cancel is None or not cancel.is_set():
+        results[key] = move
+    if session:
+        session.trim_threat_cache()
+    return move
 
-def get_best_move_with_negamax(board: List[List[str]], bot_mark: str, player_mark: str, depth: int) -> Dict[str, int]:
-    try:
-        init_zobrist(len(board))
-        moves = get_border_moves(board)
-        if not moves:
-            center = len(board) // 2
-            return {"x": center, "y": center}
 
-        moves.sort(key=lambda m: score_move(board, m, bot_mark), reverse=True)
+def evaluate_line(board: BoardLike, x: int, y: int, dx: int, dy: int, mark: str, opponent_mark: str) -> int:
+    pos = _as_position(board)
+    own, empty, _ = pos.windows(pos.index(x, y), color_of(mark))[DIRECTIONS.index((dx, dy))]
+    return LINE_VALUE[TRIT[own] + TRIT2[empty]]
+
+
+def _evaluate_position(pos: Position, color: int) -> float:
+    if HAVE_NUMPY and len(pos.stones[color]) >= VECTORIZE_MIN_STONES:
+        return evaluate_position_a(pos, color)
+    mine = pos.lines[color]
+    theirs = pos.lines[color ^ 1]
+    valid = pos.geo.valid
+    cell_lines = pos.geo.cell_lines
+    total = 0
+    for idx in pos.stones[color]:
+        cl = cell_lines[idx]
+        for k in (0, 2, 4, 6):
+            line_id = cl[k]
+            shift = cl[k + 1]
+            own = (mine[line_id] >> shift) & WINDOW_MASK
+            empty = (valid[line_id] >> shift) & WINDOW_MASK & ~(own | (theirs[line_id] >> shift))
+            total += LINE_VALUE[TRIT[own] + TRIT2[empty]]
+    return total / 4
+
+
+def evaluate_board(board: BoardLike, mark: str) -> int:
+    return _evaluate_position(_as_position(board), color_of(mark))
+
+
+class SearchTimeout(Exception):
+    """Hết thời gian / ngân sách node giữa chừng một vòng tìm"""
+
+
+class Searcher:
+    """Trạng thái của một lượt tìm negamax: TT, giới hạn thời gian và số node
+
+    Thứ tự nước ở mỗi node: nước trong TT, 2 killer move của ply đó, rồi các
+    nước còn lại theo điểm tĩnh (_score_cell) cộng điểm history. Điểm history
+    nhỏ so với điểm mẫu nên chủ yếu phân định các nước "yên tĩnh" cùng điểm.
+
+    Tìm theo PVS: nước đầu với cửa sổ đầy đủ, các nước sau với cửa sổ rỗng và
+    chỉ tìm lại khi fail-high. Nước muộn, yên tĩnh được giảm 1 ply (LMR), gốc
+    dùng aspiration window quanh điểm của vòng sâu dần trước.
+
+    Ở lá (depth == 0) không đánh giá ngay mà tìm tiếp các nước ép (quiescence):
+    chỉ nước tạo/chặn 4 và 3 mở, tối đa QS_DEPTH ply.
+
+    canonical=True: TT và eval_cache dùng khóa đối xứng (Position.canonical),
+    nước trong TT được lưu theo hướng của thế chuẩn và đổi lại khi đọc.
+    """
+
+    CHECK_EVERY = 512
+    MAX_PLY = 64
+
+    # LMR: chỉ giảm từ nước thứ LMR_FULL_MOVES trở đi, ở độ sâu >= LMR_MIN_DEPTH,
+    # với nước có điểm tĩnh dưới LMR_QUIET_SCORE (không tạo/chặn mẫu XX_X trở lên)
+    LMR_MIN_DEPTH = 3
+    LMR_FULL_MOVES = 3
+    LMR_QUIET_SCORE = 3000
+    ASPIRATION_MIN_DEPTH = 3
+    ASPIRATION_WINDOW = 300
+    ASPIRATION_MAX = 25000
+
+    # Quiescence: nước ép là nước có một hướng đạt QS_FORCING_SCORE (tạo/chặn
+    # 3 mở _XXX_ trở lên), xét tối đa QS_MAX_MOVES nước mỗi node
+    QS_DEPTH = 4
+    QS_FORCING_SCORE = 5000
+    QS_MAX_MOVES = 4
+
+    def __init__(self, pos: Position, transposition: TranspositionTable, deadline: Optional[float] = None, max_nodes: Optional[int] = None,
+                 pvs: bool = True, lmr: bool = True, aspiration: bool = True, quiescence: bool = True,
+                 cancel: Optional[threading.Event] = None, canonical: bool = False, eval_cache: Optional[EvalCache] = None):
+        self.pos = pos
+        self.tt = transposition
+        self.eval_cache = eval_cache
+        self.canonical = canonical
+        if canonical:
+            pos.track_symmetries()
+        self._perms = pos.geo.symmetries() if canonical else None
+        self.deadline = deadline
+        self.max_nodes = max_nodes
+        self.cancel = cancel
+        self.pvs = pvs
+        self.lmr = lmr and pvs
+        self.aspiration = aspiration
+        self.quiescence = quiescence
+        self.nodes = 0
+        self.qnodes = 0
+        self._next_check = self.CHECK_EVERY
+        self.root_ply = len(pos.history)
+        self.killers = [[-1, -1] for _ in range(self.MAX_PLY)]
+        self.history = [[0] * (pos.size * pos.size) for _ in range(2)]
+        self.cutoffs = [0] * self.MAX_PLY
+        self.first_move_cutoffs = [0] * self.MAX_PLY
+        self.researches = 0
+        self.aspiration_fails = 0
+        # Số node (kể cả quiescence) của từng vòng sâu dần đã hoàn thành
+        self.nodes_by_depth: List[int] = []
+        # TT / cache có thể dùng chung nhiều lượt: chỉ tính phần của lượt này
+        self._tt_counts = (transposition.probes, transposition.hits)
+        self._eval_counts = (eval_cache.probes, eval_cache.hits) if eval_cache is not None else (0, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        """Số node và thống kê beta cutoff theo ply (tỉ lệ cắt ngay ở nước đầu)"""
+        plies = [p for p in range(self.MAX_PLY) if self.cutoffs[p]]
+        total = sum(self.cutoffs)
+        return {
+            "nodes": self.nodes,
+            "qnodes": self.qnodes,
+            "cutoffs": total,
+            "first_move_cutoff_rate": (sum(self.first_move_cutoffs) / total) if total else 0.0,
+            "cutoffs_by_ply": {p: self.cutoffs[p] for p in plies},
+            "first_move_cutoffs_by_ply": {p: self.first_move_cutoffs[p] for p in plies},
+            "researches": self.researches,
+            "aspiration_fails": self.aspiration_fails,
+            "nodes_by_depth": self.nodes_by_depth,
+            "branching_factor": branching_factor(self.nodes_by_depth),
+            **self.cache_stats(),
+        }
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Số lần tra / trúng TT và eval_cache trong lượt này"""
+        out: Dict[str, Any] = {}
+        tables = [("tt", self.tt, self._tt_counts)]
+        if self.eval_cache is not None:
+            tables.append(("eval", self.eval_cache, self._eval_counts))
+        for name, table, (probes0, hits0) in tables:
+            probes, hits = table.probes - probes0, table.hits - hits0
+            out[f"{name}_probes"] = probes
+            out[f"{name}_hits"] = hits
+            out[f"{name}_hit_rate"] = hits / probes if probes else 0.0
+        return out
+
+    # ---------- Khóa TT ----------
+
+    def _key(self) -> Tuple[int, int]:
+        """(khóa TT, phép đối xứng đưa thế hiện tại về thế chuẩn)"""
+        if self.canonical:
+            return self.pos.canonical()
+        return self.pos.hash, 0
+
+    def _to_tt(self, move: int, sym: int) -> int:
+        return self._perms[sym][move] if sym and move >= 0 else move
+
+    def _from_tt(self, move: int, sym: int) -> int:
+        return self._perms[SYMMETRY_INVERSE[sym]][move] if sym and move >= 0 else move
+
+    def tt_move(self) -> int:
+        """Nước tốt nhất trong TT cho thế hiện tại, -1 nếu không có"""
+        key, sym = self._key()
+        return self._from_tt(self.tt.best_move(key), sym)
+
+    def _static_eval(self, key: int) -> float:
+        """Điểm tĩnh theo góc nhìn bên đi, qua eval_cache nếu có"""
+        cache = self.eval_cache
+        if cache is not None:
+            value = cache.get(key)
+            if value is not None:
+                return value
+        pos = self.pos
+        value = _evaluate_position(pos, pos.side) - _evaluate_position(pos, pos.side ^ 1)
+        if cache is not None:
+            cache.put(key, value)
+        return value
+
+    def _check_limits(self) -> None:
+        self._next_check = self.nodes + self.CHECK_EVERY
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            raise SearchTimeout()
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+        if self.cancel is not None and self.cancel.is_set():
+            raise SearchTimeout()
+
+    def _order_moves(self, depth: int, ply: int, tt_move: int) -> Tuple[List[int], Dict[int, float]]:
+        """(nước đã sắp xếp, điểm tĩnh của từng nước)"""
+        pos = self.pos
+        side = pos.side
+        history = self.history[side]
+        scores = {m: _score_cell(pos, m, side) for m in _candidate_moves(pos)}
+        moves = sorted(scores, key=lambda m: scores[m] + history[m], reverse=True)
+
+        front = []
+        if tt_move >= 0 and not pos.cells[tt_move]:
+            front.append(tt_move)
+        for killer in self.killers[ply]:
+            if killer >= 0 and killer not in front and killer in pos.frontier:
+                front.append(killer)
+        if front:
+            moves = front + [m for m in moves if m not in front]
+        # Cắt sau khi đã sắp xếp nên luôn giữ 12 nước tốt nhất
+        if depth > 3:
+            del moves[12:]
+        return moves, scores
+
+    def _record_cutoff(self, move: int, depth: int, ply: int, index: int) -> None:
+        self.cutoffs[ply] += 1
+        if index == 0:
+            self.first_move_cutoffs[ply] += 1
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        self.history[self.pos.side][move] += depth * depth
+
+    def _search_child(self, depth: int, alpha: float, beta: float, index: int, reduction: int) -> float:
+        """Điểm của nước vừa đi (góc nhìn node cha) theo PVS + LMR"""
+        if index == 0 or not self.pvs:
+            return -self.negamax(depth - 1, -beta, -alpha)
+        value = -self.negamax(depth - 1 - reduction, -alpha - EVAL_GRAIN, -alpha)
+        if reduction and value > alpha:
+            self.researches += 1
+            value = -self.negamax(depth - 1, -alpha - EVAL_GRAIN, -alpha)
+        if alpha < value < beta:
+            self.researches += 1
+            value = -self.negamax(depth - 1, -beta, -alpha)
+        return value
+
+    def negamax(self, depth: int, alpha: float, beta: float) -> float:
+        """Điểm theo góc nhìn bên đang đến lượt (pos.side)"""
+        pos = self.pos
+        self.nodes += 1
+        if self.nodes >= self._next_check:
+            self._check_limits()
+
+        if pos.last_move_wins():
+            return -WIN_SCORE
+        if pos.is_full():
+            return 0
+        if depth == 0:
+            if self.quiescence:
+                return self.quiesce(alpha, beta, self.QS_DEPTH)
+            return self._static_eval(self._key()[0])
+
+        transposition = self.tt
+        h, sym = self._key()
+        alpha_orig = alpha
+        tt_move = -1
+        entry = transposition.probe(h)
+        if entry is not None:
+            tt_depth, value, flag, tt_move = entry
+            tt_move = self._from_tt(tt_move, sym)
+            if tt_depth >= depth:
+                if flag == EXACT:
+                    return value
+                if flag == LOWER and value >= beta:
+                    return value
+                if flag == UPPER and value <= alpha:
+                    return value
+
+        ply = min(len(pos.history) - self.root_ply, self.MAX_PLY - 1)
+        moves, scores = self._order_moves(depth, ply, tt_move)
+        killers = self.killers[ply]
+        can_reduce = self.lmr and depth >= self.LMR_MIN_DEPTH
+        max_eval = float("-inf")
+        best_move = -1
+        for i, move in enumerate(moves):
+            reduction = 0
+            if (can_reduce and i >= self.LMR_FULL_MOVES and move != tt_move and move not in killers
+                    and scores.get(move, 0) < self.LMR_QUIET_SCORE):
+                reduction = 1
+            pos.make(move)
+            try:
+                eval_val = self._search_child(depth, alpha, beta, i, reduction)
+            finally:
+                pos.unmake()
+            if eval_val > max_eval:
+                max_eval = eval_val
+                best_move = move
+            alpha = max(alpha, eval_val)
+            if alpha >= beta:
+                self._record_cutoff(move, depth, ply, i)
+                break
 
-        transposition = {}
+        if max_eval <= alpha_orig:
+            flag = UPPER
+        elif max_eval >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        transposition.store(h, depth, max_eval, flag, self._to_tt(best_move, sym))
+        return max_eval
+
+    def _forcing_moves(self) -> List[int]:
+        """Nước tạo hoặc chặn mẫu mạnh (theo PRIORITY từng hướng), điểm cao trước"""
+        pos = self.pos
+        side = pos.side
+        threshold = self.QS_FORCING_SCORE
+        forcing = []
+        for idx in pos.frontier:
+            for prio, opp_prio in _direction_scores(pos, idx, side):
+                if prio >= threshold or opp_prio >= threshold:
+                    forcing.append(idx)
+                    break
+        if len(forcing) > 1:
+            forcing.sort(key=lambda m: _score_cell(pos, m, side), reverse=True)
+        return forcing[:self.QS_MAX_MOVES]
+
+    def quiesce(self, alpha: float, beta: float, qdepth: int) -> float:
+        """Tìm các nước ép sau lá; đứng yên (stand pat) được trừ khi đối phương sắp thắng"""
+        pos = self.pos
+        self.nodes += 1
+        self.qnodes += 1
+        if self.nodes >= self._next_check:
+            self._check_limits()
+
+        if pos.last_move_wins():
+            return -WIN_SCORE
+        if pos.is_full():
+            return 0
+        side = pos.side
+        if winning_cells(pos, side):
+            return WIN_SCORE
+        threats = winning_cells(pos, side ^ 1)
+        if len(threats) > 1:
+            return -WIN_SCORE
+
+        stand_pat = self._static_eval(self._key()[0])
+        if threats:
+            # Đối phương có 4: buộc phải chặn, không được đứng yên
+            moves = threats
+        else:
+            if stand_pat >= beta or qdepth <= 0:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+            moves = self._forcing_moves()
+            if not moves:
+                return stand_pat
+
+        best = stand_pat if not threats else float("-inf")
+        for move in moves:
+            pos.make(move)
+            try:
+                value = -self.quiesce(-beta, -alpha, qdepth - 1)
+            finally:
+                pos.unmake()
+            if value > best:
+                best = value
+            if value > alpha:
+                alpha = value
+                if alpha >= beta:
+                    break
+        return best
+
+    def search_root(self, moves: List[int], depth: int, alpha: float = float("-inf"), beta: float = float("inf")) -> Tuple[int, float]:
+        """PVS trên các nước gốc trong cửa sổ (alpha, beta): (nước tốt nhất, điểm)"""
+        pos = self.pos
+        alpha_orig = alpha
         best_move = moves[0]
         best_eval = float("-inf")
-        max_moves = 12 if depth >= 4 else 8
-        for move in moves[:max_moves]:
-            x, y = move["x"], move["y"]
-            board[x][y] = bot_mark
-            eval_val = negamax(board, depth - 1, float("-inf"), float("inf"), player_mark, -1, transposition, move, bot_mark)
-            board[x][y] = None
+        for i, move in enumerate(moves):
+            pos.make(move)
+            try:
+                eval_val = self._search_child(depth, alpha, beta, i, 0)
+            finally:
+                pos.unmake()
             if eval_val > best_eval:
                 best_eval = eval_val
                 best_move = move
-            if best_eval >= 100000:
+            alpha = max(alpha, eval_val)
+            if alpha >= beta or best_eval >= WIN_SCORE:
+                break
+        if best_eval <= alpha_orig:
+            flag = UPPER
+        elif best_eval >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        key, sym = self._key()
+        self.tt.store(key, depth, best_eval, flag, self._to_tt(best_move, sym))
+        return best_move, best_eval
+
+    def _aspiration_root(self, moves: List[int], depth: int, guess: float) -> Tuple[int, float]:
+        delta = self.ASPIRATION_WINDOW
+        alpha, beta = guess - delta, guess + delta
+        while True:
+            move, value = self.search_root(moves, depth, alpha, beta)
+            if alpha < value < beta:
+                return move, value
+            self.aspiration_fails += 1
+            delta *= 4
+            if delta > self.ASPIRATION_MAX:
+                return self.search_root(moves, depth)
+            if value <= alpha:
+                alpha = value - delta
+            else:
+                beta = value + delta
+                # Nước vừa fail-high là ứng viên tốt nhất, tìm lại nó trước
+                moves = [move] + [m for m in moves if m != move]
+
+    def iterative_deepening(self, moves: List[int], max_depth: int) -> Tuple[int, float, int]:
+        """Sâu dần 1..max_depth; hết giờ thì trả kết quả của vòng hoàn chỉnh gần nhất
+
+        Mỗi vòng đưa nước tốt nhất của vòng trước lên đầu và dùng điểm của nó
+        làm tâm aspiration window. Trả về (nước tốt nhất, điểm, độ sâu đã
+        hoàn thành).
+        """
+        best_move, best_eval, completed = moves[0], float("-inf"), 0
+        searched = self.nodes + self.qnodes
+        for depth in range(1, max_depth + 1):
+            try:
+                if self.aspiration and completed and depth >= self.ASPIRATION_MIN_DEPTH and abs(best_eval) < WIN_SCORE:
+                    move, value = self._aspiration_root(moves, depth, best_eval)
+                else:
+                    move, value = self.search_root(moves, depth)
+            except SearchTimeout:
+                break
+            best_move, best_eval = move, value
+            completed = depth
+            self.nodes_by_depth.append(self.nodes + self.qnodes - searched)
+            searched = self.nodes + self.qnodes
+            moves = [move] + [m for m in moves if m != move]
+            if best_eval >= WIN_SCORE or best_eval <= -WIN_SCORE:
                 break
-        return best_move
-    except Exception as e:
-        print(f"Error in get_best_move_with_negamax: {e}")
-        center = len(board) // 2
+        return best_move, best_eval, completed
+
+
+def negamax(pos: Position, depth: int, alpha: float, beta: float, transposition: TranspositionTable) -> float:
+    return Searcher(pos, transposition).negamax(depth, alpha, beta)
+
+
+def get_best_move_with_negamax(board: BoardLike, bot_mark: str, player_mark: str, depth: int, transposition: Optional[TranspositionTable] = None, time_limit: Optional[float] = None, max_nodes: Optional[int] = None, stats: Optional[Dict[str, Any]] = None, workers: Optional[int] = None, cancel: Optional[threading.Event] = None, eval_cache: Optional[EvalCache] = None, canonical: Optional[bool] = None, root_width: Optional[int] = None) -> Dict[str, int]:
+    """Sâu dần tới depth, dừng khi quá time_limit giây hoặc max_nodes node
+
+    Truyền dict vào stats để nhận thống kê của lượt tìm (Searcher.stats()).
+    canonical mặc định theo BOT_CANONICAL_TT. root_width là số nước gốc (mặc
+    định 12 khi depth >= 4, ngược lại 8). workers > 1 (hoặc BOT_WORKERS) thì các nước gốc được tìm song song
+    (parallel.py) trên TT của worker, không dùng transposition / eval_cache;
+    giới hạn max_nodes chỉ áp dụng cho tìm tuần tự.
+    """
+    # Mốc wall-clock cho tìm song song: tính từ lúc gọi, kể cả thời gian chờ pool
+    wall_deadline = time.time() + time_limit if time_limit is not None else None
+    pos = _as_position(board, bot_mark)
+    try:
+        color = color_of(bot_mark)
+        if transposition is None:
+            transposition = TranspositionTable()
+        transposition.new_search()
+        deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        if eval_cache is None:
+            eval_cache = EvalCache()
+        searcher = Searcher(pos, transposition, deadline, max_nodes, cancel=cancel,
+                            canonical=CANONICAL_TT if canonical is None else canonical, eval_cache=eval_cache)
+
+        moves = _candidate_moves(pos)
+        moves.sort(key=lambda m: _score_cell(pos, m, color), reverse=True)
+        moves = moves[:root_width or (12 if depth >= 4 else 8)]
+        tt_move = searcher.tt_move()
+        if tt_move in moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+
+        if max_nodes is None:
+            from parallel import parallel_root_search, worker_count
+            n_workers = worker_count(workers)
+            if n_workers > 1:
+                try:
+                    best_move, _, _ = parallel_root_search(pos, moves, depth, n_workers, time_limit, stats, cancel,
+                                                         deadline=wall_deadline)
+                    return pos.move_dict(best_move)
+                except (OSError, BrokenProcessPool) as e:
+                    logger.warning("Parallel search unavailable, searching serially: %s", e, extra={"event": "parallel_unavailable"})
+
+        best_move, _, completed = searcher.iterative_deepening(moves, depth)
+        if stats is not None:
+            stats.update(searcher.stats())
+            stats["depth"] = completed
+        return pos.move_dict(best_move)
+    except Exception:
+        logger.exception("Error in get_best_move_with_negamax", extra={"event": "search_error"})
+        center = pos.size // 2
         return {"x": center, "y": center}
 
-def calculate_bot_move(board: List[List[str]], bot_mark: str, difficulty: str = "medium", last_move: Optional[Dict[str, int]] = None) -> Dict[str, int]:
-    default_move = lambda: {"x": (len(board) // 2 if board else 10), "y": (len(board) // 2 if board else 10)}
+
+def calculate_bot_move(board: BoardLike, bot_mark: str, difficulty: str = "medium", last_move: Optional[Dict[str, int]] = None, session: Optional[GameSession] = None, time_limit: Optional[float] = None, max_nodes: Optional[int] = None, cancel: Optional[threading.Event] = None, stats: Optional[MoveStats] = None, background: bool = False) -> Dict[str, int]:
+    """board có thể là Position (bot_server.py giữ sẵn thế cờ) với bot đến lượt,
+    hoặc SparseBoard (sparse.py) cho bàn lớn / không giới hạn
+
+    difficulty là tên một Tier (budget.py). time_limit / max_nodes nếu có thì
+    thay ngân sách negamax của Tier; cả hai đều được GOVERNOR chia theo tải.
+    cancel được set từ thread khác thì dò đe dọa / negamax dừng sớm và trả
+    nước tốt nhất đã có. Tier có book tra sách khai cuộc (opening_book.py)
+    trước mọi bước khác. Truyền MoveStats (instrument.py) vào stats để nhận
+    thời gian từng bước và thống kê negamax của lượt này. background=True
+    (ponder) thì lượt này không tính vào tải của GOVERNOR.
+    """
+    with GOVERNOR.acquire(get_tier(difficulty), background) as tier:
+        if stats is None:
+            return _calculate_bot_move(board, bot_mark, tier, last_move, session, time_limit, max_nodes, cancel, None)
+        stats.difficulty = difficulty
+        stats.budget = tier.to_dict()
+        return stats.run(_calculate_bot_move, board, bot_mark, tier, last_move, session, time_limit, max_nodes, cancel, stats)
+
+
+def _pick_move(scored_moves: List[Tuple[int, float]], tier: Tier) -> int:
+    """Nước điểm cao nhất (ngẫu nhiên giữa các nước bằng điểm); với xác suất
+    tier.error_rate là một nước ngẫu nhiên trong scored_moves"""
+    if tier.error_rate >= 1 or (tier.error_rate > 0 and random.random() < tier.error_rate):
+        return random.choice(sorted(scored_moves, key=lambda m: m[1], reverse=True))[0]
+    max_score = max(score for _, score in scored_moves)
+    return random.choice([idx for idx, score in scored_moves if score == max_score])
+
+
+def _calculate_bot_move(board: BoardLike, bot_mark: str, tier: Tier, last_move: Optional[Dict[str, int]], session: Optional[GameSession],
+                        time_limit: Optional[float], max_nodes: Optional[int], cancel: Optional[threading.Event], stats: Optional[MoveStats]) -> Dict[str, int]:
+    if isinstance(board, SparseBoard):
+        return _sparse_bot_move(board, bot_mark, tier, last_move, session, time_limit, max_nodes, cancel, stats)
+    size = board.size if isinstance(board, Position) else len(board) if board else 0
+    default_move = lambda: {"x": (size // 2 if size else 10), "y": (size // 2 if size else 10)}
+    source = "fallback"
 
     move = None
     try:
-        if not board or not isinstance(board, list) or not board:
+        if not size or not isinstance(board, (list, Position)):
             return default_move()
         if not bot_mark or bot_mark not in ["X", "O"]:
             return default_move()
         player_mark = "O" if bot_mark == "X" else "X"
-        board_copy = [row[:] for row in board]
-
-        winning_move = find_winning_move(board_copy, bot_mark)
-        if winning_move:
-            return winning_move
-
-        blocking_move = find_blocking_move(board_copy, player_mark)
-        if blocking_move:
-            return blocking_move
-
-        dangerous_blocks = find_dangerous_patterns(board_copy, player_mark)
-        if dangerous_blocks:
-            return dangerous_blocks[0]["move"]
-
-        if difficulty == "easy":
-            moves = get_border_moves(board_copy)[:3]
-            if not moves:
+        color = color_of(bot_mark)
+        if isinstance(board, Position):
+            if board.side != color:
+                logger.warning("Position passed to calculate_bot_move is not the bot's turn", extra={"event": "wrong_turn"})
                 return default_move()
-            scored_moves = sorted([{"x": m["x"], "y": m["y"], "score": score_move(board_copy, m, bot_mark)} for m in moves], key=lambda m: m["score"], reverse=True)
-            move = random.choice(scored_moves)
-            return {"x": move["x"], "y": move["y"]}
-        elif difficulty == "medium":
-            move = get_best_heuristic_move(board_copy, bot_mark)
-        elif difficulty == "hard":
-            move = get_best_move_with_negamax(board_copy, bot_mark, player_mark, 5)
+            pos = board
+        else:
+            pos = Position.from_board(board, bot_mark)
+
+        if tier.book:
+            with timed(stats, "book"):
+                book = get_book()
+                booked = book.lookup(pos) if book is not None else None
+            if booked is not None:
+                source = "book"
+                return pos.move_dict(booked)
+
+        with timed(stats, "win_block"):
+            winning = _find_winning_cell(pos, color)
+            blocking = _find_winning_cell(pos, color ^ 1) if winning is None else None
+        if winning is not None:
+            source = "win"
+            return pos.move_dict(winning)
+        if blocking is not None:
+            source = "block"
+            return pos.move_dict(blocking)
+
+        with timed(stats, "threats"):
+            tactical = _tactical_cell(pos, color, tier.name, session, cancel, tier.threats)
+        if tactical is not None:
+            source = "threats"
+            return pos.move_dict(tactical)
+
+        if tier.search == "negamax":
+            if 0 < tier.error_rate and random.random() < tier.error_rate:
+                # Cố tình đi sai: nước ngẫu nhiên trong root_width nước tốt nhất theo heuristic
+                with timed(stats, "heuristic"):
+                    moves = sorted(_candidate_moves(pos), key=lambda m: _score_cell(pos, m, color), reverse=True)
+                    move = pos.move_dict(random.choice(moves[:tier.root_width or len(moves)]))
+                source = "error"
+                return move
+            if time_limit is None and max_nodes is None:
+                time_limit, max_nodes = tier.time_limit, tier.max_nodes
+            else:
+                time_limit = time_limit * tier.scale if time_limit is not None else None
+                max_nodes = max(1, int(max_nodes * tier.scale)) if max_nodes is not None else None
+            with timed(stats, "negamax"):
+                move = get_best_move_with_negamax(pos, bot_mark, player_mark, tier.depth, session.tt if session else None, time_limit, max_nodes,
+                                                  stats=stats.search if stats is not None else None,
+                                                  cancel=cancel, eval_cache=session.eval_cache if session else None,
+                                                  root_width=tier.root_width)
+            source = "negamax"
         else:
-            move = get_best_heuristic_move(board_copy, bot_mark)
+            with timed(stats, "heuristic"):
+                moves = _candidate_moves(pos)
+                if tier.root_width:
+                    moves = moves[:tier.root_width]
+                move = pos.move_dict(_pick_move([(idx, _score_cell(pos, idx, color)) for idx in moves], tier))
+            source = "heuristic" if tier.error_rate < 1 else "random"
     except Exception as error:
-        print(f"Lỗi trong calculate_bot_move: {error}")
+        logger.exception("Lỗi trong calculate_bot_move", extra={"event": "move_error", "difficulty": tier.name})
+        if stats is not None:
+            stats.error = repr(error)
+        source = "fallback"
         return default_move()
+    finally:
+        if stats is not None:
+            stats.source = source
 
     if not move or "x" not in move or "y" not in move or move["x"] < 0 or move["y"] < 0:
-        print("Invalid move generated, fallback to center")
+        logger.warning("Invalid move generated, fallback to center", extra={"event": "invalid_move", "move": move})
+        if stats is not None:
+            stats.source = "fallback"
         return default_move()
 
     return move
 
+
+def _sparse_bot_move(board: SparseBoard, bot_mark: str, tier: Tier, last_move: Optional[Dict[str, int]], session: Optional[GameSession],
+                     time_limit: Optional[float], max_nodes: Optional[int], cancel: Optional[threading.Event], stats: Optional[MoveStats]) -> Dict[str, int]:
+    """calculate_bot_move trên Position cắt quanh các quân (SparseBoard.to_position) rồi đổi lại tọa độ"""
+    pos, ox, oy = board.to_position()
+    if last_move is not None:
+        last_move = {"x": last_move["x"] - ox, "y": last_move["y"] - oy}
+    move = _calculate_bot_move(pos, bot_mark, tier, last_move, session, time_limit, max_nodes, cancel, stats)
+    return {"x": move["x"] + ox, "y": move["y"] + oy}
+
+
+def calculate_bot_moves_batch(requests: List[Tuple[BoardLike, str, str, Optional[Dict[str, int]]]]) -> List[Dict[str, int]]:
+    """calculate_bot_move cho nhiều ván trong một lần gọi; mỗi request là (board, bot_mark, difficulty, last_move)
+
+    Nước thắng / chặn và dò đe dọa vẫn chạy từng ván, còn điểm heuristic
+    (Tier heuristic như easy, medium) của mọi ván cùng kích thước được tính
+    một lần trên mảng (B, n, n). Tier negamax gọi thẳng calculate_bot_move.
+    Kết quả, kể cả các lần gọi random, giống gọi calculate_bot_move lần lượt
+    theo thứ tự requests (khi GOVERNOR không phải chia ngân sách dò đe dọa).
+    """
+    if not HAVE_NUMPY:
+        return [calculate_bot_move(board, mark, difficulty, last_move) for board, mark, difficulty, last_move in requests]
+
+    results: List[Optional[Dict[str, int]]] = [None] * len(requests)
+    pending: List[Tuple[int, Position, int, Tier]] = []
+    for i, (board, bot_mark, difficulty, last_move) in enumerate(requests):
+        tier = get_tier(difficulty)
+        if tier.search != "heuristic" or not bot_mark or bot_mark not in ["X", "O"] or not isinstance(board, list) or not board:
+            results[i] = calculate_bot_move(board, bot_mark, difficulty, last_move)
+            continue
+        try:
+            color = color_of(bot_mark)
+            pos = Position.from_board(board, bot_mark)
+            cell = _find_winning_cell(pos, color)
+            if cell is None:
+                cell = _find_winning_cell(pos, color ^ 1)
+            if cell is None:
+                with GOVERNOR.acquire(tier) as budget:
+                    cell = _tactical_cell(pos, color, tier.name, limits=budget.threats)
+        except Exception:
+            logger.exception("Lỗi trong calculate_bot_moves_batch", extra={"event": "move_error", "difficulty": difficulty})
+            results[i] = {"x": len(board) // 2, "y": len(board) // 2}
+            continue
+        if cell is not None:
+            results[i] = pos.move_dict(cell)
+        else:
+            pending.append((i, pos, color, tier))
+
+    # Chỉ chấm root_width ô đầu của frontier nếu Tier có giới hạn (như bản một ván)
+    moves = [_candidate_moves(pos)[:tier.root_width or None] for _, pos, _, tier in pending]
+    scores = score_positions_a([pos for _, pos, _, _ in pending], [color for _, _, color, _ in pending], moves)
+    for (i, pos, color, tier), cells, cell_scores in zip(pending, moves, scores):
+        results[i] = pos.move_dict(_pick_move(list(zip(cells, cell_scores)), tier))
+    return results
+
 # Export tương đương (trong Python, có thể import trực tiếp)
 __all__ = [
     "calculate_bot_move",
+    "calculate_bot_moves_batch",
     "find_winning_move",
     "find_blocking_move",
     "evaluate_board",
     "get_border_moves",
     "score_move",
-]
\ No newline at end of file
+]
@@ -0,0 +1,305 @@
+# analyze.py
+# Phân tích ván đã lưu theo luồng: mỗi dòng JSONL là một ván, mỗi nước được chấm
+# so với nước tốt nhất của bot (phục vụ replay, phát hiện gian lận, chỉnh độ khó)
+#
+#   python analyze.py games.jsonl > plies.jsonl
+#   cat games.jsonl | python analyze.py --engine negamax --nodes 3000
+#   python analyze.py --shard 2/8 archive.jsonl                   # ván thứ i với i % 8 == 2
+#   python analyze.py --workers 4 -o out/ 2024-*.jsonl            # mỗi file một process, out/<tên file>
+#
+# Ván vào: {"id": ..., "size": 15, "moves": [[x, y], ...], "first": "X"} (moves
+# nhận cả {"x", "y"}; first mặc định X). Các nước được đi lần lượt trên một
+# Position duy nhất (make, không dựng lại bàn) và kết quả được ghi ra ngay
+# theo từng nước, nên bộ nhớ không phụ thuộc số ván.
+#
+# Mỗi nước ra một dòng {"type": "ply", game, ply, mark, move, best, score,
+# best_score, rank, candidates, blunder, reason}, hết ván thêm một dòng
+# {"type": "game", ...} tổng kết. Ván lỗi (JSON hỏng, nước không hợp lệ) ra
+# dòng {"type": "error"} và không làm dừng cả luồng.
+#
+# Engine heuristic: best là nước có điểm _score_cell cao nhất, score là điểm
+# đó của nước đã đi. Engine negamax: best và score là điểm tìm (theo bên vừa
+# đi) với ngân sách --nodes node mỗi nước, TT dùng chung suốt ván. Nước bỏ
+# lỡ nước thắng ngay hoặc không chặn nước thắng của đối phương luôn là
+# blunder; với negamax thì cả nước kém nước tốt nhất từ --margin điểm trở lên.
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from a import SearchTimeout, Searcher, _candidate_moves, _find_winning_cell, _score_cell
+from instrument import configure_logging
+from position import MARKS, Position, color_of
+from transposition import EvalCache, TranspositionTable
+
+ENGINES = ("heuristic", "negamax")
+ANALYZE_DEPTH = 4
+ANALYZE_NODES = 3000
+# Số nước gốc negamax xét (theo điểm tĩnh); nước đã đi luôn được xét thêm
+ANALYZE_WIDTH = 12
+BLUNDER_MARGIN = 3000
+
+logger = logging.getLogger(__name__)
+
+
+class GameError(ValueError):
+    pass
+
+
+def read_games(stream: Iterable[str], shard: Tuple[int, int] = (0, 1)) -> Iterator[Tuple[int, Any]]:
+    """(số thứ tự dòng, ván đã parse hoặc GameError) của các dòng thuộc shard (k, n): dòng i với i % n == k"""
+    k, n = shard
+    for i, line in enumerate(stream):
+        if i % n != k or not line.strip():
+            continue
+        try:
+            game = json.loads(line)
+            if not isinstance(game, dict) or not isinstance(game.get("moves"), list):
+                raise GameError("expected an object with a moves list")
+            yield i, game
+        except (ValueError, GameError) as e:
+            yield i, GameError(f"line {i + 1}: {e}")
+
+
+def _move_index(pos: Position, move: Any) -> int:
+    x, y = (move["x"], move["y"]) if isinstance(move, dict) else move
+    if not (isinstance(x, int) and isinstance(y, int) and 0 <= x < pos.size and 0 <= y < pos.size):
+        raise GameError(f"move {move!r} is off the board")
+    idx = pos.index(x, y)
+    if pos.cells[idx]:
+        raise GameError(f"move {move!r} is on an occupied cell")
+    return idx
+
+
+def _wins_after(pos: Position, move: int, color: int) -> bool:
+    """Sau nước move của bên đang đi, color còn ô thắng ngay không"""
+    pos.make(move)
+    try:
+        return _find_winning_cell(pos, color) is not None
+    finally:
+        pos.unmake()
+
+
+class Analyzer:
+    """Chấm từng nước của một ván; dùng lại được cho nhiều ván
+
+    TT được xóa đầu mỗi ván nên kết quả của một ván không phụ thuộc các ván
+    chạy trước nó (cùng kết quả dù chia shard thế nào). Cache điểm lá chỉ
+    chứa điểm tĩnh nên giữ lại.
+    """
+
+    def __init__(self, engine: str = "heuristic", depth: int = ANALYZE_DEPTH, nodes: int = ANALYZE_NODES,
+                 margin: float = BLUNDER_MARGIN, width: int = ANALYZE_WIDTH):
+        if engine not in ENGINES:
+            raise ValueError(f"unknown engine {engine!r}")
+        self.engine = engine
+        self.depth = depth
+        self.nodes = nodes
+        self.margin = margin
+        self.width = width
+        self.tt = TranspositionTable() if engine == "negamax" else None
+        self.eval_cache = EvalCache() if engine == "negamax" else None
+
+    def _search(self, pos: Position, moves: List[int], depth: int) -> Tuple[int, float, int]:
+        self.tt.new_search()
+        searcher = Searcher(pos, self.tt, max_nodes=self.nodes, eval_cache=self.eval_cache)
+        return searcher.iterative_deepening(moves, depth)
+
+    def _negamax(self, pos: Position, ranked: List[int], played: int) -> Tuple[int, float, Optional[float]]:
+        """(nước tốt nhất, điểm của nó, điểm của nước đã đi) theo bên đang đi"""
+        moves = ranked[:self.width]
+        if played not in moves:
+            moves.append(played)
+        best, best_value, completed = self._search(pos, moves, self.depth)
+        if best == played:
+            return best, best_value, best_value
+        # Tìm riêng nước đã đi tới cùng độ sâu (cửa sổ đầy đủ nên điểm chính xác); TT vừa ấm nên rẻ
+        try:
+            searcher = Searcher(pos, self.tt, max_nodes=self.nodes, eval_cache=self.eval_cache)
+            _, played_value = searcher.search_root([played], max(completed, 1))
+        except SearchTimeout:
+            played_value = None
+        return best, best_value, played_value
+
+    def analyze(self, game: Dict[str, Any], game_id: Any = None) -> Iterator[Dict[str, Any]]:
+        """Các dòng "ply" của ván rồi dòng "game"; nước không hợp lệ ném GameError"""
+        size = game.get("size", 15)
+        first = game.get("first", "X")
+        if not isinstance(size, int) or not 5 <= size <= 64 or first not in MARKS:
+            raise GameError(f"bad size {size!r} or first {first!r}")
+        game_id = game.get("id", game_id)
+        pos = Position(size, color_of(first))
+        if self.tt is not None:
+            # Một TT cho cả ván: thế ở nước sau là con của thế ở nước trước
+            self.tt.clear()
+        blunders = {mark: 0 for mark in MARKS}
+        ranks: Dict[str, List[int]] = {mark: [] for mark in MARKS}
+        start = time.perf_counter()
+        winner = None
+        for ply, move in enumerate(game["moves"], 1):
+            if winner is not None:
+                raise GameError(f"move {ply} after the game was won")
+            color = pos.side
+            played = _move_index(pos, move)
+            record = {"type": "ply", "game": game_id, "ply": ply, **self.evaluate(pos, played)}
+            mark = record["mark"]
+            blunders[mark] += record["blunder"]
+            ranks[mark].append(record["rank"])
+            pos.make(played)
+            if pos.last_move_wins():
+                winner = MARKS[color]
+            yield record
+        yield {
+            "type": "game",
+            "game": game_id,
+            "plies": len(game["moves"]),
+            "winner": winner,
+            "blunders": blunders,
+            "mean_rank": {mark: round(sum(r) / len(r), 2) if r else None for mark, r in ranks.items()},
+            "seconds": round(time.perf_counter() - start, 4),
+        }
+
+    def evaluate(self, pos: Position, played: int) -> Dict[str, Any]:
+        """Chấm nước played của bên đang đi (chưa đi trên pos)"""
+        color = pos.side
+        candidates = _candidate_moves(pos)
+        if played not in candidates:
+            candidates.append(played)
+        scores = {m: _score_cell(pos, m, color) for m in candidates}
+        ranked = sorted(candidates, key=scores.__getitem__, reverse=True)
+        rank = 1 + sum(1 for m in candidates if scores[m] > scores[played])
+
+        reason = None
+        win = _find_winning_cell(pos, color)
+        threat = _find_winning_cell(pos, color ^ 1) if win is None else None
+        if win is not None:
+            best = win
+            if not pos.wins_if_played(played, color):
+                reason = "missed_win"
+        elif threat is not None:
+            best = threat
+            # Chỉ tính là blunder khi chặn được: đối phương có hai ô thắng thì đằng nào cũng thua
+            if _wins_after(pos, played, color ^ 1) and not _wins_after(pos, threat, color ^ 1):
+                reason = "missed_block"
+        else:
+            best = ranked[0]
+
+        if self.engine == "negamax":
+            forced = [best] if win is not None or threat is not None else []
+            best, best_score, score = self._negamax(pos, forced + [m for m in ranked if m not in forced], played)
+            if reason is None and score is not None and best_score - score >= self.margin:
+                reason = "eval_drop"
+        else:
+            best_score, score = scores[best], scores[played]
+
+        return {
+            "mark": MARKS[color],
+            "move": list(pos.coords(played)),
+            "best": list(pos.coords(best)),
+            "score": score,
+            "best_score": best_score,
+            "rank": rank,
+            "candidates": len(candidates),
+            "blunder": reason is not None,
+            "reason": reason,
+        }
+
+
+def analyze_stream(lines: Iterable[str], out: TextIO, analyzer: Analyzer, shard: Tuple[int, int] = (0, 1)) -> Dict[str, int]:
+    """Phân tích từng ván trong lines và ghi kết quả ra out ngay; trả về số ván / nước / lỗi / blunder"""
+    totals = {"games": 0, "plies": 0, "errors": 0, "blunders": 0}
+    for line_no, game in read_games(lines, shard):
+        try:
+            if isinstance(game, GameError):
+                raise game
+            for record in analyzer.analyze(game, line_no):
+                out.write(json.dumps(record) + "\n")
+                if record["type"] == "ply":
+                    totals["plies"] += 1
+                    totals["blunders"] += record["blunder"]
+            totals["games"] += 1
+        except GameError as e:
+            totals["errors"] += 1
+            game_id = game.get("id", line_no) if isinstance(game, dict) else line_no
+            logger.warning("Skipping game %s: %s", game_id, e, extra={"event": "analyze_error", "game": game_id})
+            out.write(json.dumps({"type": "error", "game": game_id, "error": str(e)}) + "\n")
+    return totals
+
+
+def _init_worker() -> None:
+    # Mỗi file một process: negamax không mở pool con
+    import parallel
+    parallel.WORKERS = 1
+
+
+def analyze_file(task: Tuple[str, str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Chạy trong worker: phân tích một file vào output_dir/<tên file>"""
+    path, output_dir, options = task
+    target = os.path.join(output_dir, os.path.basename(path))
+    start = time.perf_counter()
+    with open(path) as src, open(target, "w") as out:
+        totals = analyze_stream(src, out, Analyzer(**options))
+    return {"file": path, "output": target, **totals, "seconds": round(time.perf_counter() - start, 2)}
+
+
+def run_sharded(paths: List[str], output_dir: str, options: Dict[str, Any], workers: int) -> Iterator[Dict[str, Any]]:
+    """Chia các file cho workers process; trả kết quả từng file theo thứ tự xong"""
+    os.makedirs(output_dir, exist_ok=True)
+    names = [os.path.basename(p) for p in paths]
+    if len(set(names)) != len(names):
+        raise ValueError("input files must have distinct names (outputs are written as output_dir/<name>)")
+    with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+        # Mỗi file một task: bộ nhớ của worker chỉ phụ thuộc một ván đang chấm
+        yield from pool.map(analyze_file, [(p, output_dir, options) for p in paths])
+
+
+def _parse_shard(text: str) -> Tuple[int, int]:
+    k, _, n = text.partition("/")
+    shard = int(k), int(n)
+    if not 0 <= shard[0] < shard[1]:
+        raise argparse.ArgumentTypeError(f"bad shard {text!r}, expected K/N with 0 <= K < N")
+    return shard
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Phân tích ván đã lưu (JSONL) theo từng nước")
+    parser.add_argument("files", nargs="*", help="file JSONL (mặc định: stdin)")
+    parser.add_argument("--engine", choices=ENGINES, default="heuristic")
+    parser.add_argument("--depth", type=int, default=ANALYZE_DEPTH, help="độ sâu negamax")
+    parser.add_argument("--nodes", type=int, default=ANALYZE_NODES, help="ngân sách node negamax mỗi nước")
+    parser.add_argument("--margin", type=float, default=BLUNDER_MARGIN, help="mức tụt điểm negamax tính là blunder")
+    parser.add_argument("--shard", type=_parse_shard, default=(0, 1), metavar="K/N", help="chỉ các ván thứ i với i %% N == K")
+    parser.add_argument("--workers", type=int, default=1, help="số process, mỗi file một task (cần -o)")
+    parser.add_argument("-o", "--output-dir", help="ghi kết quả của từng file vào thư mục này thay vì stdout")
+    args = parser.parse_args()
+    configure_logging()
+
+    options = {"engine": args.engine, "depth": args.depth, "nodes": args.nodes, "margin": args.margin}
+    if args.output_dir:
+        if not args.files:
+            parser.error("--output-dir needs input files")
+        if args.shard != (0, 1):
+            parser.error("--shard applies to a single stream; use --workers with --output-dir")
+        for result in run_sharded(args.files, args.output_dir, options, max(1, args.workers)):
+            print(json.dumps(result), file=sys.stderr)
+        return
+    if args.workers > 1:
+        parser.error("--workers needs --output-dir")
+
+    analyzer = Analyzer(**options)
+    totals = {"games": 0, "plies": 0, "errors": 0, "blunders": 0}
+    for path in args.files or ["-"]:
+        with (open(path) if path != "-" else nullcontext(sys.stdin)) as src:
+            for key, value in analyze_stream(src, sys.stdout, analyzer, args.shard).items():
+                totals[key] += value
+    print(json.dumps(totals), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+import heapq
+from itertools import product
+
 # ================== CONFIG ==================
 
 SCORES = {
@@ -54,6 +57,67 @@ def expand_scores(scores):
 SCORES_EXPANDED = expand_scores(SCORES)
 
 
+def build_window_table(scores_expanded):
+    """Bảng tra: chuỗi 9 ô -> (tổng điểm, các pattern khớp theo đúng thứ tự)
+
+    Duyệt mọi chuỗi 9 ký tự X/O/_ một lần thay cho việc chạy `in` với từng
+    pattern ở mỗi ô, mỗi hướng.
+    """
+    groups = [scores_expanded[g] for g in ["4", "3", "2", "1"]]
+    table = {}
+    for cells in product("X_O", repeat=9):
+        line = "".join(cells)
+        score = 0
+        patterns = []
+        for group in groups:
+            for e in group:
+                if e["pattern"] in line:
+                    score += e["score"]
+                    patterns.append(e["pattern"])
+        table[line] = (score, tuple(patterns))
+    return table
+
+
+_WINDOW_TABLE = None
+
+
+def get_window_table():
+    """Dựng bảng tra từ SCORES ở lần dùng đầu tiên"""
+    global _WINDOW_TABLE
+    if _WINDOW_TABLE is None:
+        _WINDOW_TABLE = build_window_table(SCORES_EXPANDED)
+    return _WINDOW_TABLE
+
+
+_RAW_TABLES = None
+_VECTORIZE_MIN_SIZE = None
+
+
+def _vectorize_min_size():
+    """Kích thước bàn từ đó dùng backend NumPy (vectorized.py), vô cực nếu không có NumPy"""
+    global _VECTORIZE_MIN_SIZE
+    if _VECTORIZE_MIN_SIZE is None:
+        try:
+            from vectorized import HAVE_NUMPY, VECTORIZE_MIN_SIZE
+        except ImportError:
+            HAVE_NUMPY = False
+        _VECTORIZE_MIN_SIZE = VECTORIZE_MIN_SIZE if HAVE_NUMPY else float("inf")
+    return _VECTORIZE_MIN_SIZE
+
+
+def get_raw_window_tables():
+    """Bảng tra theo bytes của bàn cờ gốc (X/O/_) cho từng góc nhìn"""
+    global _RAW_TABLES
+    if _RAW_TABLES is None:
+        table = get_window_table()
+        swap = str.maketrans("XO", "OX")
+        _RAW_TABLES = {
+            "X": {line.encode(): e for line, e in table.items()},
+            "O": {line.translate(swap).encode(): e for line, e in table.items()},
+        }
+    return _RAW_TABLES
+
+
 def normalize_board(board, mark):
     """Đổi board về góc nhìn của mark"""
     opp = "O" if mark == "X" else "X"
@@ -108,17 +172,48 @@ def print_board(board):
 # ================== CORE ==================
 
 def evaluate_cell(board, x, y, multiplier=1.0):
+    table = get_window_table()
     score = 0
     patterns = []
 
     for dx, dy in DIRECTIONS:
-        line = get_line_pattern(board, x, y, dx, dy)
-        for group in ["4", "3", "2", "1"]:
-            for e in SCORES_EXPANDED[group]:
-                if e["pattern"] in line:
-                    score += e["score"] * multiplier
-                    patterns.append(e["pattern"])
+        base, matched = table[get_line_pattern(board, x, y, dx, dy)]
+        if matched:
+            score += base * multiplier
+            patterns.extend(matched)
+
+    return score, patterns
+
 
+def padded_board_string(board, mark):
+    """Bàn cờ thành một chuỗi phẳng theo góc nhìn của mark, đệm 4 ô '_' mỗi phía
+
+    Trả về (chuỗi, độ rộng hàng). Cửa sổ 9 ô theo mọi hướng là một lát cắt
+    có bước nhảy, không cần kiểm tra biên.
+    """
+    opp = "O" if mark == "X" else "X"
+    n = len(board)
+    w = n + 8
+    parts = ["_" * (4 * w)]
+    for row in board:
+        parts.append("____")
+        parts.append("".join("X" if c == mark else "O" if c == opp else "_" for c in row))
+        parts.append("____")
+    parts.append("_" * (4 * w))
+    return "".join(parts), w
+
+
+def evaluate_cell_padded(flat, w, x, y, multiplier=1.0):
+    """evaluate_cell trên chuỗi của padded_board_string"""
+    table = get_window_table()
+    score = 0
+    patterns = []
+    c = (x + 4) * w + y + 4
+    for step in (w, 1, w + 1, w - 1):
+        base, matched = table[flat[c - 4 * step:c + 4 * step + 1:step]]
+        if matched:
+            score += base * multiplier
+            patterns.extend(matched)
     return score, patterns
 
 
@@ -137,18 +232,51 @@ def get_border_cells(board):
     return list(s)
 
 
-def evaluate_board(board, current_mark):
-    """Đánh giá bàn cờ cho lượt current_mark"""
+def evaluate_sparse(board, current_mark):
+    """evaluate_board trên SparseBoard (sparse.py): chỉ duyệt ô cạnh quân và đọc cửa sổ từ chỉ mục theo đường"""
+    table = get_window_table()
     opp = "O" if current_mark == "X" else "X"
+    result = {}
+    for cell in board.border_cells():
+        atk, p_atk, defn, p_def = 0, [], 0, []
+        for d in range(4):
+            base, matched = table[board.line_string(cell, d, current_mark)]
+            if matched:
+                atk += base * 1.5
+                p_atk.extend(matched)
+            base, matched = table[board.line_string(cell, d, opp)]
+            if matched:
+                defn += base * 1.0
+                p_def.extend(matched)
+        result[cell] = {
+            "score": atk + defn,
+            "attack": atk,
+            "defense": defn,
+            "patterns_bot": p_atk,
+            "patterns_opp": p_def
+        }
+    return result
+
+
+def evaluate_board(board, current_mark):
+    """Đánh giá bàn cờ cho lượt current_mark; board là List[List] hoặc SparseBoard"""
+    if not isinstance(board, list):
+        return evaluate_sparse(board, current_mark)
     border = get_border_cells(board)
+    if len(board) >= _vectorize_min_size():
+        from vectorized import evaluate_board_b
+        # Cùng thứ tự khóa như bản thuần Python để best_move chọn cùng ô khi bằng điểm
+        return evaluate_board_b(board, current_mark, border)
+
+    opp = "O" if current_mark == "X" else "X"
 
-    board_bot = normalize_board(board, current_mark)
-    board_opp = normalize_board(board, opp)
+    flat_bot, w = padded_board_string(board, current_mark)
+    flat_opp, _ = padded_board_string(board, opp)
 
     result = {}
     for x, y in border:
-        atk, p_atk = evaluate_cell(board_bot, x, y, 1.5)
-        defn, p_def = evaluate_cell(board_opp, x, y, 1.0)
+        atk, p_atk = evaluate_cell_padded(flat_bot, w, x, y, 1.5)
+        defn, p_def = evaluate_cell_padded(flat_opp, w, x, y, 1.0)
 
         result[(x, y)] = {
             "score": atk + defn,
@@ -165,6 +293,169 @@ def best_move(board, current_mark):
     return max(scores.items(), key=lambda x: x[1]["score"])
 
 
+def best_moves_batch(boards, current_marks):
+    """best_move cho nhiều bàn; các bàn cùng kích thước được chấm chung một lần bằng NumPy
+
+    Kết quả giống gọi best_move lần lượt, kể cả ô được chọn khi nhiều ô bằng điểm.
+    """
+    if _vectorize_min_size() == float("inf"):
+        return [best_move(board, mark) for board, mark in zip(boards, current_marks)]
+    from vectorized import cell_info_b, score_boards_b
+
+    # Cùng thứ tự duyệt ô như evaluate_board để khi bằng điểm chọn cùng một ô
+    borders = [get_border_cells(board) for board in boards]
+    results = []
+    for border, (atk, defn, codes_bot, codes_opp) in zip(borders, score_boards_b(boards, current_marks, borders)):
+        k = max(range(len(border)), key=lambda k: atk[k] + defn[k])
+        results.append((border[k], cell_info_b(atk[k], defn[k], codes_bot[k], codes_opp[k])))
+    return results
+
+
+def _combine(atk_entries, def_entries):
+    """Ghép điểm 4 hướng thành một ô như evaluate_board"""
+    atk = 0
+    p_atk = []
+    for base, matched in atk_entries:
+        if matched:
+            atk += base * 1.5
+            p_atk.extend(matched)
+    defn = 0
+    p_def = []
+    for base, matched in def_entries:
+        if matched:
+            defn += base * 1.0
+            p_def.extend(matched)
+    return {
+        "score": atk + defn,
+        "attack": atk,
+        "defense": defn,
+        "patterns_bot": p_atk,
+        "patterns_opp": p_def
+    }
+
+
+class BoardAnalyzer:
+    """Đánh giá tăng dần: play/undo chỉ tính lại các ô trong tầm 4 ô theo 4 hướng
+
+    Giữ điểm từng hướng của mọi ô biên cho cả hai góc nhìn, và một heap (xóa
+    lười theo version) cho mỗi bên để lấy best_move. Mỗi nước đi tốn
+    O(số ô bị ảnh hưởng) thay vì O(N^2).
+    """
+
+    def __init__(self, board):
+        n = len(board)
+        self.n = n
+        self.w = n + 8
+        self.steps = (self.w, 1, self.w + 1, self.w - 1)
+        self.board = [[None] * n for _ in range(n)]
+        self.flat = bytearray(b"_" * (self.w * self.w))
+        self.near = [0] * (n * n)
+        self.tables = get_raw_window_tables()
+        self.entries = {}   # ô -> (4 hướng góc nhìn X, 4 hướng góc nhìn O)
+        self.version = [0] * (n * n)
+        self.heaps = {"X": [], "O": []}
+        self.history = []
+
+        for x in range(n):
+            for y in range(n):
+                if board[x][y] is not None:
+                    self._set(x, y, board[x][y])
+        for cell in range(n * n):
+            if self.near[cell] and self.board[cell // n][cell % n] is None:
+                self._refresh(cell)
+
+    def _set(self, x, y, mark):
+        n = self.n
+        self.board[x][y] = mark
+        self.flat[(x + 4) * self.w + y + 4] = ord(mark) if mark else ord("_")
+        delta = 1 if mark else -1
+        for nx in range(max(x - 1, 0), min(x + 2, n)):
+            for ny in range(max(y - 1, 0), min(y + 2, n)):
+                if nx != x or ny != y:
+                    self.near[nx * n + ny] += delta
+
+    def _refresh(self, cell):
+        """Tính lại một ô (hoặc bỏ ô khỏi danh sách nếu không còn là ô biên)"""
+        n = self.n
+        x, y = divmod(cell, n)
+        self.version[cell] += 1
+        if self.board[x][y] is not None or not self.near[cell]:
+            self.entries.pop(cell, None)
+            return
+        flat = self.flat
+        c = (x + 4) * self.w + y + 4
+        windows = [bytes(flat[c - 4 * st:c + 4 * st + 1:st]) for st in self.steps]
+        ex = tuple(self.tables["X"][wd] for wd in windows)
+        eo = tuple(self.tables["O"][wd] for wd in windows)
+        self.entries[cell] = (ex, eo)
+        version = self.version[cell]
+        heapq.heappush(self.heaps["X"], (-_combine(ex, eo)["score"], cell, version))
+        heapq.heappush(self.heaps["O"], (-_combine(eo, ex)["score"], cell, version))
+
+    def _affected(self, x, y):
+        n = self.n
+        out = {x * n + y}
+        for dx, dy in DIRECTIONS:
+            for i in range(-4, 5):
+                nx, ny = x + dx * i, y + dy * i
+                if 0 <= nx < n and 0 <= ny < n:
+                    out.add(nx * n + ny)
+        # Ô kề theo 8 hướng đã nằm trên 4 đường ở trên
+        return out
+
+    def _update(self, x, y):
+        for cell in self._affected(x, y):
+            self._refresh(cell)
+        for mark, heap in self.heaps.items():
+            if len(heap) > 4 * len(self.entries) + 64:
+                self._rebuild_heap(mark)
+
+    def _rebuild_heap(self, mark):
+        heap = []
+        for cell, (ex, eo) in self.entries.items():
+            info = _combine(ex, eo) if mark == "X" else _combine(eo, ex)
+            heap.append((-info["score"], cell, self.version[cell]))
+        heapq.heapify(heap)
+        self.heaps[mark] = heap
+
+    def play(self, x, y, mark):
+        if self.board[x][y] is not None:
+            raise ValueError(f"Ô ({x},{y}) đã có quân")
+        self._set(x, y, mark)
+        self.history.append((x, y))
+        self._update(x, y)
+
+    def undo(self):
+        x, y = self.history.pop()
+        self._set(x, y, None)
+        self._update(x, y)
+        return x, y
+
+    def cell_info(self, cell, current_mark):
+        ex, eo = self.entries[cell]
+        return _combine(ex, eo) if current_mark == "X" else _combine(eo, ex)
+
+    def evaluate(self, current_mark):
+        """Giống evaluate_board(board, current_mark) nhưng lấy từ cache"""
+        n = self.n
+        return {divmod(cell, n): self.cell_info(cell, current_mark) for cell in self.entries}
+
+    def best_move(self, current_mark):
+        """((x, y), info) có điểm cao nhất, None nếu không còn ô biên
+
+        Điểm giống best_move(evaluate_board(...)) nhưng khi nhiều ô bằng điểm
+        thì lấy ô đầu theo thứ tự hàng (x, y nhỏ nhất), còn hàm kia lấy ô đầu
+        theo thứ tự của get_border_cells(): ô được chọn có thể khác.
+        """
+        heap = self.heaps[current_mark]
+        while heap:
+            _, cell, version = heap[0]
+            if cell in self.entries and self.version[cell] == version:
+                return divmod(cell, self.n), self.cell_info(cell, current_mark)
+            heapq.heappop(heap)
+        return None
+
+
 # ================== DEMO ==================
 
 if __name__ == "__main__":
@@ -178,22 +469,24 @@ if __name__ == "__main__":
     print_board(board)
 
     current = "X"
+    analyzer = BoardAnalyzer(board)
 
     for turn in range(1, 150):   # chạy 10 lượt
         print(f"===== TURN {turn} | {current} =====")
 
-        scores = evaluate_board(board, current)
-        if not scores:
+        best = analyzer.best_move(current)
+        if best is None:
             print("No possible moves!")
             break
 
-        (x, y), info = max(scores.items(), key=lambda x: x[1]["score"])
+        (x, y), info = best
 
         print(f"Move: {current} -> ({x},{y})")
         print(f"Score: {info['score']}")
         print(f"Attack: {info['patterns_bot']}")
         print(f"Defense: {info['patterns_opp']}")
 
+        analyzer.play(x, y, current)
         board[x][y] = current
         print_board(board)
 
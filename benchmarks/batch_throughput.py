@@ -0,0 +1,83 @@
+# batch_throughput.py
+# Số nước/giây khi gọi từng ván (calculate_bot_move, best_move) so với gọi theo lô
+# (calculate_bot_moves_batch, best_moves_batch) ở các kích thước lô khác nhau
+#
+#   python benchmarks/batch_throughput.py
+#   python benchmarks/batch_throughput.py --engine b --sizes 1 16 64 256 --json
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from a import calculate_bot_move, calculate_bot_moves_batch  # noqa: E402
+from b import best_move, best_moves_batch  # noqa: E402
+from search_nodes import POSITIONS  # noqa: E402
+
+
+def make_boards(count, size=15, seed=0):
+    """count bàn khác nhau: tiền tố ngẫu nhiên (cố định theo seed) của các thế trong POSITIONS"""
+    rng = random.Random(seed)
+    games = list(POSITIONS.values())
+    boards = []
+    for _ in range(count):
+        moves = rng.choice(games)
+        moves = moves[:rng.randint(len(moves) // 2, len(moves))]
+        board = [[None] * size for _ in range(size)]
+        for i, (x, y) in enumerate(moves):
+            board[x][y] = "XO"[i % 2]
+        boards.append((board, "XO"[len(moves) % 2]))
+    return boards
+
+
+def run(engine, sizes, board_size=15, repeat=3):
+    results = []
+    for batch in sizes:
+        boards = make_boards(batch, board_size, seed=batch)
+        if engine == "b":
+            single = lambda: [best_move(board, mark) for board, mark in boards]
+            batched = lambda: best_moves_batch([board for board, _ in boards], [mark for _, mark in boards])
+        else:
+            difficulty = engine.split("-")[1]
+            requests = [(board, mark, difficulty, None) for board, mark in boards]
+            single = lambda: [calculate_bot_move(board, mark, difficulty, None) for board, mark, difficulty, _ in requests]
+            batched = lambda: calculate_bot_moves_batch(requests)
+        row = {"engine": engine, "batch_size": batch}
+        for name, fn in (("single", single), ("batch", batched)):
+            best = float("inf")
+            for _ in range(repeat):
+                random.seed(0)
+                start = time.perf_counter()
+                fn()
+                best = min(best, time.perf_counter() - start)
+            row[name] = round(batch / best, 1)
+        row["speedup"] = round(row["batch"] / row["single"], 2)
+        results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput của API theo lô so với gọi từng ván")
+    parser.add_argument("--engine", choices=["a-easy", "a-medium", "b"], default="a-medium")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--board-size", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="in kết quả dạng JSON")
+    args = parser.parse_args()
+
+    results = run(args.engine, args.sizes, args.board_size, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'engine':<10} {'batch':>6} {'single/s':>10} {'batch/s':>10} {'speedup':>8}")
+    for r in results:
+        print(f"{r['engine']:<10} {r['batch_size']:>6} {r['single']:>10.1f} {r['batch']:>10.1f} {r['speedup']:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
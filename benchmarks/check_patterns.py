@@ -0,0 +1,180 @@
+# check_patterns.py
+# Kiểm tra bảng tra mẫu (patterns.py) của a.py cho kết quả giống hệt bản chấm
+# điểm cũ dựng chuỗi trên List[List]: score_move của mọi ô trống (cả hai quân),
+# evaluate_line của mọi quân theo 4 hướng, evaluate_board, trên bàn ngẫu nhiên
+#
+#   python benchmarks/check_patterns.py
+#   python benchmarks/check_patterns.py --boards 500 --seed 3 --json
+#
+# Các hàm ref_* là bản cũ giữ nguyên (kể cả chỗ đường bị cắt ở offset -5:
+# ô đó ngoài bàn thì hướng đó không có điểm). Exit 1 nếu có chỗ khác.
+
+import argparse
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import a  # noqa: E402
+
+DIRS = [(1, 0), (0, 1), (1, 1), (1, -1)]
+
+
+def ref_check_patterns_in_line(line, mark):
+    pattern = "".join("X" if c == mark else "_" if c is None else "O" for c in line)
+    prio = 0
+    if "XXXX" in pattern:
+        prio += 10000
+    if "_XXX_" in pattern:
+        prio += 5000
+    if "XX_X" in pattern:
+        prio += 3000
+    if "XXX_X" in pattern:
+        prio += 8000
+    if "_XXXX" in pattern:
+        prio += 10000
+    if "XXXX_" in pattern:
+        prio += 10000
+    return prio
+
+
+def _ref_line(board, x, y, dx, dy):
+    line = []
+    pos = -5
+    while pos <= 5:
+        nx = x + dx * pos
+        ny = y + dy * pos
+        if not (0 <= nx < len(board) and 0 <= ny < len(board[0])):
+            break
+        line.append(board[nx][ny])
+        pos += 1
+    return line
+
+
+def ref_score_move(board, move, bot_mark):
+    x, y = move["x"], move["y"]
+    opponent_mark = "O" if bot_mark == "X" else "X"
+
+    board[x][y] = bot_mark
+    attack = threat_dirs = 0
+    for dx, dy in DIRS:
+        prio = ref_check_patterns_in_line(_ref_line(board, x, y, dx, dy), bot_mark)
+        attack += prio
+        if prio > 1000:
+            threat_dirs += 1
+    if threat_dirs >= 2:
+        attack += 2000
+    if threat_dirs >= 3:
+        attack += 5000
+
+    board[x][y] = opponent_mark
+    defense = sum(ref_check_patterns_in_line(_ref_line(board, x, y, dx, dy), opponent_mark) for dx, dy in DIRS)
+    board[x][y] = None
+    return attack + defense * 1.5
+
+
+def ref_evaluate_line(board, x, y, dx, dy, mark, opponent_mark):
+    n = len(board)
+    max_consecutive = 0
+    open_ends = 0
+
+    consecutive = 0
+    for i in range(6):
+        nx, ny = x + dx * i, y + dy * i
+        if not (0 <= nx < n and 0 <= ny < n) or board[nx][ny] == opponent_mark:
+            break
+        if board[nx][ny] == mark:
+            consecutive += 1
+            max_consecutive = max(max_consecutive, consecutive)
+        else:
+            consecutive = 0
+
+    consecutive = 0
+    for i in range(1, 6):
+        nx, ny = x - dx * i, y - dy * i
+        if not (0 <= nx < n and 0 <= ny < n) or board[nx][ny] == opponent_mark:
+            break
+        if board[nx][ny] == mark:
+            consecutive += 1
+            max_consecutive = max(max_consecutive, consecutive)
+        else:
+            consecutive = 0
+
+    for sx, sy in ((x - dx, y - dy), (x + dx, y + dy)):
+        if 0 <= sx < n and 0 <= sy < n and board[sx][sy] is None:
+            open_ends += 1
+
+    if max_consecutive >= 5:
+        return 1000000
+    table = {(4, 2): 50000, (4, 1): 10000, (4, 0): 1000, (3, 2): 5000, (3, 1): 500, (3, 0): 50,
+             (2, 2): 100, (2, 1): 10, (2, 0): 2, (1, 2): 5}
+    return table.get((max_consecutive, min(open_ends, 2)), 1)
+
+
+def ref_evaluate_board(board, mark):
+    opponent_mark = "O" if mark == "X" else "X"
+    n = len(board)
+    return sum(ref_evaluate_line(board, x, y, dx, dy, mark, opponent_mark) / 4
+               for x in range(n) for y in range(n) if board[x][y] == mark for dx, dy in DIRS)
+
+
+def random_board(rng):
+    """Bàn 6..19 ô, mật độ quân 5..60%, X và O xấp xỉ bằng nhau (không cần là thế hợp lệ)"""
+    n = rng.randint(6, 19)
+    density = rng.uniform(0.05, 0.6)
+    return [[rng.choice("XO") if rng.random() < density else None for _ in range(n)] for _ in range(n)]
+
+
+def run(boards=100, seed=0):
+    rng = random.Random(seed)
+    checks = 0
+    mismatches = []
+    for i in range(boards):
+        board = random_board(rng)
+        n = len(board)
+        for mark in "XO":
+            opp = "O" if mark == "X" else "X"
+            for x in range(n):
+                for y in range(n):
+                    if board[x][y] is None:
+                        got, want = a.score_move(board, {"x": x, "y": y}, mark), ref_score_move(board, {"x": x, "y": y}, mark)
+                        checks += 1
+                        if got != want:
+                            mismatches.append({"board": i, "fn": "score_move", "mark": mark, "cell": [x, y], "got": got, "want": want})
+                    elif board[x][y] == mark:
+                        for dx, dy in DIRS:
+                            got = a.evaluate_line(board, x, y, dx, dy, mark, opp)
+                            want = ref_evaluate_line(board, x, y, dx, dy, mark, opp)
+                            checks += 1
+                            if got != want:
+                                mismatches.append({"board": i, "fn": "evaluate_line", "mark": mark, "cell": [x, y],
+                                                   "dir": [dx, dy], "got": got, "want": want})
+            got, want = a.evaluate_board(board, mark), ref_evaluate_board(board, mark)
+            checks += 1
+            if got != want:
+                mismatches.append({"board": i, "fn": "evaluate_board", "mark": mark, "got": got, "want": want})
+    return {"boards": boards, "seed": seed, "checks": checks, "mismatches": mismatches}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="So bảng tra mẫu của a.py với bản chấm điểm dựng chuỗi cũ")
+    parser.add_argument("--boards", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="in kết quả dạng JSON")
+    args = parser.parse_args()
+
+    result = run(args.boards, args.seed)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        for m in result["mismatches"][:20]:
+            print("mismatch:", m)
+        print(f"{result['checks']} checks on {result['boards']} boards, {len(result['mismatches'])} mismatch(es)")
+    if result["mismatches"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# corpus.py
+# Bộ thế cờ cố định cho benchmarks/suite.py: khai cuộc, trung cuộc, thế chiến thuật
+# (có chuỗi thắng ép / phải chặn) và bàn gần đầy, ở nhiều kích thước bàn
+#
+# Mỗi thế là danh sách nước (x, y) luân phiên, X đi trước, nên bên đến lượt
+# suy ra từ số nước. Thế "near-full" được sinh từ seed cố định, không có 5
+# quân liên tiếp. Đổi nội dung corpus thì tăng CORPUS_VERSION để không so
+# với baseline cũ.
+
+import os
+import random
+import sys
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from position import Position  # noqa: E402
+from search_nodes import POSITIONS  # noqa: E402
+
+CORPUS_VERSION = 1
+
+Move = Tuple[int, int]
+
+# 15x15: X đến lượt, có hai 3 mở cắt nhau (thắng bằng chuỗi ép); thêm một nước X
+# ở xa thì O đến lượt và phải chặn
+_TACTICAL = [(7, 5), (10, 10), (7, 6), (11, 2), (7, 7), (2, 12), (6, 8), (12, 12), (5, 9), (1, 1)]
+TACTICAL = {
+    "tactical-attack": _TACTICAL,
+    "tactical-defend": _TACTICAL + [(3, 3)],
+}
+
+BOARD_SIZES = (15, 20, 30)
+NEAR_FULL_SIZES = (15,)
+NEAR_FULL_FILL = 0.8
+
+
+def _shift(moves: List[Move], size: int) -> List[Move]:
+    """Dời thế 15x15 ra giữa bàn size x size"""
+    d = (size - 15) // 2
+    return [(x + d, y + d) for x, y in moves]
+
+
+def near_full(size: int, fill: float = NEAR_FULL_FILL, seed: int = 0) -> List[Move]:
+    """Nước ngẫu nhiên (theo seed) tới khi bàn đầy fill phần, bỏ các nước tạo 5 quân"""
+    rng = random.Random(f"near-full-{size}-{seed}")
+    pos = Position(size)
+    cells = [(x, y) for x in range(size) for y in range(size)]
+    rng.shuffle(cells)
+    moves: List[Move] = []
+    target = int(size * size * fill)
+    skipped: List[Move] = []
+    while len(moves) < target and cells:
+        x, y = cells.pop()
+        pos.make(pos.index(x, y))
+        if pos.last_move_wins():
+            pos.unmake()
+            skipped.append((x, y))
+            continue
+        moves.append((x, y))
+        # Ô bị bỏ vì thắng cho bên này có thể hợp lệ cho bên kia
+        cells.extend(skipped)
+        skipped.clear()
+    return moves
+
+
+def build_corpus(sizes: Optional[Tuple[int, ...]] = None) -> Dict[str, Dict]:
+    """{tên: {"category", "size", "moves"}}, tên dạng "<thế>@<kích thước>" """
+    corpus: Dict[str, Dict] = {}
+    for size in sizes or BOARD_SIZES:
+        for name, moves in POSITIONS.items():
+            category = "opening" if name in ("opening", "early") else "midgame"
+            corpus[f"{name}@{size}"] = {"category": category, "size": size, "moves": _shift(moves, size)}
+        for name, moves in TACTICAL.items():
+            corpus[f"{name}@{size}"] = {"category": "tactical", "size": size, "moves": _shift(moves, size)}
+        if size in NEAR_FULL_SIZES:
+            corpus[f"near-full@{size}"] = {"category": "near-full", "size": size, "moves": near_full(size)}
+    return corpus
+
+
+def to_board(entry: Dict) -> Tuple[List[List[Optional[str]]], str]:
+    """(bàn List[List], mark đến lượt) của một thế trong corpus"""
+    size = entry["size"]
+    board: List[List[Optional[str]]] = [[None] * size for _ in range(size)]
+    for i, (x, y) in enumerate(entry["moves"]):
+        board[x][y] = "XO"[i % 2]
+    return board, "XO"[len(entry["moves"]) % 2]
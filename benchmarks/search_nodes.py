@@ -0,0 +1,101 @@
+# search_nodes.py
+# So sánh số node của negamax ở độ sâu cố định khi bật/tắt PVS, aspiration, LMR, quiescence,
+# cache điểm lá và khóa đối xứng (kèm tỉ lệ trúng TT / cache)
+#
+#   python benchmarks/search_nodes.py --depth 5
+#   python benchmarks/search_nodes.py --depth 4 --json
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from a import Searcher, _candidate_moves, _score_cell  # noqa: E402
+from position import Position  # noqa: E402
+from transposition import EvalCache, TranspositionTable  # noqa: E402
+
+# Thế cờ 15x15 cố định, X đi trước, (x, y) theo thứ tự nước đi
+POSITIONS = {
+    "opening": [(7, 7), (6, 7), (8, 8), (9, 9), (10, 9), (9, 7), (8, 9), (8, 10)],
+    "early": [(7, 7), (6, 6), (8, 8), (8, 9), (9, 8), (8, 10), (10, 8), (7, 8), (6, 7), (5, 7),
+              (7, 5), (8, 6)],
+    "midgame": [(7, 7), (6, 8), (6, 6), (5, 5), (4, 4), (3, 4), (8, 8), (9, 9), (8, 10), (8, 7),
+                (8, 11), (9, 6), (8, 9), (8, 12), (10, 5), (8, 6)],
+    "crowded": [(7, 7), (6, 7), (6, 8), (8, 6), (9, 5), (9, 4), (7, 6), (7, 8), (8, 9), (8, 10),
+                (9, 3), (9, 2), (8, 11), (8, 8), (9, 1), (8, 5), (8, 7), (6, 5), (7, 4), (5, 5)],
+}
+
+CONFIGS = {
+    "alphabeta": {"pvs": False, "lmr": False, "aspiration": False, "quiescence": False},
+    "pvs": {"pvs": True, "lmr": False, "aspiration": False, "quiescence": False},
+    "pvs+asp": {"pvs": True, "lmr": False, "aspiration": True, "quiescence": False},
+    "pvs+asp+lmr": {"pvs": True, "lmr": True, "aspiration": True, "quiescence": False},
+    "+qs": {"pvs": True, "lmr": True, "aspiration": True, "quiescence": True},
+    "+eval": {"pvs": True, "lmr": True, "aspiration": True, "quiescence": True, "eval_cache": True},
+    "+sym": {"pvs": True, "lmr": True, "aspiration": True, "quiescence": True, "eval_cache": True, "canonical": True},
+}
+
+
+def build(moves, size=15):
+    pos = Position(size)
+    for x, y in moves:
+        pos.make(pos.index(x, y))
+    return pos
+
+
+def run(depth, size=15):
+    results = []
+    for name, moves in POSITIONS.items():
+        for config, flags in CONFIGS.items():
+            pos = build(moves, size)
+            side = pos.side
+            root = sorted(_candidate_moves(pos), key=lambda m: _score_cell(pos, m, side), reverse=True)[:12]
+            flags = dict(flags, eval_cache=EvalCache() if flags.get("eval_cache") else None)
+            searcher = Searcher(pos, TranspositionTable(), **flags)
+            start = time.perf_counter()
+            move, value, _ = searcher.iterative_deepening(root, depth)
+            elapsed = time.perf_counter() - start
+            results.append({
+                "position": name,
+                "config": config,
+                "depth": depth,
+                "nodes": searcher.nodes,
+                "seconds": round(elapsed, 4),
+                "move": list(pos.coords(move)),
+                "score": value,
+                **searcher.cache_stats(),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--json", action="store_true", help="in kết quả dạng JSON")
+    args = parser.parse_args()
+
+    results = run(args.depth)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'position':<12} {'config':<12} {'nodes':>9} {'sec':>8} {'tt hit':>7} {'eval hit':>8}  move      score")
+    for r in results:
+        eval_hit = f"{r['eval_hit_rate']:.1%}" if "eval_hit_rate" in r else "-"
+        print(f"{r['position']:<12} {r['config']:<12} {r['nodes']:>9} {r['seconds']:>8.3f} {r['tt_hit_rate']:>7.1%} {eval_hit:>8}"
+              f"  {str(tuple(r['move'])):<9} {r['score']}")
+    totals = {}
+    for r in results:
+        nodes, seconds = totals.get(r["config"], (0, 0.0))
+        totals[r["config"]] = (nodes + r["nodes"], seconds + r["seconds"])
+    base = totals["alphabeta"][0]
+    print()
+    for config, (nodes, seconds) in totals.items():
+        print(f"{config:<12} {nodes:>9} nodes  ({nodes / base:.1%} of alphabeta)  {seconds:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# sparse_boards.py
+# Thời gian một nước trên bàn lớn: List[List] (đầy đủ) so với SparseBoard (sparse.py),
+# thế "midgame" của search_nodes.py đặt giữa bàn 15x15 / 30x30 / 100x100 và bàn không giới hạn
+#
+#   python benchmarks/sparse_boards.py
+#   python benchmarks/sparse_boards.py --sizes 15 100 --engines b --json
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from a import calculate_bot_move  # noqa: E402
+from b import best_move  # noqa: E402
+from search_nodes import POSITIONS  # noqa: E402
+from sparse import SparseBoard  # noqa: E402
+
+ENGINES = ["a-medium", "a-hard", "b"]
+
+
+def make_boards(size, moves):
+    """(bàn đầy đủ hoặc None nếu size=0, SparseBoard, mark đến lượt) với moves dời ra giữa bàn"""
+    shift = size // 2 - 7 if size else 0
+    moves = [(x + shift, y + shift) for x, y in moves]
+    sparse = SparseBoard.from_moves(moves, size or None)
+    board = sparse.to_board() if size else None
+    return board, sparse, "XO"[len(moves) % 2]
+
+
+def play(engine, board, mark, max_nodes):
+    if engine == "b":
+        return best_move(board, mark)[0]
+    move = calculate_bot_move(board, mark, engine.split("-")[1], None, max_nodes=max_nodes)
+    return move["x"], move["y"]
+
+
+def timed(engine, board, mark, max_nodes, repeat):
+    best = float("inf")
+    move = None
+    for _ in range(repeat):
+        random.seed(0)
+        start = time.perf_counter()
+        move = play(engine, board, mark, max_nodes)
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 2), list(move)
+
+
+def run(sizes, engines, position="midgame", max_nodes=3000, repeat=3):
+    results = []
+    for size in sizes:
+        board, sparse, mark = make_boards(size, POSITIONS[position])
+        for engine in engines:
+            row = {"engine": engine, "size": size or "inf"}
+            if board is not None:
+                row["dense_ms"], row["dense_move"] = timed(engine, board, mark, max_nodes, repeat)
+            row["sparse_ms"], row["sparse_move"] = timed(engine, sparse, mark, max_nodes, repeat)
+            if board is not None:
+                row["speedup"] = round(row["dense_ms"] / row["sparse_ms"], 2)
+            results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bàn đầy đủ so với SparseBoard trên bàn lớn")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[15, 30, 100, 0], help="0 là bàn không giới hạn")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=ENGINES)
+    parser.add_argument("--position", choices=list(POSITIONS), default="midgame")
+    parser.add_argument("--max-nodes", type=int, default=3000, help="ngân sách node của a-hard")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="in kết quả dạng JSON")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.engines, args.position, args.max_nodes, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'engine':<10} {'size':>5} {'dense ms':>10} {'sparse ms':>10} {'speedup':>8}")
+    for r in results:
+        dense = f"{r['dense_ms']:>10.2f}" if "dense_ms" in r else f"{'-':>10}"
+        speedup = f"{r['speedup']:>7.2f}x" if "speedup" in r else f"{'-':>8}"
+        print(f"{r['engine']:<10} {str(r['size']):>5} {dense} {r['sparse_ms']:>10.2f} {speedup}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+# suite.py
+# Bộ benchmark tái lập được cho a.py và b.py trên corpus cố định (benchmarks/corpus.py):
+# độ trễ p50 / p90 / p99 theo từng mức khó, nodes/s của negamax, calls/s của các hàm nóng
+#
+#   python benchmarks/suite.py                                  # in bảng
+#   python benchmarks/suite.py --save baseline.json             # lưu kết quả làm baseline
+#   python benchmarks/suite.py --baseline baseline.json         # so với baseline, exit 1 nếu chậm đi
+#   BOT_OPENING_BOOK= python benchmarks/suite.py --engines a-hard --sizes 15
+#
+# random được seed lại trước mỗi lần gọi (seed + số thứ tự lần chạy) và a-hard
+# dùng ngân sách node (--hard-nodes) thay vì giới hạn thời gian nên nước đi và
+# số node giống nhau giữa các lần chạy; chỉ thời gian thay đổi. Nước đi của
+# từng thế được lưu kèm để thấy thay đổi hành vi khi so với baseline.
+# Thời gian dao động theo tải máy: chạy baseline và lần so trên cùng máy, lúc rảnh.
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import a  # noqa: E402
+import b  # noqa: E402
+from corpus import BOARD_SIZES, CORPUS_VERSION, build_corpus, to_board  # noqa: E402
+from position import Position  # noqa: E402
+from transposition import EvalCache, TranspositionTable  # noqa: E402
+from vectorized import HAVE_NUMPY  # noqa: E402
+
+ENGINES = ["a-easy", "a-medium", "a-hard", "b"]
+# Chỉ số càng nhỏ càng tốt (còn lại càng lớn càng tốt) khi so với baseline
+LOWER_IS_BETTER = ("p50_ms", "p90_ms", "p99_ms", "mean_ms")
+COMPARED = ("p50_ms", "p90_ms", "nodes_per_sec", "calls_per_sec")
+
+
+def percentile(values, q):
+    """Phân vị q (0..100), nội suy tuyến tính giữa hai giá trị kề"""
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = (len(values) - 1) * q / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def summarize(samples):
+    ms = [s * 1000 for s in samples]
+    return {
+        "calls": len(ms),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p90_ms": round(percentile(ms, 90), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "mean_ms": round(sum(ms) / len(ms), 3),
+        "max_ms": round(max(ms), 3),
+    }
+
+
+def play(engine, board, mark, hard_nodes):
+    if engine == "b":
+        return list(b.best_move(board, mark)[0])
+    move = a.calculate_bot_move(board, mark, engine.split("-")[1], None, max_nodes=hard_nodes)
+    return [move["x"], move["y"]]
+
+
+def bench_latency(corpus, engines, iterations, seed, hard_nodes):
+    """Độ trễ một nước theo engine (tổng và theo nhóm thế) và nước đi của từng thế
+
+    Lần gọi đầu mỗi thế không tính giờ (bảng mẫu, Geometry, ... được dựng lười).
+    """
+    latency, moves = {}, {}
+    for engine in engines:
+        samples, by_category = [], {}
+        for name, entry in corpus.items():
+            board, mark = to_board(entry)
+            random.seed(seed)
+            play(engine, board, mark, hard_nodes)
+            for i in range(iterations):
+                random.seed(seed + i)
+                start = time.perf_counter()
+                move = play(engine, board, mark, hard_nodes)
+                elapsed = time.perf_counter() - start
+                samples.append(elapsed)
+                by_category.setdefault(entry["category"], []).append(elapsed)
+            moves[f"{engine}/{name}"] = move
+        latency[engine] = summarize(samples)
+        for category, values in by_category.items():
+            latency[f"{engine}/{category}"] = summarize(values)
+    return latency, moves
+
+
+def bench_search(corpus, depth):
+    """negamax độ sâu cố định (12 nước gốc tốt nhất) trên mọi thế 15x15: tổng node và nodes/s"""
+    nodes = qnodes = 0
+    seconds = 0.0
+    for entry in corpus.values():
+        if entry["size"] != 15:
+            continue
+        board, mark = to_board(entry)
+        pos = Position.from_board(board, mark)
+        side = pos.side
+        root = sorted(a._candidate_moves(pos), key=lambda m: a._score_cell(pos, m, side), reverse=True)[:12]
+        searcher = a.Searcher(pos, TranspositionTable(), eval_cache=EvalCache())
+        start = time.perf_counter()
+        searcher.iterative_deepening(root, depth)
+        seconds += time.perf_counter() - start
+        nodes += searcher.nodes
+        qnodes += searcher.qnodes
+    return {"depth": depth, "nodes": nodes, "qnodes": qnodes, "seconds": round(seconds, 4),
+            "nodes_per_sec": round((nodes + qnodes) / seconds, 1)}
+
+
+def rate(fn, args, min_time):
+    """Số lần gọi fn(*args) mỗi giây, xoay vòng qua args tới khi đủ min_time giây (sau một vòng chạy nóng)"""
+    for item in args:
+        fn(*item)
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        for item in args:
+            fn(*item)
+        calls += len(args)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return {"calls": calls, "calls_per_sec": round(calls / elapsed, 1)}
+
+
+def bench_calls(corpus, min_time):
+    """calls/s của score_move, get_border_moves (a.py), evaluate_cell, get_border_cells (b.py) trên các thế 15x15"""
+    entries = [to_board(e) for e in corpus.values() if e["size"] == 15]
+    score_args, cell_args, border_args = [], [], []
+    for board, mark in entries:
+        border_args.append((board,))
+        normalized = b.normalize_board(board, mark)
+        for move in a.get_border_moves(board):
+            score_args.append((board, move, mark))
+            cell_args.append((normalized, move["x"], move["y"]))
+    return {
+        "a.score_move": rate(a.score_move, score_args, min_time),
+        "a.get_border_moves": rate(a.get_border_moves, border_args, min_time),
+        "b.evaluate_cell": rate(b.evaluate_cell, cell_args, min_time),
+        "b.get_border_cells": rate(b.get_border_cells, border_args, min_time),
+    }
+
+
+def run(sizes=BOARD_SIZES, engines=ENGINES, iterations=5, seed=0, hard_nodes=2000, depth=3, min_time=0.5):
+    corpus = build_corpus(tuple(sizes))
+    latency, moves = bench_latency(corpus, engines, iterations, seed, hard_nodes)
+    return {
+        "meta": {
+            "corpus_version": CORPUS_VERSION,
+            "positions": len(corpus),
+            "sizes": list(sizes),
+            "iterations": iterations,
+            "seed": seed,
+            "hard_nodes": hard_nodes,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "numpy": HAVE_NUMPY,
+        },
+        "latency": latency,
+        "search": bench_search(corpus, depth),
+        "calls": bench_calls(corpus, min_time),
+        "moves": moves,
+    }
+
+
+def _metrics(results):
+    """{(nhóm, tên, chỉ số): giá trị} của các chỉ số được so với baseline"""
+    out = {}
+    for group in ("latency", "calls"):
+        for name, values in results.get(group, {}).items():
+            if "/" in name:
+                # Theo nhóm thế: ít mẫu, nhiều thế dưới 1 ms, chỉ để xem
+                continue
+            for key in COMPARED:
+                if key in values:
+                    out[(group, name, key)] = values[key]
+    out[("search", "negamax", "nodes_per_sec")] = results["search"]["nodes_per_sec"]
+    return out
+
+
+def compare(results, baseline, tolerance):
+    """(danh sách dòng so sánh, số chỉ số chậm hơn baseline quá tolerance, các nước đi đã đổi)"""
+    rows, regressions = [], 0
+    old = _metrics(baseline)
+    for key, value in _metrics(results).items():
+        if key not in old or not old[key]:
+            continue
+        ratio = value / old[key]
+        worse = ratio > 1 + tolerance if key[2] in LOWER_IS_BETTER else ratio < 1 / (1 + tolerance)
+        regressions += worse
+        rows.append((key, old[key], value, ratio, worse))
+    changed = {k: (baseline["moves"][k], v) for k, v in results["moves"].items()
+               if k in baseline.get("moves", {}) and baseline["moves"][k] != v}
+    if results["search"]["nodes"] != baseline["search"]["nodes"]:
+        changed["search/nodes"] = (baseline["search"]["nodes"], results["search"]["nodes"])
+    return rows, regressions, changed
+
+
+def print_results(results):
+    print(f"{'latency':<22} {'calls':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'mean ms':>9}")
+    for name, r in results["latency"].items():
+        print(f"{name:<22} {r['calls']:>6} {r['p50_ms']:>9.2f} {r['p90_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['mean_ms']:>9.2f}")
+    s = results["search"]
+    print(f"\nnegamax depth {s['depth']}: {s['nodes']} nodes + {s['qnodes']} qnodes in {s['seconds']:.2f}s"
+          f" = {s['nodes_per_sec']:.0f} nodes/s")
+    print()
+    for name, r in results["calls"].items():
+        print(f"{name:<22} {r['calls_per_sec']:>12.0f} calls/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tái lập được cho a.py / b.py")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(BOARD_SIZES))
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=ENGINES)
+    parser.add_argument("--iterations", type=int, default=5, help="số lần gọi mỗi thế mỗi engine")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--hard-nodes", type=int, default=2000, help="ngân sách node của a-hard")
+    parser.add_argument("--depth", type=int, default=3, help="độ sâu negamax khi đo nodes/s")
+    parser.add_argument("--min-time", type=float, default=0.5, help="giây tối thiểu cho mỗi phép đo calls/s")
+    parser.add_argument("--json", action="store_true", help="in kết quả dạng JSON")
+    parser.add_argument("--save", metavar="PATH", help="ghi kết quả JSON vào PATH")
+    parser.add_argument("--baseline", metavar="PATH", help="so với kết quả đã lưu")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="tỉ lệ chậm đi tối đa trước khi báo regression")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.engines, args.iterations, args.seed, args.hard_nodes, args.depth, args.min_time)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results)
+    if not args.baseline:
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    for key in ("corpus_version", "sizes", "iterations", "seed", "hard_nodes"):
+        if baseline["meta"].get(key) != results["meta"][key]:
+            print(f"\nBaseline was run with {key}={baseline['meta'].get(key)!r}, now {results['meta'][key]!r}; not comparable")
+            sys.exit(2)
+    rows, regressions, changed = compare(results, baseline, args.tolerance)
+    print(f"\n{'metric':<40} {'baseline':>12} {'now':>12} {'ratio':>7}")
+    for (group, name, key), old, new, ratio, worse in rows:
+        print(f"{group + '/' + name + ' ' + key:<40} {old:>12.2f} {new:>12.2f} {ratio:>6.2f}x{'  REGRESSION' if worse else ''}")
+    for key, (old, new) in changed.items():
+        print(f"changed: {key} {old} -> {new}")
+    print(f"\n{regressions} regression(s) beyond {args.tolerance:.0%}, {len(changed)} changed result(s)")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
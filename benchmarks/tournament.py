@@ -0,0 +1,287 @@
+# tournament.py
+# Giải đấu tự chơi giữa các cấu hình engine trên process pool: tỉ lệ thắng, Elo
+# với khoảng tin cậy 95%, SPRT dừng sớm, và thời gian nghĩ (trung bình, p99,
+# CPU) mỗi nước của từng engine
+#
+#   python benchmarks/tournament.py a-medium b --games 200
+#   python benchmarks/tournament.py a-hard:nodes=3000 a-hard:nodes=1500 --games 2000 --workers 4 -o result.json
+#   python benchmarks/tournament.py a-easy a-medium b --games 100 --json
+#
+# Engine: a-easy, a-medium, a-hard, b; a-hard nhận thêm ":nodes=N" (ngân sách
+# node, tái lập được) hoặc ":time=S" (giây mỗi nước). Mỗi khai cuộc ngẫu
+# nhiên (--opening-plies quân quanh tâm, theo --seed) được chơi hai ván đổi
+# màu. Với mỗi cặp (A, B), SPRT kiểm tra H0: Elo(A - B) = elo0 với H1: = elo1;
+# cặp nào đã kết luận thì các ván chưa chạy của cặp đó bị hủy.
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import combinations
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from suite import percentile  # noqa: E402
+
+ENGINE_NAMES = ("a-easy", "a-medium", "a-hard", "b")
+SPRT_MIN_VAR = 0.01
+
+
+def parse_engine(spec):
+    """"a-hard:nodes=2000" -> ("a-hard", {"nodes": 2000})"""
+    name, _, options = spec.partition(":")
+    if name not in ENGINE_NAMES:
+        raise ValueError(f"unknown engine {name!r}")
+    parsed = {}
+    for item in filter(None, options.split(",")):
+        key, _, value = item.partition("=")
+        if key not in ("nodes", "time") or name != "a-hard":
+            raise ValueError(f"unknown option {key!r} for {name}")
+        parsed[key] = int(value) if key == "nodes" else float(value)
+    return name, parsed
+
+
+# ---------- Chạy trong worker ----------
+
+def _init_worker():
+    # Mỗi ván chạy trong một process của pool: negamax không mở pool con
+    import parallel
+    parallel.WORKERS = 1
+
+
+def random_opening(rng, size, plies):
+    """plies ô khác nhau trong vùng 7x7 quanh tâm (đủ nhỏ để không ai có 5)"""
+    center = size // 2
+    cells = [(x, y) for x in range(center - 3, center + 4) for y in range(center - 3, center + 4)]
+    return rng.sample(cells, plies)
+
+
+def _engine_move(engine, pos, board):
+    from a import calculate_bot_move
+    from b import best_move
+    from position import MARKS
+
+    name, options = engine
+    mark = MARKS[pos.side]
+    if name == "b":
+        (x, y), _ = best_move(board, mark)
+        return x, y
+    move = calculate_bot_move(pos, mark, name.split("-")[1], time_limit=options.get("time"), max_nodes=options.get("nodes"))
+    return move["x"], move["y"]
+
+
+def play_game(task):
+    """Một ván: task = (cặp, số khai cuộc, ai cầm X, engines, size, opening, seed)
+
+    Trả về dict kết quả với thời gian nghĩ (giây, đồng hồ thực và CPU) của
+    từng nước theo engine. Nước không hợp lệ là thua.
+    """
+    from position import MARKS, Position
+
+    pair, opening_id, x_first, engines, size, opening, seed = task
+    random.seed(seed)
+    pos = Position(size)
+    board = [[None] * size for _ in range(size)]
+    for x, y in opening:
+        board[x][y] = MARKS[pos.side]
+        pos.make(pos.index(x, y))
+    # players[màu] = chỉ số engine trong cặp
+    players = (pair[0], pair[1]) if x_first else (pair[1], pair[0])
+    times = {pair[0]: [], pair[1]: []}
+    cpu = {pair[0]: 0.0, pair[1]: 0.0}
+    winner = None
+    illegal = False
+    while not pos.is_full():
+        player = players[pos.side]
+        start, start_cpu = time.perf_counter(), time.process_time()
+        x, y = _engine_move(engines[player], pos, board)
+        times[player].append(time.perf_counter() - start)
+        cpu[player] += time.process_time() - start_cpu
+        if not (0 <= x < size and 0 <= y < size) or pos.cells[pos.index(x, y)]:
+            winner, illegal = players[pos.side ^ 1], True
+            break
+        board[x][y] = MARKS[pos.side]
+        pos.make(pos.index(x, y))
+        if pos.last_move_wins():
+            winner = player
+            break
+    return {"pair": pair, "opening": opening_id, "x": players[0], "winner": winner, "illegal": illegal,
+            "plies": len(pos.history), "times": times, "cpu": cpu}
+
+
+# ---------- Thống kê ----------
+
+def elo_to_score(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def score_to_elo(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+def sprt_llr(wins, draws, losses, elo0, elo1):
+    """Log-likelihood ratio của SPRT (xấp xỉ chuẩn theo thắng / hòa / thua)"""
+    n = wins + draws + losses
+    if not n:
+        return 0.0
+    score = (wins + draws / 2) / n
+    # Toàn thắng / toàn thua / toàn hòa cho phương sai 0: chặn dưới để LLR vẫn tăng theo số ván
+    var = max((wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / n, SPRT_MIN_VAR)
+    s0, s1 = elo_to_score(elo0), elo_to_score(elo1)
+    return (s1 - s0) * (2 * score - s0 - s1) * n / (2 * var)
+
+
+class PairStats:
+    """Kết quả của engine a với engine b (góc nhìn của a)"""
+
+    def __init__(self, a, b, elo0, elo1, alpha, beta):
+        self.a, self.b = a, b
+        self.elo0, self.elo1 = elo0, elo1
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        self.wins = self.draws = self.losses = 0
+        self.illegal = 0
+        self.plies = 0
+
+    def add(self, result):
+        if result["winner"] is None:
+            self.draws += 1
+        elif result["winner"] == self.a:
+            self.wins += 1
+        else:
+            self.losses += 1
+        self.illegal += result["illegal"]
+        self.plies += result["plies"]
+
+    @property
+    def games(self):
+        return self.wins + self.draws + self.losses
+
+    def llr(self):
+        return sprt_llr(self.wins, self.draws, self.losses, self.elo0, self.elo1)
+
+    def decision(self):
+        llr = self.llr()
+        return "H1" if llr >= self.upper else "H0" if llr <= self.lower else None
+
+    def to_dict(self, names):
+        n = self.games
+        score = (self.wins + self.draws / 2) / n if n else 0.5
+        var = (self.wins * (1 - score) ** 2 + self.draws * (0.5 - score) ** 2 + self.losses * score ** 2) / n if n else 0.0
+        margin = 1.96 * math.sqrt(var / n) if n else 0.5
+        return {
+            "engine": names[self.a], "opponent": names[self.b],
+            "games": n, "wins": self.wins, "draws": self.draws, "losses": self.losses, "illegal": self.illegal,
+            "score": round(score, 4),
+            "elo": round(score_to_elo(score), 1),
+            "elo_ci95": [round(score_to_elo(score - margin), 1), round(score_to_elo(score + margin), 1)],
+            "avg_plies": round(self.plies / n, 1) if n else 0,
+            "sprt": {"elo0": self.elo0, "elo1": self.elo1, "llr": round(self.llr(), 3),
+                     "bounds": [round(self.lower, 3), round(self.upper, 3)], "decision": self.decision()},
+        }
+
+
+# ---------- Điều phối ----------
+
+def run(specs, games=200, size=15, opening_plies=4, seed=0, workers=None, elo0=0.0, elo1=20.0, alpha=0.05, beta=0.05,
+        progress=None):
+    engines = [parse_engine(spec) for spec in specs]
+    pairs = list(combinations(range(len(engines)), 2))
+    stats = {pair: PairStats(*pair, elo0, elo1, alpha, beta) for pair in pairs}
+    times = {i: [] for i in range(len(engines))}
+    cpu = {i: 0.0 for i in range(len(engines))}
+
+    # Ván 2k và 2k + 1 của mỗi cặp dùng chung khai cuộc k, đổi màu
+    rng = random.Random(seed)
+    openings = [random_opening(rng, size, opening_plies) for _ in range((games + 1) // 2)]
+    tasks = []
+    for g in range(games):
+        for pair in pairs:
+            tasks.append((pair, g // 2, g % 2 == 0, engines, size, openings[g // 2], seed * 1000003 + g))
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(workers or os.cpu_count() or 1, initializer=_init_worker) as pool:
+        pending = {pool.submit(play_game, task): task[0] for task in tasks}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pair = pending.pop(future)
+                if future.cancelled():
+                    continue
+                result = future.result()
+                stats[pair].add(result)
+                for i, values in result["times"].items():
+                    times[i].extend(values)
+                    cpu[i] += result["cpu"][i]
+                if stats[pair].decision() is not None:
+                    for other, other_pair in list(pending.items()):
+                        if other_pair == pair and other.cancel():
+                            del pending[other]
+                if progress is not None:
+                    progress(stats[pair])
+
+    return {
+        "meta": {"engines": list(specs), "games": games, "size": size, "opening_plies": opening_plies, "seed": seed,
+                 "workers": workers or os.cpu_count() or 1, "seconds": round(time.perf_counter() - start, 2)},
+        "pairs": [stats[pair].to_dict(specs) for pair in pairs],
+        "engines": [{
+            "engine": spec,
+            "moves": len(times[i]),
+            "mean_ms": round(sum(times[i]) / len(times[i]) * 1000, 3) if times[i] else 0.0,
+            "p99_ms": round(percentile([t * 1000 for t in times[i]], 99), 3),
+            "cpu_ms_per_move": round(cpu[i] / len(times[i]) * 1000, 3) if times[i] else 0.0,
+        } for i, spec in enumerate(specs)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Giải đấu tự chơi giữa các engine, có SPRT dừng sớm")
+    parser.add_argument("engines", nargs="+", help="ví dụ a-medium b a-hard:nodes=2000")
+    parser.add_argument("--games", type=int, default=200, help="số ván tối đa mỗi cặp")
+    parser.add_argument("--size", type=int, default=15)
+    parser.add_argument("--opening-plies", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="số process (mặc định số CPU)")
+    parser.add_argument("--elo0", type=float, default=0.0)
+    parser.add_argument("--elo1", type=float, default=20.0)
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--beta", type=float, default=0.05)
+    parser.add_argument("--json", action="store_true", help="in kết quả dạng JSON")
+    parser.add_argument("-o", "--output", metavar="PATH", help="ghi kết quả JSON vào PATH")
+    args = parser.parse_args()
+    if len(args.engines) < 2:
+        parser.error("need at least two engines")
+
+    def progress(pair):
+        print(f"\r{args.engines[pair.a]} vs {args.engines[pair.b]}: +{pair.wins} ={pair.draws} -{pair.losses}"
+              f"  llr {pair.llr():.2f}   ", end="", file=sys.stderr)
+
+    results = run(args.engines, args.games, args.size, args.opening_plies, args.seed, args.workers,
+                  args.elo0, args.elo1, args.alpha, args.beta, None if args.json else progress)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(file=sys.stderr)
+    print(f"{'engine':<20} {'opponent':<20} {'games':>6} {'W-D-L':>13} {'score':>6} {'elo':>7} {'95% CI':>17} {'sprt':>5}")
+    for r in results["pairs"]:
+        wdl = f"{r['wins']}-{r['draws']}-{r['losses']}"
+        ci = f"[{r['elo_ci95'][0]:.0f}, {r['elo_ci95'][1]:.0f}]"
+        print(f"{r['engine']:<20} {r['opponent']:<20} {r['games']:>6} {wdl:>13} {r['score']:>6.3f} {r['elo']:>7.1f} {ci:>17}"
+              f" {r['sprt']['decision'] or '-':>5}")
+    print(f"\n{'engine':<20} {'moves':>7} {'mean ms':>9} {'p99 ms':>9} {'cpu ms/move':>12}")
+    for r in results["engines"]:
+        print(f"{r['engine']:<20} {r['moves']:>7} {r['mean_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['cpu_ms_per_move']:>12.2f}")
+    print(f"\n{results['meta']['seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# bot_client.py
+# Client thử cho bot_server.py: kiểm tra ping, hủy lượt think, rồi cho bot tự đấu
+#
+#   python bot_client.py                              # tự chạy bot_server.py qua stdio
+#   python bot_client.py --unix /tmp/caro-bot.sock    # nối vào server đang chạy
+#   python bot_client.py --games 4 --difficulty hard --time-limit 1
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bot_server.py")
+
+# Thế giữa ván (X đi trước) đủ phức tạp để lượt think ở mức hard chưa xong sau 0.1 giây
+MIDGAME = [(7, 7), (6, 8), (6, 6), (5, 5), (4, 4), (3, 4), (8, 8), (9, 9), (8, 10), (8, 7),
+           (8, 11), (9, 6), (8, 9), (8, 12), (10, 5)]
+
+
+class BotClient:
+    """Gửi request JSON lines, ghép response theo id (nhiều request chạy song song được)"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, process=None):
+        self.reader = reader
+        self.writer = writer
+        self.process = process
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.ids = itertools.count(1)
+        self.listener = asyncio.create_task(self._listen())
+
+    @classmethod
+    async def spawn(cls, server: str = SERVER) -> "BotClient":
+        process = await asyncio.create_subprocess_exec(sys.executable, server, stdin=asyncio.subprocess.PIPE,
+                                                       stdout=asyncio.subprocess.PIPE, limit=1 << 20)
+        return cls(process.stdout, process.stdin, process)
+
+    @classmethod
+    async def connect(cls, path: str) -> "BotClient":
+        reader, writer = await asyncio.open_unix_connection(path, limit=1 << 20)
+        return cls(reader, writer)
+
+    async def _listen(self) -> None:
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            future = self.pending.pop(response.get("id"), None)
+            if future is not None and not future.done():
+                future.set_result(response)
+        for future in self.pending.values():
+            future.set_exception(ConnectionError("bot_server closed the connection"))
+
+    async def request(self, op: str, **fields: Any) -> Dict[str, Any]:
+        req_id = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[req_id] = future
+        self.writer.write(json.dumps({"id": req_id, "op": op, **fields}).encode() + b"\n")
+        await self.writer.drain()
+        return await future
+
+    async def close(self) -> None:
+        self.writer.close()
+        if self.process is not None:
+            await self.process.wait()
+        self.listener.cancel()
+
+
+async def check_cancel(client: BotClient) -> None:
+    """Think với thời gian dài rồi hủy ngay: response phải về sớm với cancelled"""
+    await client.request("open", room="cancel-check", size=15, bot_mark="O", difficulty="hard")
+    for x, y in MIDGAME:
+        await client.request("move", room="cancel-check", x=x, y=y)
+    think = asyncio.create_task(client.request("think", room="cancel-check", time_limit=30))
+    await asyncio.sleep(0.1)
+    await client.request("cancel", room="cancel-check")
+    response = await think
+    print(f"cancel: {response}")
+    await client.request("close", room="cancel-check")
+
+
+async def play_game(client: BotClient, game: int, size: int, difficulty: str, time_limit: Optional[float]) -> Dict[str, Any]:
+    """Hai phòng (bot X và bot O) đi thay nhau; nước của bên này là delta gửi cho phòng kia"""
+    rooms = {"X": f"game{game}-x", "O": f"game{game}-o"}
+    for mark, room in rooms.items():
+        await client.request("open", room=room, size=size, bot_mark=mark, difficulty=difficulty)
+    moves: List[List[int]] = []
+    turn, other = "X", "O"
+    result: Dict[str, Any] = {}
+    started = time.perf_counter()
+    while "winner" not in result and not result.get("draw"):
+        fields = {"time_limit": time_limit} if time_limit is not None else {}
+        result = await client.request("think", room=rooms[turn], **fields)
+        if not result["ok"]:
+            raise RuntimeError(result["error"])
+        moves.append([result["x"], result["y"]])
+        reply = await client.request("move", room=rooms[other], x=result["x"], y=result["y"])
+        if not reply["ok"]:
+            raise RuntimeError(reply["error"])
+        turn, other = other, turn
+    for room in rooms.values():
+        await client.request("close", room=room)
+    return {"game": game, "winner": result.get("winner"), "moves": len(moves),
+            "seconds": round(time.perf_counter() - started, 2)}
+
+
+async def run(args) -> None:
+    client = await (BotClient.connect(args.unix) if args.unix else BotClient.spawn())
+    try:
+        print(f"ping: {await client.request('ping')}")
+        await check_cancel(client)
+        games = [play_game(client, g, args.size, args.difficulty, args.time_limit) for g in range(args.games)]
+        for summary in await asyncio.gather(*games):
+            print(summary)
+    finally:
+        await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Client thử cho bot_server.py")
+    parser.add_argument("--unix", metavar="PATH", help="nối vào server trên Unix socket")
+    parser.add_argument("--games", type=int, default=2, help="số ván bot tự đấu chạy đồng thời")
+    parser.add_argument("--size", type=int, default=15)
+    parser.add_argument("--difficulty", default="medium")
+    parser.add_argument("--time-limit", type=float, default=None)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+# bot_server.py
+# Bot chạy dạng service lâu dài: JSON lines qua stdio hoặc Unix socket
+#
+#   python bot_server.py                         # đọc/ghi qua stdin/stdout
+#   python bot_server.py --unix /tmp/caro-bot.sock
+#
+# Mỗi dòng là một request JSON có "id" và "op", mỗi response là một dòng JSON
+# cùng "id" và "ok". Thế cờ, TT và frontier của từng phòng nằm trong
+# GameSession (session.py) nên giữa các lượt chỉ cần gửi nước vừa đi.
+#
+#   open   {room, size, bot_mark, difficulty?, board?, to_move?, ponder?}  tạo / đặt lại phòng
+#   move   {room, x, y}                  nước của người chơi
+#   think  {room, time_limit?, apply?, stats?, profile?}
+#                                        bot tính nước (apply mặc định true: đi luôn);
+#                                        stats / profile: trả kèm MoveStats (instrument.py)
+#   ponder {room}                        tính trước trong lượt người chơi (ponder.py)
+#   cancel {room}                        hủy lượt think / ponder đang chạy
+#   close  {room}                        người chơi đầu hàng / rời phòng
+#   load                                 tải và ngân sách theo cấp khó (budget.py)
+#   ping
+#
+# Phòng bật ponder (open {ponder: true} hoặc BOT_PONDER=1) tự ponder sau mỗi
+# think có apply. Ponder chạy trên executor riêng BOT_PONDER_THREADS thread
+# để không chiếm thread của think.
+#
+# Lượt think chờ thread được tính vào tải của GOVERNOR (budget.py): khi tải
+# vượt capacity, ngân sách thời gian / node của mọi lượt được chia nhỏ lại.
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from a import calculate_bot_move
+from budget import GOVERNOR, get_tier
+from instrument import LOG_JSON, LOG_LEVEL, MoveStats, configure_logging
+from ponder import PONDER, PONDER_DIFFICULTIES, Ponder
+from position import MARKS, Position, color_of
+from session import GameSession, drop_session, find_session, get_session
+
+THREADS = int(os.environ.get("BOT_SERVER_THREADS", "4"))
+PONDER_THREADS = int(os.environ.get("BOT_PONDER_THREADS", "1"))
+LINE_LIMIT = 1 << 20
+
+logger = logging.getLogger(__name__)
+
+
+class BotError(Exception):
+    """Request không hợp lệ; trả về client dạng {"ok": false, "error": ...}"""
+
+
+class BotServer:
+    def __init__(self, threads: int = THREADS):
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix="bot")
+        self.difficulty: Dict[str, str] = {}
+        self.locks: Dict[str, asyncio.Lock] = {}
+        # Lượt think đang chạy theo phòng: (future, cờ hủy)
+        self.thinking: Dict[str, Tuple[asyncio.Future, threading.Event]] = {}
+        self.ponder_executor = ThreadPoolExecutor(PONDER_THREADS, thread_name_prefix="ponder")
+        self.ponder: Dict[str, bool] = {}
+        self.pondering: Dict[str, Tuple[asyncio.Future, Ponder]] = {}
+        # time_limit của lượt think gần nhất, dùng cho ponder của phòng
+        self.time_limits: Dict[str, Optional[float]] = {}
+
+    # ---------- Tiện ích ----------
+
+    def _lock(self, room: str) -> asyncio.Lock:
+        lock = self.locks.get(room)
+        if lock is None:
+            lock = self.locks[room] = asyncio.Lock()
+        return lock
+
+    def _session(self, room: str) -> GameSession:
+        session = find_session(room)
+        if session is None or session.position is None:
+            raise BotError(f"unknown room {room!r}")
+        return session
+
+    def _request_cancel(self, room: str) -> bool:
+        entry = self.thinking.get(room)
+        if entry is None:
+            return False
+        entry[1].set()
+        return True
+
+    def _start_ponder(self, room: str, session: GameSession) -> bool:
+        """Bắt đầu ponder nếu đang là lượt đối phương (gọi khi giữ lock của phòng)"""
+        pos = session.position
+        difficulty = self.difficulty.get(room, "medium")
+        if room in self.pondering or difficulty not in PONDER_DIFFICULTIES or pos.side == color_of(session.bot_mark):
+            return False
+        ponder = Ponder(session, difficulty, self.time_limits.get(room))
+        if not ponder.replies:
+            return False
+        future = asyncio.get_running_loop().run_in_executor(self.ponder_executor, ponder.run)
+        self.pondering[room] = (future, ponder)
+        return True
+
+    async def _stop_ponder(self, room: str, key: Optional[int] = None) -> Optional[Ponder]:
+        """Dừng ponder của phòng và chờ thread dừng hẳn (search dùng chung TT của session)
+
+        key là hash của thế thật: nếu ponder đang tính đúng thế đó thì chờ nó
+        tính xong. Trả về Ponder đã dừng (results có các thế đã tính xong).
+        """
+        entry = self.pondering.pop(room, None)
+        if entry is None:
+            return None
+        future, ponder = entry
+        ponder.stop(key)
+        try:
+            await future
+        except Exception:
+            logger.exception("ponder failed", extra={"event": "ponder_error", "room": room})
+        return ponder
+
+    @staticmethod
+    def _result(pos: Position) -> Dict[str, Any]:
+        """Ai đến lượt, và người thắng / hòa nếu ván đã kết thúc"""
+        out: Dict[str, Any] = {"to_move": MARKS[pos.side]}
+        if pos.last_move_wins():
+            out["winner"] = MARKS[pos.side ^ 1]
+        elif pos.is_full():
+            out["draw"] = True
+        return out
+
+    # ---------- Các op ----------
+
+    async def op_ping(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        return {"pong": True}
+
+    async def op_load(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        return GOVERNOR.metrics()
+
+    async def op_open(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        room = str(req["room"])
+        bot_mark = req.get("bot_mark", "O")
+        if bot_mark not in MARKS:
+            raise BotError("bot_mark must be 'X' or 'O'")
+        board = req.get("board")
+        size = len(board) if board else int(req.get("size", 15))
+        if not 5 <= size <= 255:
+            raise BotError("size must be between 5 and 255")
+        self._request_cancel(room)
+        async with self._lock(room):
+            session = get_session(room, size, bot_mark)
+            if board:
+                if any(len(row) != size for row in board):
+                    raise BotError("board must be square")
+                to_move = req.get("to_move")
+                if to_move is None:
+                    x_count = sum(row.count("X") for row in board)
+                    o_count = sum(row.count("O") for row in board)
+                    to_move = "X" if x_count == o_count else "O"
+                session.position = Position.from_board(board, to_move)
+            else:
+                session.position = Position(size)
+            await self._stop_ponder(room)
+            self.difficulty[room] = req.get("difficulty", "medium")
+            self.ponder[room] = bool(req.get("ponder", PONDER))
+            return self._result(session.position)
+
+    async def op_move(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        room = str(req["room"])
+        self._request_cancel(room)
+        async with self._lock(room):
+            pos = self._session(room).position
+            x, y = int(req["x"]), int(req["y"])
+            if not (0 <= x < pos.size and 0 <= y < pos.size):
+                raise BotError("move out of board")
+            idx = pos.index(x, y)
+            if pos.cells[idx]:
+                raise BotError("cell is not empty")
+            if "mark" in req and req["mark"] != MARKS[pos.side]:
+                raise BotError(f"it is {MARKS[pos.side]}'s turn")
+            pos.make(idx)
+            return self._result(pos)
+
+    async def op_think(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        room = str(req["room"])
+        async with self._lock(room):
+            session = self._session(room)
+            pos = session.position
+            if pos.side != color_of(session.bot_mark):
+                raise BotError("it is not the bot's turn")
+            if pos.last_move_wins() or pos.is_full():
+                raise BotError("game is over")
+            difficulty = req.get("difficulty", self.difficulty.get(room, "medium"))
+            time_limit = req.get("time_limit")
+            self.time_limits[room] = time_limit
+            stats = MoveStats(profile=bool(req.get("profile"))) if req.get("stats") or req.get("profile") else None
+            cancel = threading.Event()
+            start = time.perf_counter()
+            ponder = await self._stop_ponder(room, pos.hash)
+            move = ponder.results.get(pos.hash) if ponder is not None and ponder.difficulty == difficulty else None
+            pondered = move is not None and not pos.cells[pos.index(move["x"], move["y"])]
+            if pondered:
+                if stats is not None:
+                    stats.difficulty, stats.source, stats.move = difficulty, "ponder", move
+            else:
+                loop = asyncio.get_running_loop()
+                GOVERNOR.enqueue()
+                future = loop.run_in_executor(self.executor, self._think, session, difficulty, time_limit, cancel, stats, start)
+                self.thinking[room] = (future, cancel)
+                try:
+                    move = await future
+                finally:
+                    self.thinking.pop(room, None)
+            elapsed = round(time.perf_counter() - start, 4)
+            logger.info("think", extra={"event": "think", "room": room, "difficulty": difficulty, "elapsed": elapsed,
+                                        "cancelled": cancel.is_set(), "pondered": pondered,
+                                        "source": stats.source if stats else None})
+            if cancel.is_set():
+                return {"cancelled": True, "elapsed": elapsed}
+            out: Dict[str, Any] = {"x": move["x"], "y": move["y"], "elapsed": elapsed}
+            if pondered:
+                out["pondered"] = True
+            if stats is not None:
+                out["stats"] = stats.to_dict()
+            if req.get("apply", True):
+                pos.make(pos.index(move["x"], move["y"]))
+                out.update(self._result(pos))
+                if self.ponder.get(room):
+                    self._start_ponder(room, session)
+            return out
+
+    @staticmethod
+    def _think(session: GameSession, difficulty: str, time_limit: Optional[float], cancel: threading.Event,
+               stats: Optional[MoveStats], arrived: float) -> Dict[str, int]:
+        # Chạy trong thread của executor; search make/unmake trên chính session.position
+        GOVERNOR.dequeue()
+        # Hạn giờ tính từ lúc request đến: thời gian chờ thread bị trừ vào giới hạn thời gian
+        tier = get_tier(difficulty)
+        if time_limit is not None or (tier.time_limit is not None and tier.max_nodes is None):
+            limit = time_limit if time_limit is not None else tier.time_limit
+            time_limit = max(limit - (time.perf_counter() - arrived), 0.0)
+        return calculate_bot_move(session.position, session.bot_mark, difficulty, session=session,
+                                  time_limit=time_limit, cancel=cancel, stats=stats)
+
+    async def op_ponder(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        room = str(req["room"])
+        async with self._lock(room):
+            session = self._session(room)
+            if session.position.last_move_wins() or session.position.is_full():
+                raise BotError("game is over")
+            return {"pondering": self._start_ponder(room, session) or room in self.pondering}
+
+    async def op_cancel(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        room = str(req["room"])
+        entry = self.pondering.get(room)
+        if entry is not None:
+            entry[1].stop()
+        return {"cancelled": self._request_cancel(room) or entry is not None}
+
+    async def op_close(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        room = str(req["room"])
+        self._request_cancel(room)
+        async with self._lock(room):
+            await self._stop_ponder(room)
+            drop_session(room)
+            self.difficulty.pop(room, None)
+            self.ponder.pop(room, None)
+            self.time_limits.pop(room, None)
+        self.locks.pop(room, None)
+        return {"closed": True}
+
+    # ---------- Kết nối ----------
+
+    async def handle(self, line: bytes) -> Dict[str, Any]:
+        req_id = None
+        try:
+            req = json.loads(line)
+            if not isinstance(req, dict):
+                raise BotError("request must be a JSON object")
+            req_id = req.get("id")
+            handler = getattr(self, "op_" + str(req.get("op")), None)
+            if handler is None:
+                raise BotError(f"unknown op {req.get('op')!r}")
+            out = await handler(req)
+            out.update({"id": req_id, "ok": True})
+            return out
+        except (BotError, KeyError, ValueError, TypeError) as e:
+            message = f"missing field {e}" if isinstance(e, KeyError) else str(e)
+            return {"id": req_id, "ok": False, "error": message}
+        except Exception as e:
+            # Lỗi không lường trước: vẫn trả lời client thay vì để task chết
+            logger.exception("Request failed", extra={"event": "request_error", "id": req_id})
+            return {"id": req_id, "ok": False, "error": f"internal error: {type(e).__name__}"}
+
+    async def _respond(self, line: bytes, writer: asyncio.StreamWriter) -> None:
+        response = await self.handle(line)
+        writer.write(json.dumps(response).encode() + b"\n")
+        await writer.drain()
+
+    async def serve_stream(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Mỗi dòng là một task riêng nên cancel đến được khi think đang chạy"""
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self._respond(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def serve_stdio(self) -> None:
+        loop = asyncio.get_running_loop()
+        out = sys.stdout
+        # stdout dành cho giao thức; log đi ra stderr, print lạc (nếu có) cũng chuyển sang stderr
+        sys.stdout = sys.stderr
+        reader = asyncio.StreamReader(limit=LINE_LIMIT)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, out)
+        writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+        await self.serve_stream(reader, writer)
+
+    async def serve_unix(self, path: str) -> None:
+        if os.path.exists(path):
+            os.unlink(path)
+        server = await asyncio.start_unix_server(self.serve_stream, path, limit=LINE_LIMIT)
+        logger.info("bot_server listening on %s", path, extra={"event": "listening", "path": path})
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Caro bot service (JSON lines)")
+    parser.add_argument("--unix", metavar="PATH", help="lắng nghe trên Unix socket thay vì stdio")
+    parser.add_argument("--threads", type=int, default=THREADS, help="số thread chạy search")
+    parser.add_argument("--log-level", default=LOG_LEVEL, help="mức log (mặc định BOT_LOG_LEVEL hoặc WARNING)")
+    parser.add_argument("--log-json", action="store_true", default=LOG_JSON, help="log dạng JSON lines (BOT_LOG_JSON=1)")
+    args = parser.parse_args()
+
+    configure_logging(args.log_level, args.log_json)
+
+    server = BotServer(args.threads)
+    try:
+        asyncio.run(server.serve_unix(args.unix) if args.unix else server.serve_stdio())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+# budget.py
+# Cấp khó theo ngân sách tính toán (Tier) và bộ điều tiết tải toàn cục (Governor)
+#
+# Mỗi cấp khó là một Tier: kiểu chọn nước (heuristic hay negamax), giới hạn
+# độ sâu / số nước gốc, ngân sách thời gian / node cho negamax và dò đe dọa,
+# và tỉ lệ cố tình đi sai. calculate_bot_move (a.py) lấy Tier theo tên rồi
+# qua GOVERNOR: khi số lượt đang nghĩ (cả lượt đang chờ thread) vượt quá
+# capacity, mọi ngân sách được nhân với capacity / tải, giảm dần đều chứ
+# không để hàng đợi dồn lại. Lượt nghĩ đơn lẻ lúc máy rảnh có hệ số 1.
+#
+#   BOT_TIERS='{"hard": {"time_limit": 2.0}, "expert": {"search": "negamax", "depth": 6, "time_limit": 8}}'
+
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# Mặc định: số CPU; tải trên mức này thì bắt đầu giảm ngân sách
+GOVERNOR_CAPACITY = int(os.environ.get("BOT_GOVERNOR_CAPACITY", "0"))
+# Hệ số ngân sách không xuống dưới mức này dù tải cao tới đâu
+MIN_BUDGET_SCALE = float(os.environ.get("BOT_MIN_BUDGET_SCALE", "0.1"))
+# Hằng số thời gian (giây) của trung bình trượt của tải
+LOAD_WINDOW = float(os.environ.get("BOT_LOAD_WINDOW", "2.0"))
+
+
+class Tier:
+    """Một cấp khó
+
+    search: "heuristic" (điểm tĩnh một nước) hoặc "negamax". root_width giới
+    hạn số ô xét (heuristic: các ô đầu của frontier; negamax: số nước gốc).
+    threats: (có dò VCT không, số node mỗi lần dò, tổng số giây) cho
+    _tactical_cell. error_rate: xác suất bỏ qua nước tốt nhất và đi một nước
+    ngẫu nhiên trong các ô được xét. book: tra sách khai cuộc trước.
+    """
+
+    FIELDS = ("search", "depth", "root_width", "time_limit", "max_nodes", "threats", "error_rate", "book")
+
+    def __init__(self, name: str, search: str = "heuristic", depth: int = 1, root_width: Optional[int] = None,
+                 time_limit: Optional[float] = None, max_nodes: Optional[int] = None,
+                 threats: Tuple[bool, int, float] = (True, 2000, 0.4), error_rate: float = 0.0, book: bool = False):
+        if search not in ("heuristic", "negamax"):
+            raise ValueError(f"unknown search {search!r} for tier {name!r}")
+        self.name = name
+        self.search = search
+        self.depth = depth
+        self.root_width = root_width
+        self.time_limit = time_limit
+        self.max_nodes = max_nodes
+        self.threats = tuple(threats)
+        self.error_rate = error_rate
+        self.book = book
+        self.scale = 1.0
+
+    def scaled(self, scale: float) -> "Tier":
+        """Bản sao với ngân sách thời gian / node (negamax và dò đe dọa) nhân scale"""
+        tier = Tier(self.name, **{field: getattr(self, field) for field in self.FIELDS})
+        tier.scale = scale
+        if scale != 1.0:
+            if tier.time_limit is not None:
+                tier.time_limit *= scale
+            if tier.max_nodes is not None:
+                tier.max_nodes = max(1, int(tier.max_nodes * scale))
+            vct, nodes, seconds = tier.threats
+            tier.threats = (vct, max(1, int(nodes * scale)), seconds * scale)
+        return tier
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = {field: getattr(self, field) for field in self.FIELDS}
+        out["threats"] = list(self.threats)
+        out["scale"] = round(self.scale, 3)
+        return out
+
+
+HARD_TIME_LIMIT = float(os.environ.get("BOT_HARD_TIME_LIMIT", "3.0"))
+
+TIERS: Dict[str, Tier] = {
+    # Giả ngu: nước ngẫu nhiên trong 3 ô đầu của frontier (sau khi đã xét thắng / chặn / đe dọa)
+    "easy": Tier("easy", root_width=3, threats=(False, 500, 0.1), error_rate=1.0),
+    "medium": Tier("medium", threats=(True, 2000, 0.4)),
+    # Sâu tối đa 4 (chưa kể quiescence), 12 nước gốc, dừng khi hết HARD_TIME_LIMIT giây
+    "hard": Tier("hard", search="negamax", depth=4, root_width=12, time_limit=HARD_TIME_LIMIT,
+                 threats=(True, 8000, 1.0), book=True),
+}
+
+
+def _load_overrides(raw: str) -> None:
+    """BOT_TIERS: JSON {tên: {trường: giá trị}}; tên mới được tạo từ các giá trị mặc định của Tier"""
+    for name, fields in json.loads(raw).items():
+        base = TIERS.get(name)
+        values = {field: getattr(base, field) for field in Tier.FIELDS} if base is not None else {}
+        values.update(fields)
+        TIERS[name] = Tier(name, **values)
+
+
+if os.environ.get("BOT_TIERS"):
+    _load_overrides(os.environ["BOT_TIERS"])
+
+
+def get_tier(name: str) -> Tier:
+    """Tier theo tên; tên lạ dùng medium (như trước đây)"""
+    return TIERS.get(name) or TIERS["medium"]
+
+
+class Governor:
+    """Đếm số lượt đang nghĩ / đang chờ thread và chia ngân sách theo tải
+
+    Áp lực là max(đang nghĩ + đang chờ, trung bình trượt theo thời gian của
+    nó): tăng ngay khi lượt dồn tới, giảm dần trong khoảng LOAD_WINDOW giây
+    sau đợt cao điểm. Hệ số = capacity / áp lực khi vượt capacity, không nhỏ
+    hơn min_scale. Lượt chạy nền (ponder) không tính vào áp lực và không vào
+    thống kê theo tier: nó nhường ngân sách cho lượt think thật chứ không
+    làm chúng bị chia nhỏ.
+    """
+
+    def __init__(self, capacity: Optional[int] = None, min_scale: float = MIN_BUDGET_SCALE):
+        self.capacity = capacity or GOVERNOR_CAPACITY or os.cpu_count() or 1
+        self.min_scale = min_scale
+        self.active = 0
+        self.queued = 0
+        self.background = 0
+        self.load = 0.0
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+        # tên tier -> [số lượt, tổng giây, tổng hệ số, hệ số nhỏ nhất, Tier (đã chia) gần nhất]
+        self._tiers: Dict[str, list] = {}
+
+    def _update_load(self) -> None:
+        now = time.monotonic()
+        weight = 1 - math.exp(-(now - self._stamp) / LOAD_WINDOW)
+        self._stamp = now
+        self.load += weight * (self.active + self.queued - self.load)
+
+    def scale(self) -> float:
+        pressure = max(self.load, self.active + self.queued)
+        if pressure <= self.capacity:
+            return 1.0
+        return max(self.min_scale, self.capacity / pressure)
+
+    def enqueue(self) -> None:
+        """Một lượt nghĩ đã được gửi vào hàng đợi thread (bot_server.py)"""
+        with self._lock:
+            self.queued += 1
+            self._update_load()
+
+    def dequeue(self) -> None:
+        with self._lock:
+            self.queued = max(0, self.queued - 1)
+
+    @contextmanager
+    def acquire(self, tier: Tier, background: bool = False) -> Iterator[Tier]:
+        """Tier với ngân sách đã chia theo tải hiện tại, trong suốt một lượt nghĩ"""
+        with self._lock:
+            if background:
+                self.background += 1
+            else:
+                self.active += 1
+                self._update_load()
+            budget = tier.scaled(self.scale())
+        if background:
+            try:
+                yield budget
+            finally:
+                with self._lock:
+                    self.background -= 1
+            return
+        start = time.perf_counter()
+        try:
+            yield budget
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.active -= 1
+                self._update_load()
+                entry = self._tiers.get(tier.name)
+                if entry is None:
+                    entry = self._tiers[tier.name] = [0, 0.0, 0.0, 1.0, budget]
+                entry[0] += 1
+                entry[1] += elapsed
+                entry[2] += budget.scale
+                entry[3] = min(entry[3], budget.scale)
+                entry[4] = budget
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            self._update_load()
+            return {
+                "capacity": self.capacity,
+                "active": self.active,
+                "queued": self.queued,
+                "background": self.background,
+                "load": round(self.load, 3),
+                "scale": round(self.scale(), 3),
+                "tiers": {name: {
+                    "moves": moves,
+                    "avg_ms": round(seconds / moves * 1000, 3),
+                    "avg_scale": round(scales / moves, 3),
+                    "min_scale": round(min_scale, 3),
+                    "last_budget": budget.to_dict(),
+                } for name, (moves, seconds, scales, min_scale, budget) in self._tiers.items()},
+            }
+
+
+GOVERNOR = Governor()
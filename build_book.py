@@ -0,0 +1,112 @@
+# build_book.py
+# Sinh sách khai cuộc (opening_book.py) bằng tìm sâu offline
+#
+#   python build_book.py                                  # bàn 20x20, 8 nước đầu
+#   python build_book.py --size 15 --plies 10 --depth 6 --time-limit 10 -o book15.bin
+#
+# Bot cầm X và bot cầm O được sinh riêng: ở lượt của bot, nước được chọn bằng
+# negamax sâu (depth, time-limit) rồi ghi vào sách; ở lượt đối phương, cây
+# rẽ nhánh theo --replies nước hay nhất theo heuristic. Các thế trùng nhau
+# qua đối xứng chỉ được tìm một lần. Chạy lại với --extend để bổ sung vào
+# sách đã có (entry cũ được giữ).
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, Set
+
+from a import _candidate_moves, _score_cell, get_best_move_with_negamax
+from opening_book import DEFAULT_BOOK, HEADER, RECORD, canonical_key, write_book
+from position import MARKS, Position
+from transposition import TranspositionTable
+
+
+def read_entries(path: str) -> Dict[int, int]:
+    with open(path, "rb") as f:
+        data = f.read()
+    _, _, count = HEADER.unpack_from(data, 0)
+    return dict(RECORD.unpack_from(data, HEADER.size + i * RECORD.size) for i in range(count))
+
+
+class BookBuilder:
+    def __init__(self, size: int, plies: int, replies: int, depth: int, time_limit: float, entries: Dict[int, int]):
+        self.size = size
+        self.plies = plies
+        self.replies = replies
+        self.depth = depth
+        self.time_limit = time_limit
+        self.entries = entries
+        self.seen: Set[int] = set()
+        self.searches = 0
+
+    def best_move(self, pos: Position) -> int:
+        """Nước của bên đang đi theo sách (nếu đã có) hoặc theo negamax sâu"""
+        key, sym = canonical_key(pos)
+        symmetries = pos.geo.symmetries()
+        if key in self.entries:
+            return symmetries[sym].index(self.entries[key])
+        mark = MARKS[pos.side]
+        move = get_best_move_with_negamax(pos, mark, MARKS[pos.side ^ 1], self.depth, TranspositionTable(),
+                                          self.time_limit, workers=1)
+        idx = pos.index(move["x"], move["y"])
+        self.entries[key] = symmetries[sym][idx]
+        self.searches += 1
+        print(f"  [{len(self.entries)}] {len(pos.history)} stones -> {pos.coords(idx)}", file=sys.stderr)
+        return idx
+
+    def expand(self, pos: Position, bot: int) -> None:
+        if len(pos.history) >= self.plies or pos.last_move_wins():
+            return
+        key, _ = canonical_key(pos)
+        if key in self.seen:
+            return
+        self.seen.add(key)
+        if pos.side == bot:
+            children = [self.best_move(pos)]
+        else:
+            # Nước đối phương: các nước hay nhất theo heuristic, bỏ nước cho ra thế đối xứng với nước trước
+            color = pos.side
+            ranked = sorted(_candidate_moves(pos), key=lambda m: _score_cell(pos, m, color), reverse=True)
+            children, child_keys = [], set()
+            for idx in ranked:
+                pos.make(idx)
+                child_key, _ = canonical_key(pos)
+                pos.unmake()
+                if child_key not in child_keys:
+                    child_keys.add(child_key)
+                    children.append(idx)
+                if len(children) == self.replies:
+                    break
+        for idx in children:
+            pos.make(idx)
+            self.expand(pos, bot)
+            pos.unmake()
+
+    def build(self) -> None:
+        for bot in (0, 1):
+            self.seen.clear()
+            self.expand(Position(self.size), bot)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sinh sách khai cuộc cho bot hard")
+    parser.add_argument("--size", type=int, default=20)
+    parser.add_argument("--plies", type=int, default=8, help="số nước đầu được đưa vào sách")
+    parser.add_argument("--replies", type=int, default=3, help="số nước đối phương rẽ nhánh ở mỗi lượt")
+    parser.add_argument("--depth", type=int, default=5)
+    parser.add_argument("--time-limit", type=float, default=5.0, help="giây cho mỗi lượt tìm")
+    parser.add_argument("-o", "--output", default=DEFAULT_BOOK)
+    parser.add_argument("--extend", action="store_true", help="giữ các entry của sách đã có tại --output")
+    args = parser.parse_args()
+
+    entries = read_entries(args.output) if args.extend and os.path.exists(args.output) else {}
+    builder = BookBuilder(args.size, args.plies, args.replies, args.depth, args.time_limit, entries)
+    start = time.perf_counter()
+    builder.build()
+    write_book(args.output, builder.entries)
+    print(f"{len(builder.entries)} entries ({builder.searches} searches, {time.perf_counter() - start:.0f}s) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
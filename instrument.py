@@ -0,0 +1,192 @@
+# instrument.py
+# Đo đạc một lượt bot: thống kê theo nước (MoveStats), thời gian từng bước của
+# calculate_bot_move, hook / cProfile bật theo từng request, và log có cấu trúc
+#
+# Không truyền MoveStats thì calculate_bot_move không đo gì (chỉ vài phép so
+# với None). Log dùng logging: mỗi record có "event" và các trường kèm theo
+# (extra=...), configure_logging in ra stderr dạng text hoặc JSON lines.
+#
+#   BOT_LOG_LEVEL=INFO BOT_LOG_JSON=1 python bot_server.py
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, List, Optional
+
+LOG_LEVEL = os.environ.get("BOT_LOG_LEVEL", "WARNING")
+LOG_JSON = os.environ.get("BOT_LOG_JSON", "0") == "1"
+
+# Số hàm (theo cumulative time) giữ lại trong kết quả cProfile
+PROFILE_TOP = 25
+
+# Các bước của calculate_bot_move, theo thứ tự chạy
+PHASES = ("book", "win_block", "threats", "heuristic", "negamax")
+
+_NO_PHASE = nullcontext()
+
+
+def branching_factor(nodes_by_depth: List[int]) -> Optional[float]:
+    """Hệ số rẽ nhánh hiệu dụng: số node của vòng sâu nhất / của vòng trước"""
+    if len(nodes_by_depth) < 2 or not nodes_by_depth[-2]:
+        return None
+    return round(nodes_by_depth[-1] / nodes_by_depth[-2], 2)
+
+
+def sum_search_stats(parts: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Gộp Searcher.stats() của nhiều searcher (các task của parallel.py)
+
+    Số đếm được cộng, dict theo ply cộng theo từng ply, các tỉ lệ tính lại
+    từ tổng. nodes_by_depth / branching_factor không gộp được, bên gọi tự đặt.
+    """
+    total: Dict[str, Any] = {}
+    for part in parts:
+        for key, value in part.items():
+            if isinstance(value, dict):
+                by_ply = total.setdefault(key, {})
+                for ply, count in value.items():
+                    by_ply[ply] = by_ply.get(ply, 0) + count
+            elif isinstance(value, int) and not isinstance(value, bool):
+                total[key] = total.get(key, 0) + value
+    for key, value in total.items():
+        if isinstance(value, dict):
+            total[key] = dict(sorted(value.items()))
+    cutoffs = total.get("cutoffs", 0)
+    total["first_move_cutoff_rate"] = sum(total.get("first_move_cutoffs_by_ply", {}).values()) / cutoffs if cutoffs else 0.0
+    for name in ("tt", "eval"):
+        if f"{name}_probes" in total:
+            probes = total[f"{name}_probes"]
+            total[f"{name}_hit_rate"] = total[f"{name}_hits"] / probes if probes else 0.0
+    return total
+
+
+class MoveStats:
+    """Thống kê một lần calculate_bot_move, truyền vào qua tham số stats
+
+    source là bước đã quyết định nước đi (book, win, block, threats, random,
+    error, heuristic, negamax, fallback), timings là số giây của từng bước
+    trong PHASES, budget là Tier (budget.py) đã chia theo tải, search là
+    Searcher.stats() của negamax (node, TT, cutoff theo ply, độ sâu, hệ số
+    rẽ nhánh; với tìm song song là tổng của các worker). profile=True chạy
+    lượt dưới cProfile, hook được gọi với chính MoveStats khi lượt kết thúc
+    (kể cả khi lỗi). cProfile chỉ đo process gọi: khi negamax chạy trên pool
+    của parallel.py (BOT_WORKERS > 1) thì phần tìm chỉ hiện là thời gian chờ
+    worker, muốn xem hàm nóng của search thì đặt BOT_WORKERS=1.
+    """
+
+    def __init__(self, profile: bool = False, hook: Optional[Callable[["MoveStats"], None]] = None):
+        self.profile = profile
+        self.hook = hook
+        self.difficulty: Optional[str] = None
+        self.source: Optional[str] = None
+        self.move: Optional[Dict[str, int]] = None
+        self.timings: Dict[str, float] = {}
+        self.search: Dict[str, Any] = {}
+        self.budget: Optional[Dict[str, Any]] = None
+        self.total = 0.0
+        self.error: Optional[str] = None
+        self.profile_text: Optional[str] = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def run(self, fn: Callable[..., Dict[str, int]], *args: Any, **kwargs: Any) -> Dict[str, int]:
+        """Gọi fn, đo tổng thời gian (và cProfile nếu bật), rồi gọi hook"""
+        profiler = cProfile.Profile() if self.profile else None
+        if profiler is not None:
+            try:
+                profiler.enable()
+            except ValueError as e:
+                # Python 3.12+: chỉ một profiler được bật tại một thời điểm
+                self.profile_text = f"profiler unavailable: {e}"
+                profiler = None
+        start = time.perf_counter()
+        try:
+            self.move = fn(*args, **kwargs)
+            return self.move
+        finally:
+            self.total = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP)
+                self.profile_text = out.getvalue()
+            if self.hook is not None:
+                self.hook(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "difficulty": self.difficulty,
+            "source": self.source,
+            "total_ms": round(self.total * 1000, 3),
+            "phases_ms": {name: round(self.timings[name] * 1000, 3) for name in PHASES if name in self.timings},
+        }
+        if self.budget is not None:
+            out["budget"] = self.budget
+        if self.search:
+            out["search"] = self.search
+        if self.error is not None:
+            out["error"] = self.error
+        if self.profile_text is not None:
+            out["profile"] = self.profile_text
+        return out
+
+
+def timed(stats: Optional[MoveStats], name: str) -> ContextManager[None]:
+    """stats.phase(name), hoặc context rỗng dùng chung khi không đo"""
+    return stats.phase(name) if stats is not None else _NO_PHASE
+
+
+# ---------- Log ----------
+
+# Thuộc tính có sẵn của LogRecord; phần còn lại là các trường truyền qua extra=
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Mỗi record một dòng JSON: ts, level, logger, msg và các trường trong extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        out: Dict[str, Any] = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                out[key] = value
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        return json.dumps(out, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Dòng text thường, các trường trong extra nối thêm dạng key=value"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = " ".join(f"{k}={v}" for k, v in vars(record).items() if k not in _RECORD_FIELDS)
+        return f"{line} {fields}" if fields else line
+
+
+def configure_logging(level: Optional[str] = None, json_lines: Optional[bool] = None) -> None:
+    """Handler stderr cho root logger (gọi một lần từ entry point: bot_server, tool CLI)"""
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if (LOG_JSON if json_lines is None else json_lines) else TextFormatter())
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel((level or LOG_LEVEL).upper())
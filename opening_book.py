@@ -0,0 +1,113 @@
+# opening_book.py
+# Sách khai cuộc cho bot hard: file nhị phân đã sắp xếp, mmap và tìm nhị phân
+#
+# Mỗi thế được chuẩn hóa theo 8 phép đối xứng của bàn (xoay, lật) nên một
+# entry dùng chung cho mọi biến thể xoay / lật của thế đó. File gồm header
+# (magic, version, số entry) rồi các record (khóa 64 bit, nước đi trong hệ
+# tọa độ chuẩn) sắp xếp theo khóa. File được sinh bởi build_book.py.
+
+import hashlib
+import logging
+import mmap
+import os
+import struct
+from typing import Dict, Optional, Tuple
+
+from position import SYMMETRY_INVERSE, Position
+
+MAGIC = b"CAROBOOK"
+VERSION = 1
+HEADER = struct.Struct("<8sII")
+RECORD = struct.Struct("<QH")
+
+# Thế có nhiều quân hơn thì không tra sách (thoát sớm, không tính khóa)
+BOOK_MAX_STONES = 10
+
+DEFAULT_BOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book.bin")
+# BOT_OPENING_BOOK="" để tắt sách
+BOOK_PATH = os.environ.get("BOT_OPENING_BOOK", DEFAULT_BOOK)
+
+logger = logging.getLogger(__name__)
+
+
+def canonical_key(pos: Position) -> Tuple[int, int]:
+    """(khóa, phép đối xứng k) với k đưa thế về dạng chuẩn: nhỏ nhất trong 8 ảnh"""
+    best = None
+    best_sym = 0
+    stones = [(idx, color) for color in (0, 1) for idx in pos.stones[color]]
+    for k, perm in enumerate(pos.geo.symmetries()):
+        form = sorted(perm[idx] * 2 + color for idx, color in stones)
+        if best is None or form < best:
+            best, best_sym = form, k
+    data = struct.pack(f"<BB{len(best)}I", pos.size, pos.side, *best)
+    key = int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+    return key, best_sym
+
+
+def write_book(path: str, entries: Dict[int, int]) -> None:
+    """entries: khóa chuẩn -> nước đi (chỉ số ô) trong hệ tọa độ chuẩn"""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(entries)))
+        for key in sorted(entries):
+            f.write(RECORD.pack(key, entries[key]))
+    os.replace(tmp, path)
+
+
+class OpeningBook:
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or len(self._map) != HEADER.size + count * RECORD.size:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {VERSION} opening book")
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def probe(self, key: int) -> Optional[int]:
+        """Nước đi (hệ tọa độ chuẩn) của khóa, None nếu không có"""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mid_key, move = RECORD.unpack_from(self._map, HEADER.size + mid * RECORD.size)
+            if mid_key < key:
+                lo = mid + 1
+            elif mid_key > key:
+                hi = mid
+            else:
+                return move
+        return None
+
+    def lookup(self, pos: Position) -> Optional[int]:
+        """Nước trong sách cho bên đang đi của pos (chỉ số ô thật), None nếu không có"""
+        if len(pos.stones[0]) + len(pos.stones[1]) > BOOK_MAX_STONES:
+            return None
+        key, sym = canonical_key(pos)
+        move = self.probe(key)
+        if move is None or move >= len(pos.cells):
+            return None
+        idx = pos.geo.symmetries()[SYMMETRY_INVERSE[sym]][move]
+        return idx if not pos.cells[idx] else None
+
+    def close(self) -> None:
+        self._map.close()
+
+
+_BOOK: Optional[OpeningBook] = None
+_BOOK_LOADED = False
+
+
+def get_book() -> Optional[OpeningBook]:
+    """Sách tại BOOK_PATH (mở một lần), None nếu không có file hoặc file hỏng"""
+    global _BOOK, _BOOK_LOADED
+    if not _BOOK_LOADED:
+        _BOOK_LOADED = True
+        if BOOK_PATH and os.path.exists(BOOK_PATH):
+            try:
+                _BOOK = OpeningBook(BOOK_PATH)
+            except (OSError, ValueError, struct.error) as e:
+                logger.warning("Opening book disabled: %s", e, extra={"event": "book_disabled", "path": BOOK_PATH})
+    return _BOOK
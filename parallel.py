@@ -0,0 +1,268 @@
+# parallel.py
+# Tìm negamax song song ở gốc cho a.py bằng pool process (GIL không cho dùng thread)
+#
+# Pool được tạo một lần và giữ lại giữa các lượt. Thế cờ gửi sang worker dưới
+# dạng bytes gọn (kích thước, bên đi, rồi một byte mỗi ô) thay vì pickle
+# List[List[str]]. Mỗi nước gốc là một task; alpha tốt nhất ở gốc được chia
+# sẻ qua mảng multiprocessing để worker sau cắt tỉa theo kết quả của worker
+# trước. TT có thể dùng chung qua shared memory (BOT_SHARED_TT=1), nếu không
+# mỗi worker giữ TT riêng.
+#
+# Nhiều lượt tìm (nhiều phòng) chạy cùng lúc trên một pool: mỗi lượt giữ một
+# slot (BOT_SEARCH_SLOTS) gồm alpha và cờ hủy riêng trong shared memory.
+# Hạn giờ là mốc tuyệt đối theo time.time() tính từ lúc lượt tìm bắt đầu, nên
+# task phải xếp hàng chờ worker không được thêm thời gian: task bắt đầu sau
+# hạn thì trả None ngay.
+
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+
+from a import CANONICAL_TT, WIN_SCORE, Searcher, SearchTimeout
+from instrument import branching_factor, sum_search_stats
+from position import Position
+from transposition import EvalCache, SharedTranspositionTable, TranspositionTable
+
+# Mặc định 1 = tìm tuần tự (dùng TT / EvalCache của phiên); 0 = theo số CPU.
+# Worker có TT riêng nên TT của phòng không được dùng lại giữa các lượt
+WORKERS = int(os.environ.get("BOT_WORKERS", "1"))
+SHARED_TT = os.environ.get("BOT_SHARED_TT", "0") == "1"
+# Số lượt tìm song song tối đa cùng lúc trên pool; lượt sau chờ slot (tính vào hạn giờ)
+SEARCH_SLOTS = int(os.environ.get("BOT_SEARCH_SLOTS", "16"))
+# Chu kỳ (giây) process chính kiểm tra cancel khi chờ worker
+CANCEL_POLL = 0.02
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_WORKERS = 0
+# Theo slot: alpha tốt nhất ở gốc và cờ hủy của lượt tìm đang giữ slot
+_ALPHAS = None
+_CANCELS = None
+_SHARED: Optional[SharedTranspositionTable] = None
+# Generation cấp cho lượt tìm kế tiếp (tăng dưới _SLOTS); mỗi lượt giữ một
+# generation riêng suốt các độ sâu nên lượt của phòng khác không làm entry
+# sâu của nó thành "lượt trước"
+_GENERATION = 0
+_POOL_LOCK = threading.Lock()
+_SLOTS = threading.Condition()
+_FREE_SLOTS: List[int] = list(range(SEARCH_SLOTS))
+
+# Trạng thái trong process worker
+_WORKER: Dict[str, Any] = {}
+
+
+def worker_count(workers: Optional[int] = None) -> int:
+    if workers is None:
+        workers = WORKERS
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+
+def encode_position(pos: Position) -> bytes:
+    return bytes((pos.size, pos.side)) + bytes(pos.cells)
+
+
+def decode_position(data: bytes) -> Position:
+    size, side = data[0], data[1]
+    pos = Position(size, side)
+    for idx, cell in enumerate(data[2:]):
+        if cell:
+            pos.put(idx, cell - 1)
+    return pos
+
+
+# ---------- Phía worker ----------
+
+class _SlotCancel:
+    """Cờ hủy của một slot, đọc trong worker (Searcher chỉ cần is_set())"""
+
+    def __init__(self, flags, slot: int):
+        self.flags = flags
+        self.slot = slot
+
+    def is_set(self) -> bool:
+        return bool(self.flags[self.slot])
+
+
+def _init_worker(alphas, cancels, shared_name: Optional[str]) -> None:
+    _WORKER["alphas"] = alphas
+    _WORKER["cancels"] = cancels
+    _WORKER["tt"] = SharedTranspositionTable(name=shared_name) if shared_name else TranspositionTable()
+    _WORKER["eval"] = EvalCache()
+    _WORKER["last"] = (b"", None)
+
+
+def _search_move(data: bytes, move: int, depth: int, generation: int, slot: int,
+                 deadline: Optional[float]) -> Tuple[int, Optional[float], Dict[str, Any]]:
+    """(move, điểm của nước gốc move theo góc nhìn bên đi, Searcher.stats())
+
+    Điểm là None nếu hết giờ / bị hủy.
+
+    deadline là mốc time.time() của cả lượt tìm: task bắt đầu sau mốc đó
+    (đã chờ trong hàng đợi của pool quá lâu) thì trả None ngay.
+    """
+    cancel = _SlotCancel(_WORKER["cancels"], slot)
+    left = deadline - time.time() if deadline is not None else None
+    if cancel.is_set() or (left is not None and left <= 0):
+        return move, None, {"nodes": 0}
+    last_data, pos = _WORKER["last"]
+    if data != last_data:
+        pos = decode_position(data)
+        _WORKER["last"] = (data, pos)
+    tt = _WORKER["tt"]
+    tt.generation = generation
+    alphas = _WORKER["alphas"]
+
+    # Searcher tạo trước make nên ply trong stats tính từ gốc như tìm tuần tự
+    searcher = Searcher(pos, tt, time.perf_counter() + left if left is not None else None, cancel=cancel,
+                        canonical=CANONICAL_TT, eval_cache=_WORKER["eval"])
+    pos.make(move)
+    try:
+        if pos.last_move_wins():
+            return move, WIN_SCORE, {"nodes": 1}
+        bound = alphas[slot]
+        value = -searcher.negamax(depth - 1, float("-inf"), -bound)
+    except SearchTimeout:
+        return move, None, searcher.stats()
+    finally:
+        pos.unmake()
+    with alphas.get_lock():
+        if value > alphas[slot]:
+            alphas[slot] = value
+    return move, value, searcher.stats()
+
+
+# ---------- Phía process chính ----------
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Pool dùng chung; chỉ tạo lại (đổi số worker) khi không có lượt tìm nào đang giữ slot"""
+    global _POOL, _POOL_WORKERS, _ALPHAS, _CANCELS, _SHARED
+    with _POOL_LOCK:
+        # Gọi khi đã giữ một slot: chỉ lượt này đang tìm thì đổi pool được
+        idle = len(_FREE_SLOTS) == SEARCH_SLOTS - 1
+        if _POOL is None or (_POOL_WORKERS != workers and idle):
+            _shutdown_pool()
+            _ALPHAS = multiprocessing.Array("d", SEARCH_SLOTS)
+            _CANCELS = multiprocessing.Array("b", SEARCH_SLOTS, lock=False)
+            _SHARED = SharedTranspositionTable() if SHARED_TT else None
+            _POOL = ProcessPoolExecutor(workers, initializer=_init_worker,
+                                        initargs=(_ALPHAS, _CANCELS, _SHARED.name if _SHARED else None))
+            _POOL_WORKERS = workers
+        return _POOL
+
+
+def _acquire_slot(deadline: Optional[float], cancel: Optional[threading.Event]) -> Optional[Tuple[int, int]]:
+    """(slot trống, generation của lượt tìm), chờ tới hạn giờ (None nếu hết giờ / bị hủy trước khi có slot)"""
+    global _GENERATION
+    with _SLOTS:
+        while not _FREE_SLOTS:
+            if cancel is not None and cancel.is_set():
+                return None
+            timeout = CANCEL_POLL if deadline is None else min(CANCEL_POLL, deadline - time.time())
+            if timeout <= 0:
+                return None
+            _SLOTS.wait(timeout)
+        _GENERATION = (_GENERATION + 1) & 0xFF
+        return _FREE_SLOTS.pop(), _GENERATION
+
+
+def _release_slot(slot: int) -> None:
+    with _SLOTS:
+        _FREE_SLOTS.append(slot)
+        _SLOTS.notify()
+
+
+def shutdown() -> None:
+    with _POOL_LOCK:
+        _shutdown_pool()
+
+
+def _shutdown_pool() -> None:
+    global _POOL, _SHARED
+    if _POOL is not None:
+        _POOL.shutdown(cancel_futures=True)
+        _POOL = None
+    if _SHARED is not None:
+        _SHARED.close()
+        _SHARED = None
+
+
+atexit.register(shutdown)
+
+
+def parallel_root_search(pos: Position, moves: List[int], max_depth: int, workers: int,
+                         time_limit: Optional[float] = None, stats: Optional[Dict[str, Any]] = None,
+                         cancel: Optional[threading.Event] = None, deadline: Optional[float] = None) -> Tuple[int, float, int]:
+    """Sâu dần như Searcher.iterative_deepening nhưng chia các nước gốc cho pool
+
+    Ở mỗi độ sâu, nước đầu (tốt nhất của vòng trước) được tìm trước để có
+    alpha, các nước còn lại chạy song song. deadline là mốc time.time() (mặc
+    định: lúc gọi + time_limit), tính cả thời gian chờ slot và chờ worker.
+    cancel được chuyển sang worker qua cờ của slot nên search đang chạy dừng
+    ngay. Trả về (nước, điểm, độ sâu đã hoàn thành).
+    """
+    if deadline is None and time_limit is not None:
+        deadline = time.time() + time_limit
+    acquired = _acquire_slot(deadline, cancel)
+    if acquired is None:
+        if stats is not None:
+            stats.update({"nodes": 0, "depth": 0, "workers": workers, "shared_tt": SHARED_TT})
+        return moves[0], float("-inf"), 0
+    slot, generation = acquired
+    try:
+        return _root_search(pos, moves, max_depth, workers, deadline, stats, cancel, slot, generation)
+    finally:
+        _release_slot(slot)
+
+
+def _wait(futures: List[Future], cancel: Optional[threading.Event], slot: int) -> None:
+    """Chờ các task xong; cancel được set thì bật cờ hủy của slot để worker dừng"""
+    pending = set(futures)
+    while pending:
+        _, pending = wait(pending, timeout=CANCEL_POLL if cancel is not None else None)
+        if pending and cancel is not None and cancel.is_set():
+            _CANCELS[slot] = 1
+            cancel = None
+
+
+def _root_search(pos: Position, moves: List[int], max_depth: int, workers: int, deadline: Optional[float],
+                 stats: Optional[Dict[str, Any]], cancel: Optional[threading.Event], slot: int,
+                 generation: int) -> Tuple[int, float, int]:
+    pool = _get_pool(workers)
+    _CANCELS[slot] = 0
+    data = encode_position(pos)
+    best_move, best_eval, completed = moves[0], float("-inf"), 0
+    parts: List[Dict[str, Any]] = []
+    nodes_by_depth: List[int] = []
+
+    for depth in range(1, max_depth + 1):
+        if (cancel is not None and cancel.is_set()) or (deadline is not None and time.time() >= deadline):
+            break
+        _ALPHAS[slot] = float("-inf")
+        first = pool.submit(_search_move, data, moves[0], depth, generation, slot, deadline)
+        _wait([first], cancel, slot)
+        results = [first.result()]
+        if results[0][1] is not None and results[0][1] < WIN_SCORE:
+            futures = [pool.submit(_search_move, data, m, depth, generation, slot, deadline) for m in moves[1:]]
+            _wait(futures, cancel, slot)
+            results.extend(f.result() for f in futures)
+        parts.extend(r[2] for r in results)
+        if any(value is None for _, value, _ in results):
+            break
+        results.sort(key=lambda r: r[1], reverse=True)
+        best_move, best_eval = results[0][0], results[0][1]
+        completed = depth
+        nodes_by_depth.append(sum(r[2]["nodes"] for r in results))
+        moves = [r[0] for r in results]
+        if abs(best_eval) >= WIN_SCORE:
+            break
+
+    if stats is not None:
+        stats.update(sum_search_stats(parts))
+        stats.update({"depth": completed, "workers": workers, "shared_tt": _SHARED is not None,
+                      "nodes_by_depth": nodes_by_depth, "branching_factor": branching_factor(nodes_by_depth)})
+    return best_move, best_eval, completed
@@ -0,0 +1,116 @@
+# patterns.py
+# Bảng tra mẫu trên cửa sổ 11 ô cho a.py
+#
+# Cửa sổ quanh một ô được mã hóa cơ số 3 (mỗi ô một chữ số: 0 bị chặn/ngoài
+# bàn, 1 quân mình, 2 trống). Từ hai bitmask (quân mình, ô trống) của
+# Position, chỉ số là TRIT[own] + TRIT2[empty], nên chấm điểm một hướng chỉ
+# còn một lần đọc bảng thay vì dựng chuỗi và tìm chuỗi con.
+
+from itertools import product
+from typing import List, Sequence
+
+WINDOW = 11
+CENTER = 5
+
+# TRIT[m]: số cơ số 3 có chữ số 1 tại các bit bật của m; TRIT2 = 2 * TRIT
+TRIT = [0] * (1 << WINDOW)
+for _m in range(1, 1 << WINDOW):
+    _low = _m & -_m
+    TRIT[_m] = TRIT[_m ^ _low] + 3 ** (_low.bit_length() - 1)
+TRIT2 = [2 * t for t in TRIT]
+
+_CHARS = "OX_"
+
+
+def pattern_priority(pattern: str) -> int:
+    """Điểm mẫu trên chuỗi X (mình) / _ (trống) / O (chặn)"""
+    prio = 0
+    if "XXXX" in pattern:
+        prio += 10000
+    if "_XXX_" in pattern:
+        prio += 5000
+    if "XX_X" in pattern:
+        prio += 3000
+    if "XXX_X" in pattern:
+        prio += 8000
+    if "_XXXX" in pattern:
+        prio += 10000
+    if "XXXX_" in pattern:
+        prio += 10000
+    return prio
+
+
+def line_value(digits: Sequence[int]) -> int:
+    """Giá trị một hướng cho quân ở tâm (tương đương evaluate_line cũ)"""
+    max_consecutive = 0
+    open_ends = 0
+
+    # Forward
+    consecutive = 0
+    for j in range(CENTER, WINDOW):
+        if digits[j] == 1:
+            consecutive += 1
+            max_consecutive = max(max_consecutive, consecutive)
+        elif digits[j] == 2:
+            consecutive = 0
+        else:
+            break
+
+    # Backward
+    consecutive = 0
+    for j in range(CENTER - 1, -1, -1):
+        if digits[j] == 1:
+            consecutive += 1
+            max_consecutive = max(max_consecutive, consecutive)
+        elif digits[j] == 2:
+            consecutive = 0
+        else:
+            break
+
+    # Open ends
+    if digits[CENTER - 1] == 2:
+        open_ends += 1
+    if digits[CENTER + 1] == 2:
+        open_ends += 1
+
+    if max_consecutive >= 5:
+        return 1000000
+    if max_consecutive == 4 and open_ends >= 2:
+        return 50000
+    if max_consecutive == 4 and open_ends == 1:
+        return 10000
+    if max_consecutive == 4 and open_ends == 0:
+        return 1000
+    if max_consecutive == 3 and open_ends >= 2:
+        return 5000
+    if max_consecutive == 3 and open_ends == 1:
+        return 500
+    if max_consecutive == 3 and open_ends == 0:
+        return 50
+    if max_consecutive == 2 and open_ends >= 2:
+        return 100
+    if max_consecutive == 2 and open_ends == 1:
+        return 10
+    if max_consecutive == 2 and open_ends == 0:
+        return 2
+    if max_consecutive == 1 and open_ends >= 2:
+        return 5
+    return 1
+
+
+def _build_tables():
+    priority = [0] * 3 ** WINDOW
+    values = [0] * 3 ** WINDOW
+    powers = [3 ** j for j in range(WINDOW)]
+    # Chỉ cần các cửa sổ có quân mình ở tâm
+    for rest in product((0, 1, 2), repeat=WINDOW - 1):
+        digits = rest[:CENTER] + (1,) + rest[CENTER:]
+        code = sum(d * p for d, p in zip(digits, powers))
+        priority[code] = pattern_priority("".join(_CHARS[d] for d in digits))
+        values[code] = line_value(digits)
+    return priority, values
+
+
+PRIORITY: List[int]
+LINE_VALUE: List[int]
+PRIORITY, LINE_VALUE = _build_tables()
@@ -0,0 +1,84 @@
+# ponder.py
+# Suy nghĩ trong lượt của đối phương (ponder) cho bot_server.py
+#
+# Sau khi bot đi, Ponder dự đoán vài nước trả lời có khả năng nhất của đối
+# phương (predict_replies) rồi lần lượt tính sẵn nước đáp cho từng nước trên
+# một bản sao thế cờ, dùng chung TT / cache điểm lá / cache đe dọa của
+# session. Khi nước thật đến: trùng nước đã tính xong thì trả ngay, trùng
+# nước đang tính thì chờ nốt lượt tính đó, còn lại thì hủy và tìm như thường
+# (TT đã ấm từ các nhánh vừa tính). Ponder là tải nền với GOVERNOR (budget.py):
+# không làm ngân sách của các lượt think thật bị chia nhỏ.
+
+import os
+import threading
+from typing import Dict, List, Optional
+
+from a import _candidate_moves, _find_winning_cell, _score_cell, calculate_bot_move
+from position import Position
+from session import GameSession
+
+# BOT_PONDER=1 bật ponder mặc định cho mọi phòng (open {ponder} ghi đè theo phòng)
+PONDER = os.environ.get("BOT_PONDER", "0") == "1"
+PONDER_REPLIES = int(os.environ.get("BOT_PONDER_REPLIES", "3"))
+# easy rẻ sẵn, không cần tính trước
+PONDER_DIFFICULTIES = ("medium", "hard")
+
+
+def predict_replies(pos: Position, count: int = PONDER_REPLIES) -> List[int]:
+    """Các nước có khả năng nhất của bên đến lượt (đối phương của bot)
+
+    Đối phương thắng ngay được thì không còn gì để tính; phải chặn thì chỉ
+    một nước; còn lại lấy count nước có điểm heuristic cao nhất.
+    """
+    if pos.last_move_wins() or pos.is_full():
+        return []
+    color = pos.side
+    if _find_winning_cell(pos, color) is not None:
+        return []
+    block = _find_winning_cell(pos, color ^ 1)
+    if block is not None:
+        return [block]
+    moves = _candidate_moves(pos)
+    moves.sort(key=lambda m: _score_cell(pos, m, color), reverse=True)
+    return moves[:count]
+
+
+class Ponder:
+    """Một lượt ponder của một phòng; run() chạy trong thread, stop() gọi từ event loop
+
+    results: hash của thế sau nước đối phương -> nước bot đã tính xong.
+    """
+
+    def __init__(self, session: GameSession, difficulty: str, time_limit: Optional[float] = None, replies: int = PONDER_REPLIES):
+        self.session = session
+        self.difficulty = difficulty
+        self.time_limit = time_limit
+        self.pos = session.position.copy()
+        self.replies = predict_replies(self.pos, replies)
+        self.results: Dict[int, Dict[str, int]] = {}
+        self.current: Optional[int] = None
+        # cancel: bỏ ngay (search dừng giữa chừng); finish: dừng sau nước đang tính
+        self.cancel = threading.Event()
+        self.finish = threading.Event()
+
+    def run(self) -> None:
+        bot_mark = self.session.bot_mark
+        for reply in self.replies:
+            if self.cancel.is_set() or self.finish.is_set():
+                break
+            self.pos.make(reply)
+            if not (self.pos.last_move_wins() or self.pos.is_full()):
+                key = self.current = self.pos.hash
+                move = calculate_bot_move(self.pos, bot_mark, self.difficulty, session=self.session,
+                                          time_limit=self.time_limit, cancel=self.cancel, background=True)
+                if not self.cancel.is_set():
+                    self.results[key] = move
+                self.current = None
+            self.pos.unmake()
+
+    def stop(self, key: Optional[int] = None) -> None:
+        """Thế thật có hash key: đang tính đúng thế đó thì để tính xong, ngược lại hủy"""
+        if key is not None and self.current == key and key not in self.results:
+            self.finish.set()
+        else:
+            self.cancel.set()
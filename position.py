@@ -0,0 +1,367 @@
+# position.py
+# Biểu diễn bàn cờ dạng bitboard cho bot (thay cho List[List[str]])
+#
+# Mỗi bên giữ một số nguyên lớn (bitboard phẳng, có cột đệm để không tràn
+# hàng) và một bitmask cho từng đường (ngang, dọc, 2 chéo). Bit của đường
+# được dịch thêm PAD nên cửa sổ 11 ô quanh một ô lấy ra bằng một phép dịch
+# và một phép AND, không cần kiểm tra biên.
+
+import os
+import random
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+MARKS = ("X", "O")
+DIRECTIONS = [(1, 0), (0, 1), (1, 1), (1, -1)]
+
+PAD = 5
+WINDOW_MASK = (1 << (2 * PAD + 1)) - 1  # 11 ô: offset -5..+5
+CENTER_BIT = 1 << PAD
+
+# 8 phép đối xứng của bàn vuông (xoay, lật): (đổi x với y, lật x, lật y), áp dụng theo thứ tự đó
+SYMMETRIES = [(swap, flip_x, flip_y) for swap in (False, True) for flip_x in (False, True) for flip_y in (False, True)]
+SYMMETRY_INVERSE = [SYMMETRIES.index((s, fy, fx) if s else (s, fx, fy)) for s, fx, fy in SYMMETRIES]
+
+
+def color_of(mark: str) -> int:
+    return 0 if mark == "X" else 1
+
+
+class Geometry:
+    """Bảng tra hình học dùng chung cho mọi Position cùng kích thước"""
+
+    __slots__ = ("size", "stride", "cell_bit", "cell_lines", "valid", "steps", "zobrist", "zobrist_side", "_neighbors",
+                 "_symmetries", "_sym_zobrist")
+
+    def __init__(self, size: int):
+        n = size
+        self.size = n
+        # Cột đệm thứ n luôn trống nên dịch theo hàng không bị tràn sang hàng kế
+        self.stride = n + 1
+        self.steps = (self.stride, 1, self.stride + 1, self.stride - 1)
+
+        n_lines = 6 * n - 2
+        valid = [0] * n_lines
+        cell_bit = [0] * (n * n)
+        cell_lines = [None] * (n * n)
+        for x in range(n):
+            for y in range(n):
+                idx = x * n + y
+                cell_bit[idx] = 1 << (x * self.stride + y)
+                # (id đường, vị trí trên đường) theo thứ tự DIRECTIONS
+                ids = (y, n + x, 2 * n + (x - y + n - 1), 4 * n - 1 + (x + y))
+                offs = (x, y, x, x)
+                entry = []
+                for line_id, off in zip(ids, offs):
+                    valid[line_id] |= 1 << (off + PAD)
+                    entry.append(line_id)
+                    entry.append(off)
+                cell_lines[idx] = tuple(entry)
+        self.valid = valid
+        self.cell_bit = cell_bit
+        self.cell_lines = cell_lines
+
+        # Zobrist: khóa 64 bit cho (màu, ô) tại zobrist[color * n * n + idx]
+        # và một khóa cho bên đến lượt. Seed theo kích thước nên khóa ổn định
+        # giữa các lần chạy và giữa các process.
+        rng = random.Random(f"zobrist-{n}")
+        self.zobrist = [rng.getrandbits(64) for _ in range(2 * n * n)]
+        self.zobrist_side = rng.getrandbits(64)
+        self._neighbors: Dict[int, List[Tuple[int, ...]]] = {}
+        self._symmetries: Optional[List[List[int]]] = None
+        self._sym_zobrist: Optional[List[Tuple[int, ...]]] = None
+
+    def neighbors(self, radius: int) -> List[Tuple[int, ...]]:
+        """neighbors(r)[idx]: các ô trong bàn cách idx tối đa r ô (theo cả x và y)"""
+        table = self._neighbors.get(radius)
+        if table is None:
+            n = self.size
+            table = []
+            for x in range(n):
+                for y in range(n):
+                    table.append(tuple(
+                        nx * n + ny
+                        for nx in range(max(x - radius, 0), min(x + radius + 1, n))
+                        for ny in range(max(y - radius, 0), min(y + radius + 1, n))
+                        if nx != x or ny != y
+                    ))
+            self._neighbors[radius] = table
+        return table
+
+    def symmetries(self) -> List[List[int]]:
+        """symmetries()[k][idx]: ảnh của ô idx qua SYMMETRIES[k] (k = 0 là phép đồng nhất)"""
+        if self._symmetries is None:
+            n = self.size
+            table = []
+            for swap, flip_x, flip_y in SYMMETRIES:
+                perm = []
+                for x in range(n):
+                    for y in range(n):
+                        tx, ty = (y, x) if swap else (x, y)
+                        if flip_x:
+                            tx = n - 1 - tx
+                        if flip_y:
+                            ty = n - 1 - ty
+                        perm.append(tx * n + ty)
+                table.append(perm)
+            self._symmetries = table
+        return self._symmetries
+
+    def symmetric_zobrist(self) -> List[Tuple[int, ...]]:
+        """symmetric_zobrist()[color * n * n + idx]: 8 khóa Zobrist của ảnh (màu, ô) qua từng phép đối xứng"""
+        if self._sym_zobrist is None:
+            nn = self.size * self.size
+            zobrist = self.zobrist
+            perms = self.symmetries()
+            self._sym_zobrist = [tuple(zobrist[color * nn + perm[idx]] for perm in perms)
+                                 for color in (0, 1) for idx in range(nn)]
+        return self._sym_zobrist
+
+
+# Geometry theo kích thước, giữ tối đa GEOMETRY_CACHE kích thước dùng gần nhất
+# (Zobrist sinh từ seed theo kích thước nên dựng lại cho cùng khóa)
+GEOMETRY_CACHE = int(os.environ.get("BOT_GEOMETRY_CACHE", "16"))
+_GEOMETRY: "OrderedDict[int, Geometry]" = OrderedDict()
+
+
+def get_geometry(size: int) -> Geometry:
+    geo = _GEOMETRY.get(size)
+    if geo is None:
+        geo = _GEOMETRY[size] = Geometry(size)
+        while len(_GEOMETRY) > GEOMETRY_CACHE:
+            _GEOMETRY.popitem(last=False)
+    else:
+        _GEOMETRY.move_to_end(size)
+    return geo
+
+
+class Position:
+    """Thế cờ có make/unmake; ô được đánh số idx = x * size + y
+
+    Tập ô ứng viên (frontier) được cập nhật cùng make/unmake: near[idx] đếm
+    số quân trong bán kính radius quanh idx, frontier là các ô trống có
+    near > 0. Lịch sử nước đi (history) chính là stack để gỡ lại.
+
+    Sau track_symmetries(), sym_hashes giữ hash quân cờ của 8 ảnh đối xứng
+    (cập nhật cùng make/unmake) để canonical() cho khóa chung của các thế
+    đối xứng nhau.
+    """
+
+    __slots__ = ("size", "geo", "cells", "bits", "lines", "stones", "history", "side", "hash",
+                 "radius", "near", "frontier", "_nbrs", "sym_hashes", "_sym_zobrist")
+
+    def __init__(self, size: int, side: int = 0, radius: int = 1):
+        self.size = size
+        self.geo = get_geometry(size)
+        self.radius = radius
+        self._nbrs = self.geo.neighbors(radius)
+        self.near = bytearray(size * size)
+        self.frontier = set()
+        self.cells = bytearray(size * size)  # 0 trống, 1 X, 2 O
+        self.bits = [0, 0]
+        n_lines = len(self.geo.valid)
+        self.lines = [[0] * n_lines, [0] * n_lines]
+        self.stones: List[List[int]] = [[], []]
+        self.history: List[int] = []
+        self.side = side
+        self.hash = self.geo.zobrist_side if side else 0
+        self.sym_hashes: Optional[List[int]] = None
+        self._sym_zobrist: Optional[List[Tuple[int, ...]]] = None
+
+    @classmethod
+    def from_board(cls, board: List[List[Any]], to_move: str = "X", radius: int = 1) -> "Position":
+        n = len(board)
+        pos = cls(n, color_of(to_move), radius)
+        for x in range(n):
+            row = board[x]
+            for y in range(n):
+                cell = row[y]
+                if cell is not None:
+                    pos.put(x * n + y, color_of(cell))
+        return pos
+
+    def to_board(self) -> List[List[Optional[str]]]:
+        n = self.size
+        return [[MARKS[c - 1] if c else None for c in self.cells[x * n:(x + 1) * n]] for x in range(n)]
+
+    def copy(self) -> "Position":
+        pos = Position(self.size, self.side, self.radius)
+        pos.cells[:] = self.cells
+        pos.near[:] = self.near
+        pos.frontier = set(self.frontier)
+        pos.bits = self.bits[:]
+        pos.lines = [self.lines[0][:], self.lines[1][:]]
+        pos.stones = [self.stones[0][:], self.stones[1][:]]
+        pos.history = self.history[:]
+        pos.hash = self.hash
+        if self.sym_hashes is not None:
+            pos.sym_hashes = self.sym_hashes[:]
+            pos._sym_zobrist = self._sym_zobrist
+        return pos
+
+    # ---------- Đặt / gỡ quân ----------
+
+    def put(self, idx: int, color: int) -> None:
+        """Đặt quân không ghi lịch sử (dùng khi dựng thế cờ ban đầu)"""
+        self.cells[idx] = color + 1
+        self.bits[color] |= self.geo.cell_bit[idx]
+        self.hash ^= self.geo.zobrist[color * len(self.cells) + idx]
+        if self.sym_hashes is not None:
+            self._xor_symmetric(color * len(self.cells) + idx)
+        lines = self.lines[color]
+        l0, p0, l1, p1, l2, p2, l3, p3 = self.geo.cell_lines[idx]
+        lines[l0] |= 1 << (p0 + PAD)
+        lines[l1] |= 1 << (p1 + PAD)
+        lines[l2] |= 1 << (p2 + PAD)
+        lines[l3] |= 1 << (p3 + PAD)
+        self.stones[color].append(idx)
+
+        cells = self.cells
+        near = self.near
+        frontier = self.frontier
+        frontier.discard(idx)
+        for nb in self._nbrs[idx]:
+            near[nb] += 1
+            if not cells[nb]:
+                frontier.add(nb)
+
+    def make(self, idx: int) -> None:
+        """Bên đang đi đặt quân tại idx rồi đổi lượt"""
+        self.put(idx, self.side)
+        self.history.append(idx)
+        self.side ^= 1
+        self.hash ^= self.geo.zobrist_side
+
+    def unmake(self) -> int:
+        idx = self.history.pop()
+        self.side ^= 1
+        color = self.side
+        self.cells[idx] = 0
+        self.bits[color] ^= self.geo.cell_bit[idx]
+        self.hash ^= self.geo.zobrist[color * len(self.cells) + idx] ^ self.geo.zobrist_side
+        if self.sym_hashes is not None:
+            self._xor_symmetric(color * len(self.cells) + idx)
+        lines = self.lines[color]
+        l0, p0, l1, p1, l2, p2, l3, p3 = self.geo.cell_lines[idx]
+        lines[l0] ^= 1 << (p0 + PAD)
+        lines[l1] ^= 1 << (p1 + PAD)
+        lines[l2] ^= 1 << (p2 + PAD)
+        lines[l3] ^= 1 << (p3 + PAD)
+        self.stones[color].pop()
+
+        near = self.near
+        frontier = self.frontier
+        for nb in self._nbrs[idx]:
+            near[nb] -= 1
+            if not near[nb]:
+                frontier.discard(nb)
+        if near[idx]:
+            frontier.add(idx)
+        return idx
+
+    # ---------- Truy vấn ----------
+
+    @property
+    def last_move(self) -> Optional[int]:
+        return self.history[-1] if self.history else None
+
+    def is_full(self) -> bool:
+        return len(self.stones[0]) + len(self.stones[1]) == self.size * self.size
+
+    def index(self, x: int, y: int) -> int:
+        return x * self.size + y
+
+    def coords(self, idx: int) -> Tuple[int, int]:
+        return divmod(idx, self.size)
+
+    def move_dict(self, idx: int) -> Dict[str, int]:
+        x, y = divmod(idx, self.size)
+        return {"x": x, "y": y}
+
+    # ---------- Khóa đối xứng ----------
+
+    def track_symmetries(self) -> None:
+        """Bật cập nhật 8 hash đối xứng (tính từ các quân hiện có)"""
+        if self.sym_hashes is not None:
+            return
+        self._sym_zobrist = self.geo.symmetric_zobrist()
+        self.sym_hashes = [0] * 8
+        nn = len(self.cells)
+        for color in (0, 1):
+            for idx in self.stones[color]:
+                self._xor_symmetric(color * nn + idx)
+
+    def _xor_symmetric(self, key_idx: int) -> None:
+        keys = self._sym_zobrist[key_idx]
+        sym = self.sym_hashes
+        for k in range(8):
+            sym[k] ^= keys[k]
+
+    def canonical(self) -> Tuple[int, int]:
+        """(khóa chung của 8 thế đối xứng kể cả bên đi, phép đối xứng k đưa thế này về thế chuẩn)
+
+        Nước đi idx của thế này ứng với geo.symmetries()[k][idx] trên thế
+        chuẩn. Cần gọi track_symmetries() trước.
+        """
+        sym = self.sym_hashes
+        k = min(range(8), key=sym.__getitem__)
+        return (sym[k] ^ self.geo.zobrist_side if self.side else sym[k]), k
+
+    def compute_hash(self) -> int:
+        """Tính lại hash từ đầu (để kiểm tra hash cập nhật tăng dần)"""
+        geo = self.geo
+        nn = len(self.cells)
+        h = geo.zobrist_side if self.side else 0
+        for color in (0, 1):
+            for idx in self.stones[color]:
+                h ^= geo.zobrist[color * nn + idx]
+        return h
+
+    def windows(self, idx: int, color: int) -> List[Tuple[int, int, int]]:
+        """4 cửa sổ 11 ô quanh idx: (bit quân mình, bit ô trống, bit ô trong bàn)
+
+        Bit j ứng với offset j - 5. Ô ngoài bàn và quân đối phương đều
+        không nằm trong hai mask đầu (coi như bị chặn).
+        """
+        own_lines = self.lines[color]
+        opp_lines = self.lines[color ^ 1]
+        valid = self.geo.valid
+        cl = self.geo.cell_lines[idx]
+        out = []
+        for k in range(0, 8, 2):
+            line_id = cl[k]
+            shift = cl[k + 1]
+            own = (own_lines[line_id] >> shift) & WINDOW_MASK
+            opp = (opp_lines[line_id] >> shift) & WINDOW_MASK
+            on_board = (valid[line_id] >> shift) & WINDOW_MASK
+            out.append((own, on_board & ~(own | opp), on_board))
+        return out
+
+    def wins_if_played(self, idx: int, color: int) -> bool:
+        """Đặt quân color tại idx có tạo 5 con liên tiếp đi qua idx không"""
+        own_lines = self.lines[color]
+        cl = self.geo.cell_lines[idx]
+        for k in range(0, 8, 2):
+            w = ((own_lines[cl[k]] >> cl[k + 1]) & WINDOW_MASK) | CENTER_BIT
+            # Bit j của m bật khi các bit j..j+4 đều bật; chuỗi đi qua tâm ứng với j = 1..5
+            m = w & (w >> 1) & (w >> 2) & (w >> 3) & (w >> 4)
+            if m & 0b111110:
+                return True
+        return False
+
+    def last_move_wins(self) -> bool:
+        if not self.history:
+            return False
+        idx = self.history[-1]
+        return self.wins_if_played(idx, self.side ^ 1)
+
+    def has_five(self, color: int) -> bool:
+        b = self.bits[color]
+        for s in self.geo.steps:
+            if b & (b >> s) & (b >> 2 * s) & (b >> 3 * s) & (b >> 4 * s):
+                return True
+        return False
+
+    def border_cells(self) -> List[int]:
+        """Ô trống trong bán kính radius của ít nhất một quân"""
+        return list(self.frontier)
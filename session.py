@@ -0,0 +1,62 @@
+# session.py
+# Trạng thái bot theo từng ván (mỗi phòng P2B một session)
+#
+# Session giữ lại TT và cache điểm lá giữa các lượt nên kết quả tìm ở lượt
+# trước được dùng lại. Số session trong một worker có giới hạn (LRU) nên tổng
+# bộ nhớ của worker không vượt quá (BOT_TT_MB + BOT_EVAL_CACHE_MB) * BOT_MAX_SESSIONS.
+
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from position import Position
+from transposition import EvalCache, TranspositionTable
+
+MAX_SESSIONS = int(os.environ.get("BOT_MAX_SESSIONS", "64"))
+THREAT_CACHE_SIZE = 1 << 16
+
+
+class GameSession:
+    def __init__(self, board_size: int, bot_mark: str, tt_bytes: Optional[int] = None):
+        self.board_size = board_size
+        self.bot_mark = bot_mark
+        self.tt = TranspositionTable(tt_bytes)
+        self.eval_cache = EvalCache()
+        # Thế cờ hiện tại khi bot chạy dạng service (bot_server.py), cập nhật theo từng nước
+        self.position: Optional[Position] = None
+        # Kết quả dò đe dọa: nước thắng ép đã chứng minh (hash -> ô) và kết quả theo thế
+        self.threat_proofs: Dict[int, int] = {}
+        self.threat_results: Dict[Tuple[int, str], Any] = {}
+
+    def trim_threat_cache(self) -> None:
+        if len(self.threat_proofs) > THREAT_CACHE_SIZE:
+            self.threat_proofs.clear()
+        if len(self.threat_results) > THREAT_CACHE_SIZE:
+            self.threat_results.clear()
+
+
+_SESSIONS: "OrderedDict[str, GameSession]" = OrderedDict()
+
+
+def get_session(room_id: str, board_size: int, bot_mark: str, tt_bytes: Optional[int] = None) -> GameSession:
+    """Lấy (hoặc tạo) session của phòng; ván mới khác kích thước/quân thì tạo lại"""
+    session = _SESSIONS.get(room_id)
+    if session is None or session.board_size != board_size or session.bot_mark != bot_mark:
+        session = GameSession(board_size, bot_mark, tt_bytes)
+        _SESSIONS[room_id] = session
+    _SESSIONS.move_to_end(room_id)
+    while len(_SESSIONS) > MAX_SESSIONS:
+        _SESSIONS.popitem(last=False)
+    return session
+
+
+def find_session(room_id: str) -> Optional[GameSession]:
+    """Session đang có của phòng (không tạo mới)"""
+    session = _SESSIONS.get(room_id)
+    if session is not None:
+        _SESSIONS.move_to_end(room_id)
+    return session
+
+
+def drop_session(room_id: str) -> None:
+    _SESSIONS.pop(room_id, None)
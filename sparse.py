@@ -0,0 +1,269 @@
+# sparse.py
+# Bàn cờ thưa cho bàn lớn (30x30 trở lên) hoặc không giới hạn kích thước
+#
+# Quân được lưu theo tọa độ, mỗi đường (ngang, dọc, 2 chéo) có chỉ mục riêng
+# {vị trí trên đường: màu}, tập ô ứng viên (frontier) cập nhật cùng
+# make/unmake. Mọi thao tác tốn theo số quân, không theo diện tích bàn.
+#
+# b.py chấm điểm trực tiếp trên SparseBoard. a.py (bitboard) chạy trên một
+# Position cắt quanh các quân (to_position): cửa sổ của a.py chỉ rộng 5 ô
+# mỗi phía nên lề SPARSE_MARGIN ô cho cùng kết quả như trên bàn đầy đủ, trừ
+# chuỗi ép rất dài chạm tới mép cắt. Cạnh vùng cắt không quá SPARSE_MAX_SIDE:
+# quân rải xa nhau thì chỉ cắt quanh cụm quân của các nước vừa đi, nên chi
+# phí theo cụm đang đánh chứ không theo diện tích bao mọi quân.
+
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from position import MARKS, Position, color_of
+
+Cell = Tuple[int, int]
+
+DIRECTIONS = [(1, 0), (0, 1), (1, 1), (1, -1)]
+NEIGHBORS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+
+# Lề quanh các quân khi cắt Position cho a.py; kích thước cắt làm tròn lên
+# bội số của SPARSE_ROUND để ít kích thước Geometry khác nhau
+SPARSE_MARGIN = 16
+SPARSE_ROUND = 8
+SPARSE_MAX_SIDE = 64
+# Hai quân cách nhau (Chebyshev) không quá CLUSTER_GAP ô thì chung cụm: xa hơn
+# thì không cùng cửa sổ 5 ô nào
+CLUSTER_GAP = 5
+
+
+def _line(x: int, y: int, d: int) -> Tuple[Tuple[int, int], int]:
+    """(khóa đường, vị trí trên đường) của ô (x, y) theo hướng DIRECTIONS[d]"""
+    if d == 0:
+        return (0, y), x
+    if d == 1:
+        return (1, x), y
+    if d == 2:
+        return (2, x - y), x
+    return (3, x + y), x
+
+
+class SparseBoard:
+    """Quân theo tọa độ {(x, y): màu}; size=None là bàn không giới hạn (tọa độ âm được)"""
+
+    def __init__(self, size: Optional[int] = None, side: int = 0):
+        self.size = size
+        self.side = side
+        self.stones: Dict[Cell, int] = {}
+        self.lines: Dict[Tuple[int, int], Dict[int, int]] = {}
+        self.near: Dict[Cell, int] = {}
+        self.frontier: Set[Cell] = set()
+        self.history: List[Cell] = []
+
+    @classmethod
+    def from_board(cls, board: List[List[Any]], to_move: str = "X") -> "SparseBoard":
+        """Từ List[List[str]] (duyệt cả bàn một lần; nên giữ SparseBoard và make từng nước)"""
+        sparse = cls(len(board), color_of(to_move))
+        for x, row in enumerate(board):
+            for y, cell in enumerate(row):
+                if cell is not None:
+                    sparse.put((x, y), color_of(cell))
+        return sparse
+
+    @classmethod
+    def from_moves(cls, moves: Iterable[Cell], size: Optional[int] = None) -> "SparseBoard":
+        """Các nước đi luân phiên, X đi trước"""
+        sparse = cls(size)
+        for cell in moves:
+            sparse.make(tuple(cell))
+        return sparse
+
+    # ---------- Đặt / gỡ quân ----------
+
+    def in_bounds(self, cell: Cell) -> bool:
+        n = self.size
+        return n is None or (0 <= cell[0] < n and 0 <= cell[1] < n)
+
+    def put(self, cell: Cell, color: int) -> None:
+        """Đặt quân không ghi lịch sử (dùng khi dựng thế cờ ban đầu)"""
+        if cell in self.stones or not self.in_bounds(cell):
+            raise ValueError(f"cannot place a stone at {cell}")
+        x, y = cell
+        self.stones[cell] = color
+        for d in range(4):
+            key, t = _line(x, y, d)
+            line = self.lines.get(key)
+            if line is None:
+                line = self.lines[key] = {}
+            line[t] = color
+        self.frontier.discard(cell)
+        near = self.near
+        for dx, dy in NEIGHBORS:
+            nb = (x + dx, y + dy)
+            if self.in_bounds(nb):
+                near[nb] = near.get(nb, 0) + 1
+                if nb not in self.stones:
+                    self.frontier.add(nb)
+
+    def make(self, cell: Cell) -> None:
+        self.put(cell, self.side)
+        self.history.append(cell)
+        self.side ^= 1
+
+    def unmake(self) -> Cell:
+        cell = self.history.pop()
+        self.side ^= 1
+        x, y = cell
+        del self.stones[cell]
+        for d in range(4):
+            key, t = _line(x, y, d)
+            line = self.lines[key]
+            del line[t]
+            if not line:
+                del self.lines[key]
+        near = self.near
+        for dx, dy in NEIGHBORS:
+            nb = (x + dx, y + dy)
+            if nb in near:
+                near[nb] -= 1
+                if not near[nb]:
+                    del near[nb]
+                    self.frontier.discard(nb)
+        if cell in near:
+            self.frontier.add(cell)
+        return cell
+
+    # ---------- Truy vấn ----------
+
+    def is_full(self) -> bool:
+        return self.size is not None and len(self.stones) == self.size * self.size
+
+    def border_cells(self) -> List[Cell]:
+        """Ô trống kề (8 hướng) với ít nhất một quân"""
+        return list(self.frontier)
+
+    def bounds(self) -> Optional[Tuple[int, int, int, int]]:
+        """(x nhỏ nhất, x lớn nhất, y nhỏ nhất, y lớn nhất) của các quân, None nếu bàn trống"""
+        if not self.stones:
+            return None
+        xs = [x for x, _ in self.stones]
+        ys = [y for _, y in self.stones]
+        return min(xs), max(xs), min(ys), max(ys)
+
+    def line_string(self, cell: Cell, d: int, mark: str, half: int = 4) -> str:
+        """2*half+1 ô quanh cell theo hướng d, góc nhìn của mark: X mình, O đối phương, _ trống / ngoài bàn"""
+        x, y = cell
+        key, t = _line(x, y, d)
+        line = self.lines.get(key)
+        if not line:
+            return "_" * (2 * half + 1)
+        own = color_of(mark)
+        chars = []
+        for s in range(t - half, t + half + 1):
+            color = line.get(s)
+            chars.append("_" if color is None else "X" if color == own else "O")
+        return "".join(chars)
+
+    def wins_if_played(self, cell: Cell, color: int) -> bool:
+        x, y = cell
+        for d in range(4):
+            key, t = _line(x, y, d)
+            line = self.lines.get(key, {})
+            count = 1
+            s = t - 1
+            while line.get(s) == color:
+                count += 1
+                s -= 1
+            s = t + 1
+            while line.get(s) == color:
+                count += 1
+                s += 1
+            if count >= 5:
+                return True
+        return False
+
+    def clusters(self, gap: int = CLUSTER_GAP) -> List[List[Cell]]:
+        """Các cụm quân: quân cách nhau không quá gap ô (theo 8 hướng) thuộc cùng cụm"""
+        buckets: Dict[Cell, List[Cell]] = {}
+        for x, y in self.stones:
+            buckets.setdefault((x // gap, y // gap), []).append((x, y))
+        seen: Set[Cell] = set()
+        out = []
+        for start in self.stones:
+            if start in seen:
+                continue
+            seen.add(start)
+            cluster, stack = [], [start]
+            while stack:
+                x, y = stack.pop()
+                cluster.append((x, y))
+                bx, by = x // gap, y // gap
+                for dx in (-1, 0, 1):
+                    for dy in (-1, 0, 1):
+                        for other in buckets.get((bx + dx, by + dy), ()):
+                            if other not in seen and abs(other[0] - x) <= gap and abs(other[1] - y) <= gap:
+                                seen.add(other)
+                                stack.append(other)
+            out.append(cluster)
+        return out
+
+    def _focus_bounds(self, max_span: int) -> Tuple[int, int, int, int]:
+        """Hộp bao các cụm của những nước vừa đi (mới nhất trước) còn vừa max_span ô;
+        không có lịch sử thì cụm đông nhất. Cụm quá rộng thì lấy hộp max_span quanh nước mới nhất."""
+        clusters = self.clusters()
+        owner = {cell: i for i, cluster in enumerate(clusters) for cell in cluster}
+        recent = [owner[c] for c in reversed(self.history) if c in owner]
+        order = list(dict.fromkeys(recent)) or [max(range(len(clusters)), key=lambda i: len(clusters[i]))]
+        box = None
+        for i in order:
+            xs = [x for x, _ in clusters[i]] + ([box[0], box[1]] if box else [])
+            ys = [y for _, y in clusters[i]] + ([box[2], box[3]] if box else [])
+            merged = (min(xs), max(xs), min(ys), max(ys))
+            if max(merged[1] - merged[0], merged[3] - merged[2]) >= max_span:
+                break
+            box = merged
+        if box is None:
+            x, y = self.history[-1] if self.history else clusters[order[0]][0]
+            half = max_span // 2
+            box = (x - half, x + half, y - half, y + half)
+        return box
+
+    def to_board(self) -> List[List[Optional[str]]]:
+        if self.size is None:
+            raise ValueError("unbounded board has no dense form")
+        board: List[List[Optional[str]]] = [[None] * self.size for _ in range(self.size)]
+        for (x, y), color in self.stones.items():
+            board[x][y] = MARKS[color]
+        return board
+
+    def to_position(self, margin: int = SPARSE_MARGIN, max_side: int = SPARSE_MAX_SIDE) -> Tuple[Position, int, int]:
+        """Position vuông bao các quân với lề ít nhất margin ô: (pos, ox, oy)
+
+        Ô (x, y) của pos là ô (x + ox, y + oy) ở đây. Góc và kích thước vùng
+        cắt bám theo lưới SPARSE_ROUND ô nên giữ nguyên qua nhiều nước (TT
+        của session vẫn dùng lại được). Trên bàn có giới hạn, vùng cắt không
+        vượt ra ngoài bàn, mép bàn thật vẫn là mép của pos. Hộp bao mọi quân
+        rộng hơn max_side thì chỉ cắt quanh các cụm đang đánh (_focus_bounds),
+        quân ngoài vùng cắt bị bỏ qua.
+        """
+        box = self.bounds()
+        step = SPARSE_ROUND
+        span = max_side - 2 * margin - step
+        if box is not None and max(box[1] - box[0], box[3] - box[2]) >= span:
+            box = self._focus_bounds(span)
+        if box is None:
+            # Bàn trống: tâm vùng cắt (nước đầu của a.py) là tâm bàn
+            centre = self.size // 2 if self.size is not None else 0
+            m = -(-(2 * margin + 1) // step) * step
+            ox = oy = centre - m // 2
+        else:
+            min_x, max_x, min_y, max_y = box
+            ox = (min_x - margin) // step * step
+            oy = (min_y - margin) // step * step
+            m = max(max_x + margin + 1 - ox, max_y + margin + 1 - oy)
+            m = -(-m // step) * step
+        if self.size is not None:
+            if m >= self.size:
+                m, ox, oy = self.size, 0, 0
+            else:
+                ox = min(max(ox, 0), self.size - m)
+                oy = min(max(oy, 0), self.size - m)
+        pos = Position(m, self.side)
+        for (x, y), color in self.stones.items():
+            if 0 <= x - ox < m and 0 <= y - oy < m:
+                pos.put((x - ox) * m + (y - oy), color)
+        return pos, ox, oy
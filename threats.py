@@ -0,0 +1,347 @@
+# threats.py
+# Tìm chuỗi thắng ép (threat-space search) cho a.py: VCF và VCT
+#
+# VCF (victory by continuous fours): bên tấn công chỉ đi nước tạo 4, bên thủ
+# buộc phải chặn ô thắng. VCT (victory by continuous threats): thêm nước tạo
+# 3 mở; bên thủ được chặn 3 bằng mọi ô phá được nó hoặc phản công bằng 4.
+# Mẫu được dò song song trên bitmask từng đường của Position (một phép dịch
+# cho mỗi ô trong cửa sổ 5/6 ô), không dựng chuỗi ký tự.
+
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from position import PAD, WINDOW_MASK, Position
+
+VCF_DEPTH = 12
+VCT_DEPTH = 4
+THREAT_NODES = 5000
+
+# (ô trống, ô quân mình) trong cửa sổ 5 ô tạo ra ô thắng / ô tạo 4
+_FIVE_GAPS = [(k, [i for i in range(5) if i != k]) for k in range(5)]
+_FOUR_GAPS = [((a, b), [i for i in range(5) if i not in (a, b)]) for a in range(5) for b in range(a + 1, 5)]
+# Cửa sổ 6 ô, hai đầu trống: 2 ô trống bên trong -> ô tạo 3 mở; 1 ô trống -> đã là 3 mở
+_THREE_GAPS = [((a, b), [i for i in range(1, 5) if i not in (a, b)]) for a in range(1, 5) for b in range(a + 1, 5)]
+_OPEN_THREE = [(a, [i for i in range(1, 5) if i != a]) for a in range(1, 5)]
+
+_LINE_CELLS: Dict[int, List[List[int]]] = {}
+
+
+class _BudgetExceeded(Exception):
+    pass
+
+
+def _line_cells(pos: Position) -> List[List[int]]:
+    """_line_cells(pos)[line_id][bit] -> idx của ô ứng với bit đó trên đường"""
+    table = _LINE_CELLS.get(pos.size)
+    if table is None:
+        geo = pos.geo
+        width = max(v.bit_length() for v in geo.valid) + PAD
+        table = [[-1] * width for _ in geo.valid]
+        for idx, cl in enumerate(geo.cell_lines):
+            for k in range(0, 8, 2):
+                table[cl[k]][cl[k + 1] + PAD] = idx
+        _LINE_CELLS[pos.size] = table
+    return table
+
+
+def _bits(mask: int):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _gain_mask(own: int, free: int) -> int:
+    """Các ô trống mà đặt vào sẽ thành 5"""
+    out = 0
+    for k, rest in _FIVE_GAPS:
+        cond = free >> k
+        for i in rest:
+            cond &= own >> i
+        out |= cond << k
+    return out
+
+
+def winning_cells(pos: Position, color: int) -> List[int]:
+    """Mọi ô mà color đặt vào là thắng ngay"""
+    own_lines = pos.lines[color]
+    opp_lines = pos.lines[color ^ 1]
+    valid = pos.geo.valid
+    line_cells = _line_cells(pos)
+    found = set()
+    for line_id, own in enumerate(own_lines):
+        if own.bit_count() < 4:
+            continue
+        gains = _gain_mask(own, valid[line_id] & ~(own | opp_lines[line_id]))
+        cells = line_cells[line_id]
+        for b in _bits(gains):
+            found.add(cells[b])
+    return list(found)
+
+
+def threat_cells(pos: Position, color: int, threes: bool = False) -> List[int]:
+    """Ô tạo 4 (và tạo 3 mở nếu threes) cho color, ô nằm trên nhiều mẫu xếp trước"""
+    own_lines = pos.lines[color]
+    opp_lines = pos.lines[color ^ 1]
+    valid = pos.geo.valid
+    line_cells = _line_cells(pos)
+    fours: Dict[int, int] = {}
+    threats: Dict[int, int] = {}
+    for line_id, own in enumerate(own_lines):
+        count = own.bit_count()
+        if count < 2:
+            continue
+        free = valid[line_id] & ~(own | opp_lines[line_id])
+        cells = line_cells[line_id]
+        if count >= 3:
+            made = 0
+            for (a, b), rest in _FOUR_GAPS:
+                cond = (free >> a) & (free >> b)
+                for i in rest:
+                    cond &= own >> i
+                made |= (cond << a) | (cond << b)
+            for b in _bits(made):
+                idx = cells[b]
+                fours[idx] = fours.get(idx, 0) + 1
+                threats[idx] = threats.get(idx, 0) + 1
+        if threes:
+            made = 0
+            ends = free & (free >> 5)
+            for (a, b), rest in _THREE_GAPS:
+                cond = ends & (free >> a) & (free >> b)
+                for i in rest:
+                    cond &= own >> i
+                made |= (cond << a) | (cond << b)
+            for b in _bits(made):
+                idx = cells[b]
+                threats[idx] = threats.get(idx, 0) + 1
+    # Nước tạo 4 trước (bên thủ chỉ có một cách đỡ), rồi ô nằm trên nhiều mẫu
+    return sorted(threats, key=lambda idx: (idx in fours, threats[idx]), reverse=True)
+
+
+def _three_blocks(pos: Position, idx: int, color: int) -> List[int]:
+    """Ô phá các 3 mở của color đi qua idx; rỗng nếu idx không nằm trong 3 mở nào"""
+    own_lines = pos.lines[color]
+    opp_lines = pos.lines[color ^ 1]
+    valid = pos.geo.valid
+    cl = pos.geo.cell_lines[idx]
+    n = pos.size
+    steps = (n, 1, n + 1, n - 1)
+    found = []
+    for d in range(4):
+        line_id = cl[2 * d]
+        shift = cl[2 * d + 1]
+        own = (own_lines[line_id] >> shift) & WINDOW_MASK
+        free = (valid[line_id] >> shift) & WINDOW_MASK & ~(own | (opp_lines[line_id] >> shift))
+        # Chỉ các cửa sổ 6 ô chứa idx (bit 5): điểm bắt đầu 0..5
+        blocks = 0
+        ends = free & (free >> 5) & 0b111111
+        for a, rest in _OPEN_THREE:
+            cond = ends & (free >> a)
+            for i in rest:
+                cond &= own >> i
+            blocks |= cond | (cond << 5) | (cond << a)
+        for b in _bits(blocks):
+            found.append(idx + (b - PAD) * steps[d])
+    return found
+
+
+class ThreatSearch:
+    """Tìm VCF/VCT trên một Position (make/unmake tại chỗ) trong giới hạn node/thời gian
+
+    proofs giữ nước thắng của mọi thế (hash, bên tấn công đến lượt) đã được
+    chứng minh, để lượt sau tra lại ngay thay vì tìm lại. line là chuỗi thắng
+    chính của đối phương mà find_defenses tìm thấy.
+    """
+
+    CHECK_EVERY = 64
+
+    def __init__(self, pos: Position, max_nodes: int = THREAT_NODES, deadline: Optional[float] = None,
+                 proofs: Optional[Dict[int, int]] = None, cancel: Optional[threading.Event] = None):
+        self.pos = pos
+        self.max_nodes = max_nodes
+        self.deadline = deadline
+        self.cancel = cancel
+        self.proofs = proofs if proofs is not None else {}
+        self.nodes = 0
+        self.exhausted = False
+        self.line: List[int] = []
+        self._failed: Dict[Tuple[int, bool], int] = {}
+
+    def _tick(self) -> None:
+        self.nodes += 1
+        if self.nodes >= self.max_nodes:
+            raise _BudgetExceeded()
+        if self.nodes % self.CHECK_EVERY == 0:
+            if self.deadline is not None and time.perf_counter() > self.deadline:
+                raise _BudgetExceeded()
+            if self.cancel is not None and self.cancel.is_set():
+                raise _BudgetExceeded()
+
+    # ---------- Tìm kiếm AND/OR ----------
+
+    def _attack(self, attacker: int, depth: int, vct: bool, origin: int) -> bool:
+        """Bên tấn công đến lượt; origin: ô của đe dọa 3 đang treo (-1 nếu không có)"""
+        self._tick()
+        pos = self.pos
+        if winning_cells(pos, attacker):
+            return True
+        defender_wins = winning_cells(pos, attacker ^ 1)
+        if len(defender_wins) > 1:
+            return False
+        if defender_wins:
+            # Bên thủ vừa phản công bằng 4: buộc phải chặn
+            block = defender_wins[0]
+            pos.make(block)
+            try:
+                if winning_cells(pos, attacker):
+                    return self._defend(attacker, depth, vct, block)
+                if origin >= 0 and _three_blocks(pos, origin, attacker):
+                    return self._defend(attacker, depth, vct, origin)
+                if vct and depth > 0 and _three_blocks(pos, block, attacker):
+                    return self._defend(attacker, depth - 1, vct, block)
+                return False
+            finally:
+                pos.unmake()
+
+        if depth <= 0:
+            return False
+        key = pos.hash
+        if self._failed.get((key, vct), -1) >= depth:
+            return False
+        proved = self.proofs.get(key)
+        if proved is not None and not pos.cells[proved]:
+            return True
+        for move in threat_cells(pos, attacker, vct):
+            pos.make(move)
+            try:
+                won = self._defend(attacker, depth - 1, vct, move)
+            finally:
+                pos.unmake()
+            if won:
+                self.proofs[key] = move
+                return True
+        self._failed[key, vct] = depth
+        return False
+
+    def _defend(self, attacker: int, depth: int, vct: bool, origin: int) -> bool:
+        """Bên thủ đến lượt sau đe dọa tại origin; True nếu mọi cách đỡ đều thua"""
+        self._tick()
+        pos = self.pos
+        defender = attacker ^ 1
+        if winning_cells(pos, defender):
+            return False
+        gains = winning_cells(pos, attacker)
+        if len(gains) > 1:
+            return True
+        if gains:
+            replies = gains
+        else:
+            blocks = _three_blocks(pos, origin, attacker)
+            if not blocks:
+                return False
+            replies = list(dict.fromkeys(blocks + threat_cells(pos, defender)))
+        for reply in replies:
+            pos.make(reply)
+            try:
+                won = self._attack(attacker, depth, vct, -1 if gains else origin)
+            finally:
+                pos.unmake()
+            if not won:
+                return False
+        return True
+
+    # ---------- API ----------
+
+    def find_win(self, color: int, vct: bool = False, max_depth: Optional[int] = None) -> Optional[int]:
+        """Nước đầu của một chuỗi thắng ép cho color (tính như color đến lượt), hoặc None"""
+        pos = self.pos
+        if max_depth is None:
+            max_depth = VCT_DEPTH if vct else VCF_DEPTH
+        flipped = pos.side != color
+        if flipped:
+            pos.side ^= 1
+            pos.hash ^= pos.geo.zobrist_side
+        try:
+            wins = winning_cells(pos, color)
+            if wins:
+                return wins[0]
+            # Sâu dần để tìm chuỗi ngắn nhất trước
+            for depth in range(1, max_depth + 1):
+                if self._attack(color, depth, vct, -1):
+                    return self.proofs.get(pos.hash)
+        except _BudgetExceeded:
+            self.exhausted = True
+        finally:
+            if flipped:
+                pos.side ^= 1
+                pos.hash ^= pos.geo.zobrist_side
+        return None
+
+    def find_defenses(self, color: int, vct: bool = False) -> Optional[List[int]]:
+        """Nước của color phá mọi chuỗi thắng ép của đối phương
+
+        None nếu đối phương không có chuỗi thắng ép; danh sách rỗng nếu không
+        nước nào trong các ứng viên cứu được. Hết ngân sách giữa chừng thì các
+        ứng viên chưa kiểm tra không được tính.
+        """
+        pos = self.pos
+        opponent = color ^ 1
+        first = self.find_win(opponent, vct)
+        if first is None:
+            return None
+
+        # Ứng viên: các ô của chuỗi thắng (đi theo proofs) và các ô đe dọa của đối phương
+        candidates: List[int] = []
+        line = self.line = []
+        flipped = pos.side != opponent
+        if flipped:
+            pos.side ^= 1
+            pos.hash ^= pos.geo.zobrist_side
+        try:
+            move = first
+            while move is not None and not pos.cells[move] and len(line) < 2 * VCF_DEPTH:
+                candidates.append(move)
+                pos.make(move)
+                line.append(move)
+                replies = winning_cells(pos, opponent) or _three_blocks(pos, move, opponent)
+                if not replies or winning_cells(pos, color):
+                    break
+                candidates.extend(replies)
+                pos.make(replies[0])
+                line.append(replies[0])
+                move = self.proofs.get(pos.hash)
+        finally:
+            for _ in line:
+                pos.unmake()
+            if flipped:
+                pos.side ^= 1
+                pos.hash ^= pos.geo.zobrist_side
+        candidates.extend(threat_cells(pos, opponent, vct))
+
+        safe = []
+        seen: Set[int] = set()
+        flipped = pos.side != color
+        if flipped:
+            pos.side ^= 1
+            pos.hash ^= pos.geo.zobrist_side
+        try:
+            for move in candidates:
+                if move in seen or pos.cells[move]:
+                    continue
+                seen.add(move)
+                pos.make(move)
+                try:
+                    refuted = self.find_win(opponent, vct) is None
+                finally:
+                    pos.unmake()
+                if self.exhausted:
+                    break
+                if refuted:
+                    safe.append(move)
+        finally:
+            if flipped:
+                pos.side ^= 1
+                pos.hash ^= pos.geo.zobrist_side
+        return safe
@@ -0,0 +1,240 @@
+# transposition.py
+# Bảng chuyển vị (transposition table) kích thước cố định cho negamax
+#
+# Các trường được lưu trong array cấp phát sẵn (không tạo dict cho từng
+# node). Mỗi hash có đúng một ô (hash & mask); khi trùng ô thì ưu tiên giữ
+# entry sâu hơn của lượt tìm hiện tại, entry của lượt trước luôn bị thay.
+
+import os
+import struct
+from array import array
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Số byte cho một entry: key(8) + value(8) + move(4) + depth(1) + flag(1) + generation(1)
+ENTRY_BYTES = 23
+
+DEFAULT_TT_BYTES = int(float(os.environ.get("BOT_TT_MB", "4")) * 1024 * 1024)
+
+# EvalCache: key(8) + value(8)
+EVAL_ENTRY_BYTES = 16
+DEFAULT_EVAL_BYTES = int(float(os.environ.get("BOT_EVAL_CACHE_MB", "1")) * 1024 * 1024)
+
+
+_DOUBLE = struct.Struct("d")
+_BITS = struct.Struct("Q")
+_MASK64 = (1 << 64) - 1
+# Nhân trộn các trường nhỏ trước khi XOR với bit của value (hằng số Fibonacci hashing)
+_MIX = 0x9E3779B97F4A7C15
+
+
+def table_capacity(max_bytes: Optional[int] = None, entry_bytes: int = ENTRY_BYTES) -> int:
+    """Số entry (lũy thừa của 2) lớn nhất vừa max_bytes"""
+    if max_bytes is None:
+        max_bytes = DEFAULT_TT_BYTES
+    capacity = 1
+    while capacity * 2 * entry_bytes <= max_bytes:
+        capacity *= 2
+    return capacity
+
+
+class TranspositionTable:
+    """TT giới hạn bộ nhớ: không vượt quá max_bytes"""
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        capacity = table_capacity(max_bytes)
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.keys = array("Q", [0]) * capacity
+        self.values = array("d", [0.0]) * capacity
+        self.moves = array("i", [-1]) * capacity
+        self.depths = array("b", [-1]) * capacity
+        self.flags = array("B", [0]) * capacity
+        self.gens = array("B", [0]) * capacity
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self.capacity * ENTRY_BYTES
+
+    def new_search(self) -> None:
+        """Gọi trước mỗi lượt tìm: entry cũ vẫn dùng được nhưng dễ bị thay"""
+        self.generation = (self.generation + 1) & 0xFF
+
+    def clear(self) -> None:
+        cap = self.capacity
+        self.keys = array("Q", [0]) * cap
+        self.moves = array("i", [-1]) * cap
+        self.depths = array("b", [-1]) * cap
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, key: int) -> Optional[Tuple[int, float, int, int]]:
+        """(depth, value, flag, move) nếu có entry cho key"""
+        self.probes += 1
+        slot = key & self.mask
+        if self.keys[slot] != key or self.depths[slot] < 0:
+            return None
+        self.hits += 1
+        return self.depths[slot], self.values[slot], self.flags[slot], self.moves[slot]
+
+    def best_move(self, key: int) -> int:
+        slot = key & self.mask
+        if self.keys[slot] != key or self.depths[slot] < 0:
+            return -1
+        return self.moves[slot]
+
+    def store(self, key: int, depth: int, value: float, flag: int, move: int = -1) -> None:
+        slot = key & self.mask
+        old_depth = self.depths[slot]
+        if self.keys[slot] == key and old_depth >= 0:
+            if depth < old_depth and flag != EXACT:
+                return
+            if move < 0:
+                move = self.moves[slot]
+        elif old_depth > depth and self.gens[slot] == self.generation:
+            return
+        self.keys[slot] = key
+        self.values[slot] = value
+        self.moves[slot] = move
+        self.depths[slot] = min(depth, 127)
+        self.flags[slot] = flag
+        self.gens[slot] = self.generation
+
+
+class EvalCache:
+    """Cache điểm tĩnh ở lá theo hash thế cờ; trùng ô thì ghi đè
+
+    Dùng với khóa đối xứng (Position.canonical) thì các thế xoay / lật của
+    nhau dùng chung entry. probes / hits cho biết tỉ lệ trúng.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        capacity = table_capacity(DEFAULT_EVAL_BYTES if max_bytes is None else max_bytes, EVAL_ENTRY_BYTES)
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.keys = array("Q", [0]) * capacity
+        self.values = array("d", [0.0]) * capacity
+        self.used = bytearray(capacity)
+        self.probes = 0
+        self.hits = 0
+
+    def get(self, key: int) -> Optional[float]:
+        self.probes += 1
+        slot = key & self.mask
+        if not self.used[slot] or self.keys[slot] != key:
+            return None
+        self.hits += 1
+        return self.values[slot]
+
+    def put(self, key: int, value: float) -> None:
+        slot = key & self.mask
+        self.keys[slot] = key
+        self.values[slot] = value
+        self.used[slot] = 1
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """TT đặt trong shared memory để nhiều process cùng đọc/ghi (xem parallel.py)
+
+    Process tạo bảng truyền name cho các process khác gắn vào. Không khóa:
+    key được lưu XOR với checksum của cả entry (bit của value, move, depth,
+    flag) nên entry bị ghi dở hoặc ghi chồng giữa hai process sẽ không khớp
+    key và bị bỏ qua khi probe. value được đọc một lần dạng bit (view "Q"
+    trên cùng vùng nhớ) để giá trị trả về đúng là giá trị đã kiểm tra.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, name: Optional[str] = None):
+        if name is None:
+            capacity = table_capacity(max_bytes)
+            self.shm = shared_memory.SharedMemory(create=True, size=capacity * ENTRY_BYTES)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            capacity = self.shm.size // ENTRY_BYTES
+            # Kích thước shared memory có thể bị làm tròn lên theo trang
+            while capacity & (capacity - 1):
+                capacity &= capacity - 1
+            self.owner = False
+        self.name = self.shm.name
+        self.capacity = capacity
+        self.mask = capacity - 1
+        buf = self.shm.buf
+        offset = 0
+        views = []
+        for code, size in (("Q", 8), ("d", 8), ("i", 4), ("b", 1), ("B", 1), ("B", 1)):
+            views.append(buf[offset:offset + capacity * size].cast(code))
+            offset += capacity * size
+        self.keys, self.values, self.moves, self.depths, self.flags, self.gens = views
+        self.value_bits = buf[capacity * 8:capacity * 16].cast("Q")
+        if self.owner:
+            self.clear()
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+
+    @staticmethod
+    def _check(bits: int, move: int, depth: int, flag: int) -> int:
+        return bits ^ ((((move & 0xFFFFFFFF) | ((depth & 0xFF) << 32) | (flag << 40)) * _MIX) & _MASK64)
+
+    def clear(self) -> None:
+        cap = self.capacity
+        self.depths[:] = array("b", [-1]) * cap
+        self.moves[:] = array("i", [-1]) * cap
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, key: int) -> Optional[Tuple[int, float, int, int]]:
+        self.probes += 1
+        slot = key & self.mask
+        depth = self.depths[slot]
+        if depth < 0:
+            return None
+        move = self.moves[slot]
+        flag = self.flags[slot]
+        bits = self.value_bits[slot]
+        if self.keys[slot] ^ self._check(bits, move, depth, flag) != key:
+            return None
+        self.hits += 1
+        return depth, _DOUBLE.unpack(_BITS.pack(bits))[0], flag, move
+
+    def best_move(self, key: int) -> int:
+        slot = key & self.mask
+        depth = self.depths[slot]
+        move = self.moves[slot]
+        if depth < 0 or self.keys[slot] ^ self._check(self.value_bits[slot], move, depth, self.flags[slot]) != key:
+            return -1
+        return move
+
+    def store(self, key: int, depth: int, value: float, flag: int, move: int = -1) -> None:
+        slot = key & self.mask
+        old_depth = self.depths[slot]
+        old_move = self.moves[slot]
+        same = old_depth >= 0 and self.keys[slot] ^ self._check(self.value_bits[slot], old_move, old_depth, self.flags[slot]) == key
+        if same:
+            if depth < old_depth and flag != EXACT:
+                return
+            if move < 0:
+                move = old_move
+        elif old_depth > depth and self.gens[slot] == self.generation:
+            return
+        depth = min(depth, 127)
+        bits = _BITS.unpack(_DOUBLE.pack(value))[0]
+        self.value_bits[slot] = bits
+        self.moves[slot] = move
+        self.depths[slot] = depth
+        self.flags[slot] = flag
+        self.gens[slot] = self.generation
+        self.keys[slot] = key ^ self._check(bits, move, depth, flag)
+
+    def close(self) -> None:
+        """Gỡ các view rồi đóng (và xóa nếu là process tạo bảng) shared memory"""
+        for view in (self.keys, self.values, self.value_bits, self.moves, self.depths, self.flags, self.gens):
+            view.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
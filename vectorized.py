@@ -0,0 +1,311 @@
+# vectorized.py
+# Backend NumPy (tùy chọn) cho evaluate_board của a.py và b.py
+#
+# Bàn cờ được đổi thành mảng int8, mỗi cửa sổ theo 4 hướng được mã hóa cơ số
+# 3 cho mọi ô cùng lúc (cộng dồn các lát cắt dịch chuyển của bàn đã đệm), rồi
+# tra bảng bằng fancy indexing. Không có NumPy thì a.py/b.py dùng bản thuần
+# Python như cũ.
+
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy là tùy chọn
+    np = None
+
+HAVE_NUMPY = np is not None
+
+DIRECTIONS = [(1, 0), (0, 1), (1, 1), (1, -1)]
+
+# Ngưỡng để a.py/b.py tự chuyển sang backend này (đo trên 15x15..50x50):
+# a.py chấm theo từng quân nên phụ thuộc số quân, b.py theo kích thước bàn
+VECTORIZE_MIN_STONES = 48
+VECTORIZE_MIN_SIZE = 19
+
+_A_TABLES = None
+_A_PRIORITY = None
+_B_TABLES = None
+_B_HAS = None
+
+
+def board_to_array(board: List[List[Any]]) -> "np.ndarray":
+    """0 trống, 1 X, 2 O"""
+    codes = {None: 0, "X": 1, "O": 2}
+    return np.array([[codes.get(c, 0) for c in row] for row in board], dtype=np.int8)
+
+
+def _window_codes(digits: "np.ndarray", half: int) -> "np.ndarray":
+    """Mã cơ số 3 của cửa sổ (2*half+1) ô theo 4 hướng cho mọi ô: shape (4, n, n)
+
+    digits đã là chữ số 0..2; ô ngoài bàn được đệm bằng 0.
+    """
+    n = digits.shape[0]
+    padded = np.zeros((n + 2 * half, n + 2 * half), dtype=np.int64)
+    padded[half:half + n, half:half + n] = digits
+    out = np.zeros((4, n, n), dtype=np.int64)
+    for d, (dx, dy) in enumerate(DIRECTIONS):
+        acc = out[d]
+        power = 1
+        for j in range(2 * half + 1):
+            ox = half + (j - half) * dx
+            oy = half + (j - half) * dy
+            acc += padded[ox:ox + n, oy:oy + n] * power
+            power *= 3
+    return out
+
+
+# ---------- a.py ----------
+
+def _a_tables(n: int):
+    """(bảng LINE_VALUE, độ rộng bàn đệm, offset 4 hướng x 11 ô, lũy thừa 3)"""
+    global _A_TABLES
+    if _A_TABLES is None:
+        from patterns import LINE_VALUE
+        _A_TABLES = (np.array(LINE_VALUE, dtype=np.int64), {})
+    line_value, geometry = _A_TABLES
+    if n not in geometry:
+        w = n + 10
+        offsets = np.array([[(j - 5) * (dx * w + dy) for j in range(11)] for dx, dy in DIRECTIONS], dtype=np.int64)
+        geometry[n] = (w, offsets, 3 ** np.arange(11, dtype=np.int64))
+    return (line_value,) + geometry[n]
+
+
+def evaluate_array_a(raw: "np.ndarray", color: int, stones: Optional["np.ndarray"] = None) -> float:
+    """evaluate_board của a.py trên mảng int8 (n, n)
+
+    Mã cửa sổ 11 ô của mọi quân theo 4 hướng được lấy một lần bằng gather
+    trên bàn đệm 5 ô (0 = bị chặn, 1 = quân mình, 2 = trống).
+    """
+    n = raw.shape[0]
+    line_value, w, offsets, powers = _a_tables(n)
+    if stones is None:
+        stones = np.flatnonzero(raw.ravel() == color + 1)
+    if not len(stones):
+        return 0
+    digits = np.zeros((w, w), dtype=np.int64)
+    digits[5:5 + n, 5:5 + n] = np.where(raw == color + 1, 1, np.where(raw == 0, 2, 0))
+    xs, ys = np.divmod(stones, n)
+    centers = (xs + 5) * w + ys + 5
+    codes = (digits.ravel()[centers[:, None, None] + offsets[None]] * powers).sum(axis=-1)
+    return int(line_value[codes].sum()) / 4
+
+
+def evaluate_board_a(board: List[List[Any]], mark: str) -> float:
+    return evaluate_array_a(board_to_array(board), 0 if mark == "X" else 1)
+
+
+def evaluate_position_a(pos, color: int) -> float:
+    """Như trên nhưng đọc thẳng bytearray của Position (không copy)"""
+    raw = np.frombuffer(pos.cells, dtype=np.int8).reshape(pos.size, pos.size)
+    return evaluate_array_a(raw, color, np.array(pos.stones[color], dtype=np.int64))
+
+
+# ---------- b.py ----------
+
+def _b_tables():
+    """Bảng của b.py theo mã cơ số 3 (0 '_', 1 mình, 2 đối phương; ô -4..4)"""
+    global _B_TABLES
+    if _B_TABLES is None:
+        from b import get_window_table
+        digit = {"_": 0, "X": 1, "O": 2}
+        table = get_window_table()
+        scores = np.zeros(3 ** 9, dtype=np.float64)
+        patterns: List[Tuple[str, ...]] = [()] * 3 ** 9
+        for line, (score, matched) in table.items():
+            code = sum(digit[ch] * 3 ** i for i, ch in enumerate(line))
+            scores[code] = score
+            patterns[code] = matched
+        _B_TABLES = (scores, patterns)
+    return _B_TABLES
+
+
+def border_mask(raw: "np.ndarray") -> "np.ndarray":
+    """Ô trống kề (8 hướng) với ít nhất một quân"""
+    n = raw.shape[0]
+    occ = np.zeros((n + 2, n + 2), dtype=bool)
+    occ[1:-1, 1:-1] = raw != 0
+    near = np.zeros((n, n), dtype=bool)
+    for dx in (0, 1, 2):
+        for dy in (0, 1, 2):
+            near |= occ[dx:dx + n, dy:dy + n]
+    return near & (raw == 0)
+
+
+def evaluate_array_b(raw: "np.ndarray", current_mark: str,
+                     cells: Optional[List[Tuple[int, int]]] = None) -> Dict[Tuple[int, int], Dict[str, Any]]:
+    """evaluate_board của b.py trên mảng int8 (n, n)
+
+    cells là các ô cần chấm theo thứ tự khóa mong muốn (b.py truyền
+    get_border_cells() để best_move chọn cùng ô khi bằng điểm); mặc định là
+    mọi ô kề quân theo thứ tự hàng.
+    """
+    scores, patterns = _b_tables()
+    raw = raw.astype(np.int64)
+    swapped = (3 - raw) % 3
+    bot, opp = (raw, swapped) if current_mark == "X" else (swapped, raw)
+    if cells is None:
+        xs, ys = np.nonzero(border_mask(raw))
+    else:
+        xs = np.array([x for x, _ in cells], dtype=np.intp)
+        ys = np.array([y for _, y in cells], dtype=np.intp)
+    if not len(xs):
+        return {}
+    codes_bot = _window_codes(bot, 4)[:, xs, ys]
+    codes_opp = _window_codes(opp, 4)[:, xs, ys]
+    atk_all = (scores[codes_bot] * 1.5).sum(axis=0)
+    def_all = (scores[codes_opp] * 1.0).sum(axis=0)
+
+    result = {}
+    cb = codes_bot.T.tolist()
+    co = codes_opp.T.tolist()
+    atk_list = atk_all.tolist()
+    def_list = def_all.tolist()
+    for i, (x, y) in enumerate(zip(xs.tolist(), ys.tolist())):
+        p_atk = [p for code in cb[i] for p in patterns[code]]
+        p_def = [p for code in co[i] for p in patterns[code]]
+        atk = atk_list[i] if p_atk else 0
+        defn = def_list[i] if p_def else 0
+        result[(x, y)] = {
+            "score": atk + defn,
+            "attack": atk,
+            "defense": defn,
+            "patterns_bot": p_atk,
+            "patterns_opp": p_def
+        }
+    return result
+
+
+def evaluate_board_b(board: List[List[Any]], current_mark: str,
+                     cells: Optional[List[Tuple[int, int]]] = None) -> Dict[Tuple[int, int], Dict[str, Any]]:
+    return evaluate_array_b(board_to_array(board), current_mark, cells)
+
+
+# ---------- Theo lô (calculate_bot_moves_batch, best_moves_batch) ----------
+#
+# Chỉ chấm các ô ứng viên: các bàn cùng kích thước được đệm và xếp chồng thành
+# một mảng phẳng, cửa sổ 4 hướng của mọi ô ứng viên được lấy ra bằng một lần
+# fancy indexing (K, 4, 2*half+1) thay vì mã hóa cả bàn.
+
+_POWERS: Dict[int, "np.ndarray"] = {}
+
+
+def _powers(half: int) -> "np.ndarray":
+    if half not in _POWERS:
+        _POWERS[half] = 3 ** np.arange(2 * half + 1, dtype=np.int64)
+    return _POWERS[half]
+
+
+def _batch_windows(raws: List["np.ndarray"], cells: List[List[int]], half: int):
+    """(giá trị cửa sổ (K, 4, 2*half+1), số ô của từng bàn) cho các ô cells[b] của bàn raws[b]
+
+    Mọi bàn cùng kích thước n, ô là chỉ số phẳng x * n + y; giá trị 0 trống,
+    1 X, 2 O, -1 ngoài bàn.
+    """
+    n = raws[0].shape[0]
+    width = n + 2 * half
+    padded = np.full((len(raws), width, width), -1, dtype=np.int8)
+    for b, raw in enumerate(raws):
+        padded[b, half:half + n, half:half + n] = raw
+    counts = [len(c) for c in cells]
+    flat = np.fromiter((idx for c in cells for idx in c), dtype=np.int64, count=sum(counts))
+    xs, ys = np.divmod(flat, n)
+    boards = np.repeat(np.arange(len(raws)), counts)
+    centre = boards * width * width + (xs + half) * width + ys + half
+    offsets = np.array([[(j - half) * (dx * width + dy) for j in range(2 * half + 1)] for dx, dy in DIRECTIONS])
+    return padded.reshape(-1)[centre[:, None, None] + offsets].astype(np.int64), counts
+
+
+def _split(values: "np.ndarray", counts: List[int]) -> List[List[Any]]:
+    return [part.tolist() for part in np.split(values, np.cumsum(counts)[:-1])]
+
+
+def _a_priority() -> "np.ndarray":
+    global _A_PRIORITY
+    if _A_PRIORITY is None:
+        from patterns import PRIORITY
+        _A_PRIORITY = np.array(PRIORITY, dtype=np.int64)
+    return _A_PRIORITY
+
+
+def score_cells_a(raws: List["np.ndarray"], colors: List[int], cells: List[List[int]]) -> List[List[float]]:
+    """_score_cell của a.py cho các ô cells[b] của bàn raws[b] (cùng kích thước), giá trị giống hệt"""
+    priority = _a_priority()
+    values, counts = _batch_windows(raws, cells, 5)
+    powers = _powers(5)
+    own = np.repeat(np.asarray(colors, dtype=np.int64) + 1, counts)[:, None, None]
+
+    def prio(mark):
+        # Chữ số: 1 quân của mark, 2 trống, 0 quân kia / ngoài bàn; ô giữa coi như đã đặt quân
+        digits = np.where(values == mark, 1, np.where(values == 0, 2, 0))
+        digits[:, :, 5] = 1
+        return priority[digits @ powers]
+
+    # Như _direction_scores: ô ở offset -5 nằm ngoài bàn thì hướng đó bằng 0
+    on_board = values[:, :, 0] >= 0
+    prio_own = prio(own) * on_board
+    prio_opp = prio(3 - own) * on_board
+    threat_dirs = (prio_own > 1000).sum(axis=1)
+    attack = prio_own.sum(axis=1) + 2000 * (threat_dirs >= 2) + 5000 * (threat_dirs >= 3)
+    return _split(attack + prio_opp.sum(axis=1) * 1.5, counts)
+
+
+def score_positions_a(positions: List[Any], colors: List[int], cells: List[List[int]]) -> List[List[float]]:
+    """score_cells_a cho các Position (có thể khác kích thước); thế cùng kích thước chấm chung một lần"""
+    out: List[Any] = [None] * len(positions)
+    groups: Dict[int, List[int]] = {}
+    for i, pos in enumerate(positions):
+        groups.setdefault(pos.size, []).append(i)
+    for size, ids in groups.items():
+        raws = [np.frombuffer(positions[i].cells, dtype=np.int8).reshape(size, size) for i in ids]
+        for i, scores in zip(ids, score_cells_a(raws, [colors[i] for i in ids], [cells[i] for i in ids])):
+            out[i] = scores
+    return out
+
+
+def _b_has_patterns() -> "np.ndarray":
+    """has[code]: cửa sổ có khớp mẫu nào không (b.py chỉ cộng điểm các hướng có mẫu)"""
+    global _B_HAS
+    if _B_HAS is None:
+        _, patterns = _b_tables()
+        _B_HAS = np.array([bool(p) for p in patterns])
+    return _B_HAS
+
+
+def score_boards_b(boards: List[List[List[Any]]], marks: List[str], cells: List[List[Tuple[int, int]]]) -> List[Tuple[List[Any], ...]]:
+    """Điểm evaluate_board của b.py cho các ô cells[b] của boards[b]; bàn cùng kích thước chấm chung
+
+    Mỗi bàn trả về (điểm tấn công, điểm phòng thủ, mã 4 hướng của mình, mã 4
+    hướng của đối phương) theo thứ tự cells[b]; cell_info_b dựng entry đầy đủ.
+    """
+    scores, _ = _b_tables()
+    has = _b_has_patterns()
+    powers = _powers(4)
+    out: List[Any] = [None] * len(boards)
+    groups: Dict[int, List[int]] = {}
+    for i, board in enumerate(boards):
+        groups.setdefault(len(board), []).append(i)
+    for n, ids in groups.items():
+        values, counts = _batch_windows([board_to_array(boards[i]) for i in ids],
+                                        [[x * n + y for x, y in cells[i]] for i in ids], 4)
+        x_mark = np.repeat(np.array([marks[i] == "X" for i in ids]), counts)[:, None, None]
+        # Chữ số: 0 '_' (cả ngoài bàn), 1 mình, 2 đối phương
+        plain = np.maximum(values, 0)
+        swapped = np.where(values > 0, 3 - values, 0)
+        codes_bot = np.where(x_mark, plain, swapped) @ powers
+        codes_opp = np.where(x_mark, swapped, plain) @ powers
+        atk = (scores[codes_bot] * 1.5).sum(axis=1) * has[codes_bot].any(axis=1)
+        defn = scores[codes_opp].sum(axis=1) * has[codes_opp].any(axis=1)
+        parts = [_split(a, counts) for a in (atk, defn, codes_bot, codes_opp)]
+        for k, i in enumerate(ids):
+            out[i] = tuple(part[k] for part in parts)
+    return out
+
+
+def cell_info_b(atk: float, defn: float, codes_bot: List[int], codes_opp: List[int]) -> Dict[str, Any]:
+    """Entry evaluate_board của b.py cho một ô từ điểm và mã 4 hướng"""
+    _, patterns = _b_tables()
+    p_atk = [p for code in codes_bot for p in patterns[code]]
+    p_def = [p for code in codes_opp for p in patterns[code]]
+    atk = atk if p_atk else 0
+    defn = defn if p_def else 0
+    return {"score": atk + defn, "attack": atk, "defense": defn, "patterns_bot": p_atk, "patterns_opp": p_def}